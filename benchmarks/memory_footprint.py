@@ -0,0 +1,53 @@
+"""
+Per-widget memory footprint of a large widget tree.
+
+Builds a tree of Buttons and Labels spread over AbsoluteFrames and reports
+the traced allocation size per widget. Run with `python -m benchmarks.memory_footprint`.
+"""
+from __future__ import annotations
+import contextlib
+import gc
+import os
+import tracemalloc
+
+from blessed import Terminal
+
+from blessed_widgets.widgets import (AbsoluteFrame, BoxStyle, Button, Label,
+                                     Window)
+
+WIDGETS = 10_000
+PER_FRAME = 100
+
+
+def buildTree(window: Window, count: int) -> None:
+    style = BoxStyle(bg_color=window.term.on_blue)
+    for f in range(count // PER_FRAME):
+        frame = AbsoluteFrame(window.mainframe, 60, 20)
+        frame.place(0, 0)
+        for i in range(PER_FRAME):
+            if i % 2:
+                button = Button(frame, 6, 1, text=f"b{i}", style=style)
+                button.place(i % 10 * 6, i // 10)
+            else:
+                label = Label(frame, 6, 1, text=f"l{i}")
+                label.place(i % 10 * 6, i // 10)
+
+
+def measure(count: int = WIDGETS) -> float:
+    term = Terminal(kind="xterm-256color", force_styling=True)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        window = Window(term)
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        buildTree(window, count)
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    return (after - before) / count
+
+
+if __name__ == "__main__":
+    per_widget = measure()
+    print(f"{WIDGETS} widgets: {per_widget:.0f} bytes per widget, "
+          f"{per_widget * WIDGETS / 1024 ** 2:.2f} MiB total")
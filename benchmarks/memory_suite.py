@@ -0,0 +1,238 @@
+"""
+Memory cost of widget trees and allocations of interactions.
+
+Reports traced bytes per widget type, the size of trees of 1k, 10k and 100k
+elements, and per keypress the bytes retained and the transient peak of
+navigating, typing in an Entry and opening and closing a dropdown.
+Run with `python -m benchmarks.memory_suite [--check [thresholds.json]]`,
+checking exits with status 1 when a measurement exceeds its threshold.
+"""
+from __future__ import annotations
+import argparse
+import contextlib
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+from blessed import Terminal
+from blessed.keyboard import Keystroke
+
+from blessed_widgets.constants import BorderStyle
+from blessed_widgets.replay import keystroke
+from blessed_widgets.widgets import (AbsoluteFrame, BoxStyle, Button, Chart,
+                                     DataGrid, DropdownMenu, Entry, Label,
+                                     OptionMenu, ProgressBar, Sparkline,
+                                     Window)
+
+from .memory_footprint import buildTree
+
+THRESHOLDS = os.path.join(os.path.dirname(__file__), "memory_thresholds.json")
+PER_TYPE = 200
+TREE_SIZES = (1_000, 10_000, 100_000)
+KEYPRESSES = 200
+# tracemalloc.reset_peak is new in Python 3.9, before it the transient cost
+# of a keypress falls back to the growth of traced memory while handling it
+CAN_RESET_PEAK = hasattr(tracemalloc, "reset_peak")
+
+WIDGET_FACTORIES: Dict[str, Callable[[AbsoluteFrame], object]] = {
+    "Label": lambda frame: Label(frame, 6, 1, text="label"),
+    "Button": lambda frame: Button(frame, 6, 1, text="button"),
+    "Entry": lambda frame: Entry(frame, 10, 3, default_text="entry"),
+    "DropdownMenu": lambda frame: DropdownMenu(frame, 8, 1, text="menu"),
+    "OptionMenu": lambda frame: OptionMenu(
+        frame, 8, 1, default_text="a", options=["a", "b", "c", "d"]),
+    "AbsoluteFrame": lambda frame: AbsoluteFrame(frame, 10, 5),
+    "ProgressBar": lambda frame: ProgressBar(frame, 20, 1, value=0.5),
+    "Sparkline": lambda frame: Sparkline(frame, 20, 1),
+    "DataGrid": lambda frame: DataGrid(frame, 30, 6,
+                                       columns=[["a", "b"], [1, 2]]),
+    "Chart": lambda frame: Chart(frame, 20, 4),
+}
+
+
+def createWindow() -> Window:
+    term = Terminal(kind="xterm-256color", force_styling=True)
+    return Window(term)
+
+
+def traced(build: Callable[[], object]) -> int:
+    "Bytes still allocated after build, keeping what it returns alive"
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def measureWidgetTypes(count: int = PER_TYPE) -> Dict[str, float]:
+    "Bytes per widget of each type, placed in a frame of its own type"
+    results = {}
+    for name, factory in WIDGET_FACTORIES.items():
+        window = createWindow()
+        frame = AbsoluteFrame(window.mainframe, 60, 20)
+        frame.place(0, 0)
+        factory(frame)  # Fills the caches shared by every widget of the type
+        results[name] = traced(
+            lambda: [factory(frame) for _ in range(count)]) / count
+    return results
+
+
+def measureTrees(sizes: Tuple[int, ...] = TREE_SIZES) -> Dict[str, float]:
+    "Total bytes of trees of Buttons and Labels"
+    results = {}
+    for size in sizes:
+        window = createWindow()
+        results[str(size)] = traced(lambda: buildTree(window, size))
+    return results
+
+
+def navigationScenario() -> Tuple[Window, List[Keystroke]]:
+    window = createWindow()
+    frame = AbsoluteFrame(window.mainframe, 40, 8)
+    frame.place(0, 0)
+    for row in range(4):
+        for column in range(4):
+            Button(frame, 8, 1, text=f"{column},{row}").place(
+                column * 10, row * 2)
+    keys = ["KEY_DOWN"] + (["KEY_RIGHT"] * 3 + ["KEY_DOWN"] * 3 +
+                           ["KEY_LEFT"] * 3 + ["KEY_UP"] * 3) * 100
+    return window, [keystroke(name) for name in keys]
+
+
+def typingScenario() -> Tuple[Window, List[Keystroke]]:
+    window = createWindow()
+    frame = AbsoluteFrame(window.mainframe, 40, 8)
+    frame.place(0, 0)
+    Entry(frame,
+          30,
+          3,
+          style=BoxStyle(border_style=BorderStyle.SINGLE)).place(1, 1)
+    keys = ["KEY_DOWN", "KEY_ENTER"] + (list("typing") +
+                                        ["KEY_BACKSPACE"] * 6) * 100
+    return window, [keystroke(name) for name in keys]
+
+
+def dropdownScenario() -> Tuple[Window, List[Keystroke]]:
+    window = createWindow()
+    frame = AbsoluteFrame(window.mainframe, 40, 12)
+    frame.place(0, 0)
+    OptionMenu(frame,
+               10,
+               1,
+               default_text="one",
+               options=["one", "two", "three", "four", "five"]).place(1, 1)
+    keys = ["KEY_DOWN"] + ["KEY_ENTER", "KEY_DOWN", "KEY_ESCAPE"] * 200
+    return window, [keystroke(name) for name in keys]
+
+
+SCENARIOS: Dict[str, Callable[[], Tuple[Window, List[Keystroke]]]] = {
+    "navigation": navigationScenario,
+    "typing": typingScenario,
+    "dropdown": dropdownScenario,
+}
+
+
+def measureKeypresses(scenario: Callable[[], Tuple[Window, List[Keystroke]]],
+                      count: int = KEYPRESSES) -> Dict[str, float]:
+    """
+    Bytes retained per keypress and the average peak of memory allocated
+    while handling one, over count keypresses after a first pass which
+    fills the caches. Before Python 3.9 the transient figure only counts
+    what a keypress leaves allocated, see CAN_RESET_PEAK.
+    """
+    window, keys = scenario()
+    for event in keys:
+        window.handleEvent(event)
+    keys = (keys * (count // len(keys) + 1))[:count]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    transient = 0
+    for event in keys:
+        current = tracemalloc.get_traced_memory()[0]
+        if CAN_RESET_PEAK:
+            tracemalloc.reset_peak()
+        window.handleEvent(event)
+        traced, peak = tracemalloc.get_traced_memory()
+        transient += (peak if CAN_RESET_PEAK else traced) - current
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return {
+        "retained": (after - before) / count,
+        "transient": transient / count
+    }
+
+
+def runSuite(sizes: Tuple[int, ...] = TREE_SIZES) -> Dict[str, Dict]:
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return {
+            "bytes_per_widget": measureWidgetTypes(),
+            "tree_bytes": measureTrees(sizes),
+            "keypress_bytes": {
+                name: measureKeypresses(scenario)
+                for name, scenario in SCENARIOS.items()
+            }
+        }
+
+
+def flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for name, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{name}."))
+        else:
+            flat[prefix + name] = value
+    return flat
+
+
+def checkThresholds(results: Dict, thresholds: Dict) -> List[str]:
+    "Descriptions of the measurements above their thresholds"
+    measured = flatten(results)
+    failures = []
+    for name, limit in flatten(thresholds).items():
+        if name in measured and measured[name] > limit:
+            failures.append(f"{name}: {measured[name]:.0f} > {limit}")
+    return failures
+
+
+def report(results: Dict) -> None:
+    print("bytes per widget")
+    for name, size in results["bytes_per_widget"].items():
+        print(f"  {name:<14} {size:>10.0f}")
+    print("tree size")
+    for count, size in results["tree_bytes"].items():
+        print(f"  {int(count):>7} elements {size / 1024 ** 2:>8.2f} MiB")
+    print("bytes per keypress")
+    for name, sizes in results["keypress_bytes"].items():
+        print(f"  {name:<14} retained {sizes['retained']:>8.1f}"
+              f"  transient {sizes['transient']:>8.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--check",
+                        nargs="?",
+                        const=THRESHOLDS,
+                        help="thresholds file to check the results against")
+    parser.add_argument("--sizes",
+                        type=int,
+                        nargs="+",
+                        default=list(TREE_SIZES),
+                        help="element counts of the measured trees")
+    args = parser.parse_args()
+    results = runSuite(tuple(args.sizes))
+    report(results)
+    if args.check:
+        with open(args.check) as file:
+            failures = checkThresholds(results, json.load(file))
+        for failure in failures:
+            print(f"over threshold: {failure}")
+        sys.exit(1 if failures else 0)
@@ -0,0 +1,59 @@
+"""
+Event handling latency of examples/sound_recognition.Application.
+
+Replays a recording made with blessed_widgets.replay.Recorder, or a scripted
+session recorded on the spot when no file is given, and reports latency
+percentiles. Run with `python -m benchmarks.replay_session [recording] [speed]`.
+"""
+from __future__ import annotations
+import contextlib
+import os
+import sys
+import tempfile
+
+from blessed import Terminal
+
+from blessed_widgets.replay import Recorder, keystroke, replay
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(__file__)),
+                        "examples")
+sys.path.insert(0, EXAMPLES)
+from sound_recognition import Application  # noqa: E402
+
+SCRIPT = ["KEY_DOWN", "KEY_ENTER", "KEY_DOWN", "KEY_ENTER", "KEY_RIGHT",
+          "KEY_RIGHT", "KEY_UP", "KEY_ENTER", "KEY_DOWN", "KEY_DOWN",
+          "KEY_ENTER", "a", "b", "KEY_BACKSPACE", "KEY_ENTER", "KEY_DOWN",
+          "KEY_ENTER", "KEY_ESCAPE"]
+ROUNDS = 20
+
+
+def createApplication() -> Application:
+    term = Terminal(kind="xterm-256color", force_styling=True)
+    app = Application(term)
+    app.draw()
+    return app
+
+
+def recordScript(path: str) -> None:
+    "Records ROUNDS passes over SCRIPT"
+    app = createApplication()
+    with Recorder(app, path):
+        for _ in range(ROUNDS):
+            for key in SCRIPT:
+                app.handleEvent(keystroke(key))
+
+
+if __name__ == "__main__":
+    speed = float(sys.argv[2]) if len(sys.argv) > 2 else None
+    os.chdir(EXAMPLES)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if len(sys.argv) > 1:
+            report = replay(createApplication(), sys.argv[1], speed)
+        else:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "session.rec.gz")
+                recordScript(path)
+                report = replay(createApplication(), path, speed)
+    print(report)
+    for name, latency in report.getSlowest():
+        print(f"  {name}: {latency * 1000:.3f} ms")
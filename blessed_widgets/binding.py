@@ -0,0 +1,63 @@
+from __future__ import annotations
+from typing import Any, Callable, List, Optional
+
+
+class Observable():
+    "Holds a value and schedules the bindings to it whenever it changes"
+    __slots__ = ("value", "bindings")
+
+    def __init__(self, value: Any = None) -> None:
+        self.value = value
+        self.bindings: List[Binding] = []
+
+    def get(self) -> Any:
+        return self.value
+
+    def set(self, value: Any) -> None:
+        "Safe to call from other threads, widgets update on the next frame"
+        if value == self.value:
+            return
+        self.value = value
+        for binding in self.bindings:
+            binding.invalidate()
+
+
+class Binding():
+    """
+    Connects an Observable to a widget, which implements applyBoundValue.
+    The formatted value is compared with the last one the widget was given,
+    so updates which format the same don't repaint anything.
+    """
+    __slots__ = ("observable", "widget", "formatter", "rendered")
+
+    def __init__(self, observable: Observable, widget,
+                 formatter: Callable[[Any], Any]) -> None:
+        self.observable = observable
+        self.widget = widget
+        self.formatter = formatter
+        self.rendered: Optional[Any] = None
+        observable.bindings.append(self)
+        widget.getWindow().binding_count += 1
+
+    def invalidate(self) -> None:
+        self.widget.getWindow().scheduleBinding(self)
+
+    def apply(self) -> bool:
+        "Returns whether the widget was updated"
+        value = self.formatter(self.observable.get())
+        if value == self.rendered:
+            return False
+        if not self.widget.applyBoundValue(value):
+            # The widget refused for now, e.g. an Entry being edited
+            return False
+        self.rendered = value
+        return True
+
+    def publish(self, value: Any) -> None:
+        "Sets the observable from a value the user entered in the widget"
+        self.rendered = value
+        self.observable.set(value)
+
+    def unbind(self) -> None:
+        self.observable.bindings.remove(self)
+        self.widget.getWindow().binding_count -= 1
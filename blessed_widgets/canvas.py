@@ -0,0 +1,468 @@
+from __future__ import annotations
+from typing import (Callable, Dict, List, Optional, Sequence, Set, Tuple,
+                    Union)
+
+# 3rd party
+from blessed import Terminal
+
+# local
+from .cells import CONTINUATION, repairRow, splitCells
+from .emitter import Emitter, cost
+
+# A cell is a character and the attribute sequence it's drawn with
+BLANK = " "
+NORMAL = ""
+
+
+class Layer():
+    """
+    Grid of cells drawn by the elements of one z level.
+    Cells set to None are transparent and show the layers below.
+    While the compositor has an overlay_view, writes go to that view's
+    overlay above the layer instead.
+    """
+    shared = True
+
+    def __init__(self, compositor: Compositor, z: int, opaque: bool) -> None:
+        self.compositor = compositor
+        self.z = z
+        # Stacks the layers of equal z, the most recently raised on top
+        self.order = compositor.stack()
+        self.opaque = opaque
+        self.reset()
+
+    def reset(self) -> None:
+        width, height = self.compositor.width, self.compositor.height
+        char = BLANK if self.opaque else None
+        attr = NORMAL if self.opaque else None
+        self.chars: List[List[Optional[str]]] = [[char] * width
+                                                 for _ in range(height)]
+        self.attrs: List[List[Optional[str]]] = [[attr] * width
+                                                 for _ in range(height)]
+
+    def isStale(self) -> bool:
+        "Whether the layer was sized for a previous size of the screen"
+        return len(self.chars) != self.compositor.height or any(
+            len(row) != self.compositor.width for row in self.chars[:1])
+
+    def write(self, x: int, y: int, text: str, attr: str) -> None:
+        """
+        Writes text on a single row, cells outside the screen are dropped.
+        A wide character takes its cell and a CONTINUATION cell after it.
+        """
+        if not 0 <= y < self.compositor.height or not text:
+            return
+        wide = False
+        cells: Union[str, Sequence[str]] = text
+        if not text.isascii():
+            cells, wide = splitCells(text)
+        self.writeCells(x, y, cells, attr, wide)
+
+    def writeCells(self,
+                   x: int,
+                   y: int,
+                   cells: Union[str, Sequence[str]],
+                   attr: str,
+                   wide: bool = False) -> None:
+        """
+        Writes one entry of cells per cell without measuring them, for
+        callers which know they are narrow, or laid out with CONTINUATION
+        cells when wide is set.
+        """
+        if self.shared and self.compositor.overlay_view is not None:
+            self.compositor.overlay_view.getOverlay(self).writeCells(
+                x, y, cells, attr, wide)
+            return
+        if not 0 <= y < self.compositor.height:
+            return
+        start = max(x, 0)
+        end = min(x + len(cells), self.compositor.width)
+        if start >= end:
+            return
+        row = self.chars[y]
+        row[start:end] = cells[start - x:end - x]
+        self.attrs[y][start:end] = [attr] * (end - start)
+        if wide:
+            self.compositor.wide_rows.add(y)
+        if y in self.compositor.wide_rows:
+            # Covering half of a wide character changes the other half too
+            self.markDirty(y, max(start - 1, 0),
+                           min(end + 1, self.compositor.width))
+        else:
+            self.markDirty(y, start, end)
+
+    def markDirty(self, y: int, start: int, end: int) -> None:
+        self.compositor.markDirty(y, start, end)
+
+    def erase(self, left: int, top: int, right: int, bottom: int) -> None:
+        "Clears the columns [left, right) of rows [top, bottom]"
+        if self.shared and self.compositor.overlay_view is not None:
+            self.compositor.overlay_view.getOverlay(self).erase(
+                left, top, right, bottom)
+            return
+        char = BLANK if self.opaque else None
+        attr = NORMAL if self.opaque else None
+        start = max(left, 0)
+        end = min(right, self.compositor.width)
+        if start >= end:
+            return
+        for y in range(max(top, 0), min(bottom + 1, self.compositor.height)):
+            self.chars[y][start:end] = [char] * (end - start)
+            self.attrs[y][start:end] = [attr] * (end - start)
+            if y in self.compositor.wide_rows:
+                self.markDirty(y, max(start - 1, 0),
+                               min(end + 1, self.compositor.width))
+            else:
+                self.markDirty(y, start, end)
+
+
+class ViewLayer(Layer):
+    """
+    Transparent layer only one View shows, composited right above a shared
+    layer, e.g. the highlights of the elements a session selected.
+    """
+    shared = False
+
+    def __init__(self, view: View) -> None:
+        self.view = view
+        # Row -> column span [start, end) written since the last clear
+        self.spans: Dict[int, Tuple[int, int]] = {}
+        super().__init__(view.compositor, 0, opaque=False)
+
+    def markDirty(self, y: int, start: int, end: int) -> None:
+        self.view.markDirty(y, start, end)
+        span = self.spans.get(y)
+        if span is not None:
+            start, end = min(span[0], start), max(span[1], end)
+        self.spans[y] = (start, end)
+
+    def clear(self) -> None:
+        "Makes the cells written so far transparent again"
+        for y, (start, end) in list(self.spans.items()):
+            self.erase(start, y, end, y)
+        self.spans.clear()
+
+
+def printOutput(output: str) -> None:
+    print(output, end='', flush=True)
+
+
+class View():
+    """
+    One terminal showing the composited layers. It keeps a copy of what that
+    terminal currently shows, and rendering only emits cells in dirty spans
+    whose composited value changed. Cells outside its size are clipped.
+    """
+
+    def __init__(self,
+                 compositor: Compositor,
+                 term: Terminal,
+                 width: int,
+                 height: int,
+                 write: Callable[[str], None] = printOutput,
+                 auto_flush: bool = True) -> None:
+        self.compositor = compositor
+        self.term = term
+        self.emitter = Emitter(term)
+        self.counters = self.emitter.counters
+        self.width = width
+        self.height = height
+        self.write = write
+        # Views which don't flush on every Window.flush are flushed by their owner
+        self.auto_flush = auto_flush
+        # Shared layer -> the layer only this view shows right above it
+        self.overlays: Dict[Layer, ViewLayer] = {}
+        # Shared layers this view leaves out
+        self.hidden_layers: Set[Layer] = set()
+        # Maps attributes to the ones this view's terminal draws them with
+        self.convert: Optional[Callable[[str], str]] = None
+        self.resetFront()
+
+    def resetFront(self) -> None:
+        "Assumes a cleared terminal"
+        self.front_chars = [[BLANK] * self.width for _ in range(self.height)]
+        self.front_attrs = [[NORMAL] * self.width for _ in range(self.height)]
+        # Row -> dirty column span [start, end)
+        self.dirty: Dict[int, Tuple[int, int]] = {}
+        self.emitter.reset()
+
+    def resize(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.resetFront()
+
+    def clear(self) -> None:
+        self.resetFront()
+        self.write(self.emitter.normal + self.term.clear)
+
+    def repaint(self) -> None:
+        "Marks everything the layers hold as dirty, e.g. for a cleared terminal"
+        end = min(self.width, self.compositor.width)
+        for y in range(min(self.height, self.compositor.height)):
+            self.markDirty(y, 0, end)
+
+    def getOverlay(self, layer: Layer) -> ViewLayer:
+        overlay = self.overlays.get(layer)
+        if overlay is None:
+            overlay = self.overlays[layer] = ViewLayer(self)
+        return overlay
+
+    def clearOverlays(self) -> None:
+        "Empties the overlays, dropping those of removed or resized layers"
+        layers = set(self.compositor.layers)
+        for layer, overlay in list(self.overlays.items()):
+            if overlay.isStale():
+                del self.overlays[layer]
+                continue
+            overlay.clear()
+            if layer not in layers:
+                del self.overlays[layer]
+
+    def hideLayers(self, layers: Set[Layer]) -> None:
+        if layers != self.hidden_layers:
+            self.hidden_layers = layers
+            self.repaint()
+
+    def markDirty(self, y: int, start: int, end: int) -> None:
+        if y >= self.height:
+            return
+        end = min(end, self.width)
+        if start >= end:
+            return
+        span = self.dirty.get(y)
+        if span is None:
+            self.dirty[y] = (start, end)
+        else:
+            self.dirty[y] = (min(span[0], start), max(span[1], end))
+
+    def render(self) -> str:
+        "Returns the output bringing the terminal up to date with the layers"
+        output: List[str] = []
+        self.emitter.begin()
+        for y in sorted(self.dirty):
+            start, end = self.dirty[y]
+            chars, attrs = self.compositor.composite(y, start, end, self)
+            if self.convert is not None:
+                attrs = [self.convert(attr) for attr in attrs]
+            front_chars = self.front_chars[y]
+            front_attrs = self.front_attrs[y]
+            run_start = -1
+            run_attr: Optional[str] = None
+            run: List[str] = []
+            for x in range(start, end):
+                char = chars[x - start]
+                attr = attrs[x - start]
+                if char == CONTINUATION and run:
+                    # Stays in the run of its character, whatever changed
+                    front_chars[x] = char
+                    front_attrs[x] = attr
+                    run.append(char)
+                    continue
+                if front_chars[x] == char and front_attrs[x] == attr:
+                    if run:
+                        output.append(self.emitRun(run_start, y, run_attr,
+                                                   run))
+                        run = []
+                    continue
+                if run and attr != run_attr:
+                    output.append(self.emitRun(run_start, y, run_attr, run))
+                    run = []
+                front_chars[x] = char
+                front_attrs[x] = attr
+                if not run:
+                    run_start = x
+                    run_attr = attr
+                run.append(char)
+            if run:
+                output.append(self.emitRun(run_start, y, run_attr, run))
+        self.dirty.clear()
+        result = "".join(output)
+        self.counters.bytes += cost(result)
+        return result
+
+    def emitRun(self, x: int, y: int, attr: Optional[str],
+                run: List[str]) -> str:
+        return self.emitter.move(
+            x, y, self.front_chars[y], self.front_attrs[y]) + \
+            self.emitter.writeRun(x, y, attr or NORMAL, run, self.width)
+
+    def flush(self) -> None:
+        "Writes out changed cells, then resets pointer and color"
+        output = self.render()
+        if output:
+            self.write(output + self.term.home + self.emitter.resetPen())
+
+
+class Compositor():
+    """
+    Stacks layers by z, shared by every View of the Window.
+    Closing an overlay only marks the rectangle it covered as dirty.
+    """
+
+    def __init__(self, term: Terminal, width: int, height: int) -> None:
+        self.term = term
+        self.width = width
+        self.height = height
+        self.layers: List[Layer] = []
+        self.views: List[View] = []
+        # View of the terminal the Window was created with
+        self.view: Optional[View] = self.addView(
+            View(self, term, width, height))
+        self.counters = self.view.counters
+        # Rows which may hold wide characters, composited whole and repaired
+        self.wide_rows: Set[int] = set()
+        self.stacked = 0
+        # View whose overlays take the writes to the layers, see Layer
+        self.overlay_view: Optional[View] = None
+        # Added to the z of new layers, above the layers a modal screen covers
+        self.z_base = 0
+        # Layers of the screens under the current one, see pushLayers
+        self.saved_layers: List[Tuple[List[Layer], Layer, Set[int], int]] = []
+        self.base = self.addLayer(0, opaque=True)
+
+    def addView(self, view: View) -> View:
+        self.views.append(view)
+        return view
+
+    def removeView(self, view: View) -> None:
+        self.views.remove(view)
+        if view is self.view:
+            self.view = None
+
+    def stack(self) -> int:
+        self.stacked += 1
+        return self.stacked
+
+    def addLayer(self, z: int, opaque: bool = False) -> Layer:
+        layer = Layer(self, z + self.z_base, opaque)
+        self.layers.append(layer)
+        self.sortLayers()
+        return layer
+
+    def sortLayers(self) -> None:
+        self.layers.sort(key=lambda layer: (layer.z, layer.order))
+
+    def raiseLayer(self, layer: Layer) -> None:
+        """
+        Puts the layer above the others of its z. Only the order changes,
+        the caller draws what the layer holds for the terminal to show it.
+        """
+        layer.order = self.stack()
+        if layer is not self.layers[-1]:
+            self.sortLayers()
+
+    def removeLayer(self, layer: Layer) -> None:
+        layer.erase(0, 0, self.width, self.height - 1)
+        self.layers.remove(layer)
+
+    def pushLayers(self, transparent: bool = False) -> Layer:
+        """
+        Starts the layers of a new screen and returns its bottom layer. The
+        current layers keep what they show until popLayers. A transparent
+        screen is stacked above them and shows them where it's empty.
+        """
+        self.saved_layers.append(
+            (self.layers, self.base, self.wide_rows, self.z_base))
+        if transparent:
+            self.layers = list(self.layers)
+            self.wide_rows = set(self.wide_rows)
+            self.z_base = self.layers[-1].z + 1
+            return self.addLayer(0)
+        self.layers = []
+        self.wide_rows = set()
+        self.z_base = 0
+        self.base = self.addLayer(0, opaque=True)
+        self.repaint()
+        return self.base
+
+    def popLayers(self) -> None:
+        """
+        Shows the layers of the previous screen again. Views diff them with
+        what the terminal shows, only the cells which differ are written.
+        """
+        self.layers, self.base, self.wide_rows, self.z_base = \
+            self.saved_layers.pop()
+        if self.base.isStale():
+            # Resized while they were covered, their contents are redrawn
+            self.reset()
+        self.repaint()
+
+    def repaint(self) -> None:
+        for view in self.views:
+            view.repaint()
+
+    def reset(self) -> None:
+        "Empties every layer"
+        self.wide_rows.clear()
+        for layer in self.layers:
+            layer.reset()
+
+    def clear(self) -> None:
+        "Empties every layer and clears the terminal of every view"
+        self.reset()
+        for view in self.views:
+            view.clear()
+
+    def flush(self) -> None:
+        for view in self.views:
+            if view.auto_flush:
+                view.flush()
+
+    def resize(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+        self.reset()
+        if self.view is not None:
+            self.view.resize(width, height)
+
+    def markDirty(self, y: int, start: int, end: int) -> None:
+        for view in self.views:
+            view.markDirty(y, start, end)
+
+    def composite(self,
+                  y: int,
+                  start: int,
+                  end: int,
+                  view: Optional[View] = None) -> Tuple[list, list]:
+        "Cells of a row span, as the view shows them if given"
+        if y in self.wide_rows:
+            chars, attrs = self.compositeRow(y, 0, self.width, view)
+            repairRow(chars)
+            return chars[start:end], attrs[start:end]
+        return self.compositeRow(y, start, end, view)
+
+    def compositeRow(self,
+                     y: int,
+                     start: int,
+                     end: int,
+                     view: Optional[View] = None) -> Tuple[list, list]:
+        chars = self.base.chars[y][start:end]
+        attrs = self.base.attrs[y][start:end]
+        overlays = view.overlays if view is not None else None
+        hidden = view.hidden_layers if view is not None else None
+        if overlays and self.base in overlays:
+            self.blend(overlays[self.base], y, start, end, chars, attrs)
+        for layer in self.layers[1:]:
+            if hidden and layer in hidden:
+                continue
+            layer_chars = layer.chars[y]
+            layer_attrs = layer.attrs[y]
+            for x in range(start, end):
+                char = layer_chars[x]
+                if char is not None:
+                    chars[x - start] = char
+                    attrs[x - start] = layer_attrs[x]
+            if overlays and layer in overlays:
+                self.blend(overlays[layer], y, start, end, chars, attrs)
+        return chars, attrs
+
+    def blend(self, layer: Layer, y: int, start: int, end: int, chars: list,
+              attrs: list) -> None:
+        "Draws the cells layer sets over chars and attrs"
+        layer_chars = layer.chars[y]
+        layer_attrs = layer.attrs[y]
+        for x in range(start, end):
+            char = layer_chars[x]
+            if char is not None:
+                chars[x - start] = char
+                attrs[x - start] = layer_attrs[x]
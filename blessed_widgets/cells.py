@@ -0,0 +1,142 @@
+from __future__ import annotations
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from typing import List, Tuple
+
+# 3rd party
+from wcwidth import wcwidth
+
+# local
+from .constants import TEXT_CACHE_SIZE
+
+BLANK = " "
+# Cell to the right of a wide character, the terminal draws nothing there
+CONTINUATION = ""
+ZWJ = "\u200d"
+VS16 = "\ufe0f"
+
+
+def isEmojiModifier(char: str) -> bool:
+    "Skin tones, which wcwidth measures as wide on their own"
+    return "\U0001f3fb" <= char <= "\U0001f3ff"
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def clusterWidth(cluster: str) -> int:
+    "Cells taken by one grapheme cluster, 1 or 2"
+    if cluster.isascii():
+        return 1
+    if VS16 in cluster:
+        # Emoji presentation
+        return 2
+    return 2 if wcwidth(cluster[0]) == 2 else 1
+
+
+def iterClusters(text: str):
+    """
+    Splits text into grapheme clusters: a base character with the zero
+    width characters and skin tones following it and the characters joined
+    to it by ZWJ.
+    Control characters are dropped.
+    """
+    cluster = ""
+    join = False
+    for char in text:
+        width = wcwidth(char)
+        if width < 0:
+            continue
+        if cluster and (width == 0 or join or isEmojiModifier(char)):
+            cluster += char
+        else:
+            if cluster:
+                yield cluster
+            # A mark without a base is shown on a blank
+            cluster = BLANK + char if width == 0 else char
+        join = char == ZWJ
+    if cluster:
+        yield cluster
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def clusterOffsets(text: str) -> Tuple[int, ...]:
+    """
+    Indexes in text where the clusters of iterClusters start, followed by
+    len(text). Control characters stay with the cluster before them.
+    """
+    offsets: List[int] = []
+    join = False
+    for index, char in enumerate(text):
+        width = wcwidth(char)
+        if offsets and (width <= 0 or join or isEmojiModifier(char)):
+            if width >= 0:
+                join = char == ZWJ
+            continue
+        offsets.append(index)
+        join = char == ZWJ
+    offsets.append(len(text))
+    return tuple(offsets)
+
+
+def previousOffset(text: str, index: int) -> int:
+    "Start of the cluster before index, 0 at the start"
+    offsets = clusterOffsets(text)
+    return offsets[max(bisect_left(offsets, index) - 1, 0)]
+
+
+def nextOffset(text: str, index: int) -> int:
+    "Start of the cluster after the one at index, len(text) at the end"
+    offsets = clusterOffsets(text)
+    return offsets[min(bisect_right(offsets, index), len(offsets) - 1)]
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def splitCells(text: str) -> Tuple[Tuple[str, ...], bool]:
+    "Cells text is drawn into, and whether any character is wide"
+    cells: List[str] = []
+    wide = False
+    for cluster in iterClusters(text):
+        cells.append(cluster)
+        if clusterWidth(cluster) == 2:
+            cells.append(CONTINUATION)
+            wide = True
+    return tuple(cells), wide
+
+
+def textWidth(text: str) -> int:
+    "Cells taken by text on the terminal"
+    if text.isascii():
+        return len(text)
+    return len(splitCells(text)[0])
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def truncateWide(text: str, width: int) -> str:
+    clusters: List[str] = []
+    taken = 0
+    for cluster in iterClusters(text):
+        taken += clusterWidth(cluster)
+        if taken > width:
+            break
+        clusters.append(cluster)
+    return "".join(clusters)
+
+
+def truncate(text: str, width: int) -> str:
+    "Longest start of text taking at most width cells"
+    if text.isascii():
+        return text[:width]
+    return truncateWide(text, width)
+
+
+def repairRow(chars: list) -> None:
+    """
+    Blanks what's left of wide characters partly covered by other cells,
+    for rows composited from several writes.
+    """
+    for x, char in enumerate(chars):
+        if char == CONTINUATION:
+            if x == 0 or clusterWidth(chars[x - 1] or BLANK) != 2:
+                chars[x] = BLANK
+        elif char and not char.isascii() and clusterWidth(char) == 2:
+            if x + 1 >= len(chars) or chars[x + 1] != CONTINUATION:
+                chars[x] = BLANK
@@ -3,6 +3,41 @@ from enum import Enum, auto, unique
 # Maximum angle between diraction of movement and center of widget
 MAX_ANGLE = 70
 
+# Number of registered elements from which spatial queries use the vectorized
+# GeometryStore instead of walking the widget tree
+BATCH_QUERY_THRESHOLD = 32
+
+# Seconds Window.loop waits for input when nothing else is pending
+IDLE_TIMEOUT = 3
+# Seconds the terminal size has to stay unchanged before relayouting
+RESIZE_SETTLE = 0.05
+# Seconds between wake ups to notice resizes, SIGWINCH doesn't interrupt inkey
+RESIZE_POLL_INTERVAL = 0.25
+# Longest wait for input while bound values may change from other threads
+FRAME_INTERVAL = 1 / 30
+# Cancelled timers left in the scheduler's heap before it's rebuilt without them
+TIMER_COMPACT_THRESHOLD = 64
+# Strings whose cell widths and truncations are remembered
+TEXT_CACHE_SIZE = 4096
+# Combinations of given, inherited and default styles whose result is remembered
+STYLE_CACHE_SIZE = 1024
+# Seconds an element has to stay inactive before its caches are trimmed
+TRIM_AGE = 60
+# Seconds between Window.loop checks for elements to trim
+TRIM_INTERVAL = 10
+
+# Blocks filled by eighths of a cell, from empty to full
+H_BLOCKS = " ▏▎▍▌▋▊▉█"
+V_BLOCKS = " ▁▂▃▄▅▆▇█"
+# Braille cells hold 2x4 dots, U+2800 plus one bit per dot
+BRAILLE_BASE = 0x2800
+
+# Bytes of output a session may have waiting before it is repainted from
+# scratch once it catches up, instead of buffering every frame
+MAX_SESSION_BACKLOG = 1 << 20
+# Bytes read from a session socket at once
+SESSION_READ_SIZE = 4096
+
 
 @unique
 class HAlignment(Enum):
@@ -71,3 +106,41 @@ class Layout(Enum):
     ABSOLUTE = auto()
     FLEX = auto()
     GRID = auto()
+
+
+@unique
+class FlexDirection(Enum):
+    ROW = auto()
+    COLUMN = auto()
+
+
+@unique
+class FlexAlignment(Enum):
+    START = auto()
+    CENTER = auto()
+    END = auto()
+    STRETCH = auto()
+    SPACE_BETWEEN = auto()
+
+
+@unique
+class MouseAction(Enum):
+    PRESS = auto()
+    RELEASE = auto()
+    MOTION = auto()
+    WHEEL_UP = auto()
+    WHEEL_DOWN = auto()
+
+
+@unique
+class MouseButton(Enum):
+    LEFT = 0
+    MIDDLE = 1
+    RIGHT = 2
+    NONE = 3
+
+
+@unique
+class ExecutorKind(Enum):
+    THREAD = auto()
+    PROCESS = auto()
@@ -0,0 +1,289 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Tuple
+
+# 3rd party
+from blessed import Terminal
+
+# local
+from .cells import CONTINUATION
+from .sgr import NORMAL_STATE, parse, transition
+
+BLANK = " "
+NORMAL = ""
+# Flags that don't show on blank cells, so erasing keeps them correct
+BLANK_SAFE_FLAGS = frozenset((1, 2, 3))
+# Longest stretch of unchanged cells rewritten instead of moving over it
+MAX_REWRITE = 8
+
+
+def cost(sequence: str) -> int:
+    "Bytes the sequence takes on the wire"
+    if sequence.isascii():
+        return len(sequence)
+    return len(sequence.encode("utf-8"))
+
+
+def splitsWide(row: List[str], start: int, end: int) -> bool:
+    "Whether cells [start, end) begin or end halfway through a wide character"
+    return row[start] == CONTINUATION or (end < len(row) and
+                                          row[end] == CONTINUATION)
+
+
+def hasFlag(term: Terminal, name: str) -> bool:
+    "Boolean terminfo capability, False when it can't be read"
+    terminfo = getattr(term, "_jinxed_term", None)
+    if terminfo is None:
+        return False
+    try:
+        return bool(terminfo.tigetflag(name) > 0)
+    except Exception:
+        return False
+
+
+class RenderCounters():
+    """
+    Totals gathered while rendering. bytes_saved is measured against moving
+    absolutely before every run and writing every cell literally.
+    """
+    __slots__ = ("frames", "runs", "bytes", "bytes_saved", "moves_skipped",
+                 "relative_moves", "absolute_moves", "erases", "repeats")
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        for name in self.__slots__:
+            setattr(self, name, 0)
+
+    def asDict(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class Emitter():
+    """
+    Encodes runs of cells for the terminal, keeping track of where its cursor
+    is and which attribute it draws with. Every step picks the cheapest
+    sequence the terminal supports: no move, CR/LF, relative or absolute
+    moves, ECH/EL for blanks and REP for repeated characters.
+    """
+
+    def __init__(self, term: Terminal) -> None:
+        self.term = term
+        self.normal = term.normal
+        self.counters = RenderCounters()
+        self.transitions: Dict[Tuple[str, str], str] = {}
+        self.back_color_erase = hasFlag(term, "bce")
+        self.capabilities = {
+            name: bool(str(getattr(term, name)))
+            for name in ("cuf", "cub", "cud", "cuu", "hpa", "vpa", "ech",
+                         "el", "rep")
+        }
+        self.pen = NORMAL
+        self.cursor: Optional[Tuple[int, int]] = None
+        # Formatting parameterized capabilities goes through terminfo each time
+        self.sequences: Dict[tuple, str] = {}
+
+    def sequence(self, name: str, *params: int) -> str:
+        "Parameterized capability, formatted once per set of parameters"
+        key = (name, ) + params
+        sequence = self.sequences.get(key)
+        if sequence is None:
+            sequence = self.sequences[key] = str(
+                getattr(self.term, name)(*params))
+        return sequence
+
+    def reset(self) -> None:
+        "Assumes a cleared terminal drawing with normal attributes"
+        self.pen = NORMAL
+        self.cursor = None
+
+    def begin(self) -> None:
+        "Anything may have been printed between frames, so forget the cursor"
+        self.cursor = None
+        self.counters.frames += 1
+
+    def setPen(self, attr: str) -> str:
+        "Returns the output switching from the current attribute to attr"
+        key = (self.pen, attr)
+        sequence = self.transitions.get(key)
+        if sequence is None:
+            current, target = parse(self.pen), parse(attr)
+            if current is None or target is None:
+                sequence = self.normal + attr
+            else:
+                sequence = transition(current, target)
+            self.transitions[key] = sequence
+        self.pen = attr
+        return sequence
+
+    def resetPen(self) -> str:
+        "Returns to normal attributes, if not there already"
+        if parse(self.pen) == NORMAL_STATE:
+            self.pen = NORMAL
+            return ""
+        self.pen = NORMAL
+        return self.normal
+
+    def moveHorizontal(self, x: int, to_x: int, row: Optional[List[str]],
+                       row_attrs: Optional[List[str]]) -> str:
+        if x == to_x:
+            return ""
+        options: List[str] = []
+        if to_x == 0:
+            options.append("\r")
+        if to_x > x:
+            if self.capabilities["cuf"]:
+                options.append(self.sequence("cuf", to_x - x))
+            if (row is not None and to_x - x <= MAX_REWRITE and
+                    row_attrs is not None and
+                    all(attr == self.pen for attr in row_attrs[x:to_x]) and
+                    not splitsWide(row, x, to_x)):
+                options.append("".join(row[x:to_x]))
+        elif self.capabilities["cub"]:
+            options.append(self.sequence("cub", x - to_x))
+        if self.capabilities["hpa"]:
+            options.append(self.sequence("hpa", to_x))
+        if not options:
+            return self.sequence("move_x", to_x)
+        return min(options, key=cost)
+
+    def move(self, x: int, y: int, row: Optional[List[str]] = None,
+             row_attrs: Optional[List[str]] = None) -> str:
+        """
+        Returns the cheapest way of moving the cursor to (x, y).
+        row and row_attrs are what the terminal shows on that row, letting
+        a short stretch of it be rewritten instead of moved over.
+        """
+        counters = self.counters
+        absolute = self.sequence("move_xy", x, y)
+        if self.cursor == (x, y):
+            counters.moves_skipped += 1
+            counters.bytes_saved += cost(absolute)
+            return ""
+        if self.cursor is None:
+            self.cursor = (x, y)
+            counters.absolute_moves += 1
+            return absolute
+        cursor_x, cursor_y = self.cursor
+        options = [absolute]
+        if y == cursor_y:
+            options.append(self.moveHorizontal(cursor_x, x, row, row_attrs))
+        else:
+            if y == cursor_y + 1:
+                options.append("\r\n" + self.moveHorizontal(0, x, row, row_attrs))
+            if y > cursor_y and self.capabilities["cud"]:
+                options.append(
+                    self.sequence("cud", y - cursor_y) +
+                    self.moveHorizontal(cursor_x, x, None, None))
+            if y < cursor_y and self.capabilities["cuu"]:
+                options.append(
+                    self.sequence("cuu", cursor_y - y) +
+                    self.moveHorizontal(cursor_x, x, None, None))
+            if self.capabilities["vpa"]:
+                options.append(
+                    self.sequence("vpa", y) +
+                    self.moveHorizontal(cursor_x, x, None, None))
+        sequence = min(options, key=cost)
+        if sequence is absolute:
+            counters.absolute_moves += 1
+        else:
+            counters.relative_moves += 1
+            counters.bytes_saved += cost(absolute) - cost(sequence)
+        self.cursor = (x, y)
+        return sequence
+
+    def canErase(self, attr: str) -> bool:
+        "Whether erasing with attr leaves the same blanks as writing spaces"
+        state = parse(attr)
+        if state is None or not state.flags <= BLANK_SAFE_FLAGS:
+            return False
+        return state.bg is None or self.back_color_erase
+
+    def repeat(self, char: str, count: int) -> Optional[str]:
+        "char written count times using REP, None if it can't be encoded"
+        if len(char) != 1:
+            # REP repeats the last code point, not a whole cluster
+            return None
+        sequence = self.sequence("rep", ord("x"), count)
+        if not sequence.startswith("x"):
+            return None
+        return char + sequence[1:]
+
+    def eraseBlanks(self, x: int, start: int, end: int, run_end: int,
+                    width: int) -> Optional[Tuple[str, int]]:
+        """
+        ECH or EL clearing the blank cells [start, end) of a run at x, and
+        the column the cursor is left at. None when spaces are cheaper.
+        """
+        if x + end >= width and self.capabilities["el"]:
+            # Cursor stays put, nothing is drawn after the run
+            encoded, after = self.term.el, x + start
+        elif self.capabilities["ech"]:
+            # Erasing doesn't move the cursor either
+            encoded, after = self.sequence("ech", end - start), x + start
+            if end < run_end:
+                encoded += self.moveHorizontal(x + start, x + end, None, None)
+                after = x + end
+        else:
+            return None
+        if cost(encoded) >= end - start:
+            return None
+        self.counters.erases += 1
+        return encoded, after
+
+    def repeatChar(self, char: str, count: int) -> Optional[str]:
+        "REP writing char count times, None when writing it literally is cheaper"
+        encoded = self.repeat(char, count)
+        if encoded is None or cost(encoded) >= cost(char * count):
+            return None
+        self.counters.repeats += 1
+        return encoded
+
+    def encodeStretch(self, x: int, start: int, end: int, run: List[str],
+                      width: int, erasable: bool) -> Optional[Tuple[str, int]]:
+        """
+        Cheaper encoding than writing the equal cells [start, end) of run
+        literally, and the column the cursor is left at, if there's one
+        """
+        char = run[start]
+        count = end - start
+        if count > 1 and char == BLANK and erasable:
+            return self.eraseBlanks(x, start, end, len(run), width)
+        if count > 2 and self.capabilities["rep"]:
+            encoded = self.repeatChar(char, count)
+            if encoded is not None:
+                return encoded, x + end
+        return None
+
+    def writeRun(self, x: int, y: int, attr: str, run: List[str],
+                 width: int) -> str:
+        "Returns the output drawing run at (x, y), the cursor must already be there"
+        counters = self.counters
+        counters.runs += 1
+        output = [self.setPen(attr)]
+        erasable = ((self.capabilities["ech"] or self.capabilities["el"]) and
+                    self.canErase(attr))
+        literal: List[str] = []
+        cursor_x = x
+        i = 0
+        end = len(run)
+        while i < end:
+            j = i + 1
+            while j < end and run[j] == run[i]:
+                j += 1
+            text = run[i] * (j - i)
+            encoded = self.encodeStretch(x, i, j, run, width, erasable)
+            if encoded is None:
+                literal.append(text)
+                cursor_x = x + j
+            else:
+                output.append("".join(literal))
+                literal = []
+                output.append(encoded[0])
+                counters.bytes_saved += cost(text) - cost(encoded[0])
+                cursor_x = encoded[1]
+            i = j
+        output.append("".join(literal))
+        # Writing the last column leaves the cursor in a pending wrap state
+        self.cursor = None if cursor_x >= width else (cursor_x, y)
+        return "".join(output)
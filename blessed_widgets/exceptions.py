@@ -28,3 +28,15 @@ class InvalidLayout(Exception):
 
 class CellOutOfBounds(BorderOutOfBounds):
     pass
+
+
+class InvalidHandshake(Exception):
+    pass
+
+
+class BindingConflict(Exception):
+    pass
+
+
+class EmptyScreenStack(IndexError):
+    pass
@@ -1,6 +1,6 @@
 from __future__ import annotations
 import numpy as np
-from typing import Any, List, Optional, TypeVar, cast, overload
+from typing import Any, List, Optional, Sequence, TypeVar, cast, overload
 
 
 def gaussian(x, mean, std):
@@ -15,3 +15,16 @@ def getFirstAssigned(options: List[Optional[X]], default: X) -> X:
         if option:
             return option
     return default
+
+
+def stableOrder(values: Sequence, descending: bool = False) -> np.ndarray:
+    "Indexes sorting values, equal values keep their order in both directions"
+    if not isinstance(values, np.ndarray):
+        return np.array(sorted(range(len(values)),
+                               key=values.__getitem__,
+                               reverse=descending),
+                        dtype=np.intp)
+    if not descending:
+        return np.argsort(values, kind="stable")
+    # Sorts the reversed values so ties come out reversed, then undoes that
+    return len(values) - 1 - np.argsort(values[::-1], kind="stable")[::-1]
@@ -0,0 +1,91 @@
+from __future__ import annotations
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+# local
+from .exceptions import BindingConflict
+
+Keys = Union[str, Sequence[str]]
+
+
+def keyName(val) -> str:
+    "Name a keystroke is bound by, the sequence name or the lowercase character"
+    if val.is_sequence:
+        return val.name
+    return val.lower()
+
+
+def parseKeys(keys: Keys) -> Tuple[str, ...]:
+    "'g g' and ['g', 'g'] are the same chord, 'KEY_ENTER' names a sequence"
+    if isinstance(keys, str):
+        keys = keys.split() if keys.strip() and " " in keys else [keys]
+    if not keys:
+        raise BindingConflict("Can't bind an empty key sequence")
+    return tuple(key if key.startswith("KEY_") else key.lower()
+                 for key in keys)
+
+
+class KeymapNode():
+    "Key reached through a trie path, with the command of a complete chord"
+    __slots__ = ("children", "command")
+
+    def __init__(self) -> None:
+        self.children: Dict[str, KeymapNode] = {}
+        self.command: Optional[Callable] = None
+
+
+class Keymap():
+    """
+    Commands bound to key sequences, stored as a trie so each key is
+    resolved with one dict lookup however many bindings there are.
+    A sequence can't be bound and also start a longer chord.
+    """
+
+    def __init__(self) -> None:
+        self.root = KeymapNode()
+
+    def bind(self, keys: Keys, command: Callable) -> None:
+        sequence = parseKeys(keys)
+        node = self.root
+        for key in sequence[:-1]:
+            node = node.children.setdefault(key, KeymapNode())
+            if node.command is not None:
+                raise BindingConflict(
+                    f"{' '.join(sequence)!r} extends a bound key sequence")
+        node = node.children.setdefault(sequence[-1], KeymapNode())
+        if node.children:
+            raise BindingConflict(
+                f"{' '.join(sequence)!r} starts a bound key sequence")
+        node.command = command
+
+    def unbind(self, keys: Keys) -> None:
+        "Removes the binding and the trie nodes only it used"
+        path: List[Tuple[KeymapNode, str]] = []
+        node = self.root
+        for key in parseKeys(keys):
+            if key not in node.children:
+                return
+            path.append((node, key))
+            node = node.children[key]
+        node.command = None
+        for parent, key in reversed(path):
+            child = parent.children[key]
+            if child.children or child.command is not None:
+                break
+            del parent.children[key]
+
+    def getCommand(self, keys: Keys) -> Optional[Callable]:
+        node = self.root
+        for key in parseKeys(keys):
+            if key not in node.children:
+                return None
+            node = node.children[key]
+        return node.command
+
+    def __len__(self) -> int:
+        count = 0
+        nodes = [self.root]
+        while nodes:
+            node = nodes.pop()
+            count += node.command is not None
+            nodes.extend(node.children.values())
+        return count
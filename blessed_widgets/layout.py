@@ -0,0 +1,363 @@
+"""
+Builds screens from JSON layout files.
+
+A layout holds named styles, a tree of elements, navigation overrides and
+key bindings:
+
+    {
+        "styles": {"selected": {"bg_color": "on_white", "text_style": "black"}},
+        "elements": [
+            {"type": "AbsoluteFrame", "name": "base", "width": 39, "height": 23,
+             "style": {"bg_color": "on_gray14", "border_style": "SINGLE"},
+             "place": {"x": 15, "y": 3},
+             "elements": [
+                 {"type": "Button", "name": "clear", "width": 12, "height": 1,
+                  "text": "Clear", "command": "clearEntries",
+                  "selected_style": "selected", "place": {"x": 21, "y": 0}}
+             ]}
+        ],
+        "bindings": {"c": "clear.click"}
+    }
+
+Other element keys are passed to the widget's constructor. Colours are
+palette names, enums are given by member name and commands name either a
+method of an element ("clear.click") or an attribute of the handlers object.
+Elements are placed with "place", "grid" or "flex", "active": false leaves
+them hidden and "bind" maps keys to commands in the element's scope.
+"navigation" lists [element, direction, target] overrides.
+
+The compiled layout, with styles resolved to terminal sequences and the
+borders of placed elements computed, is cached next to the file and reused
+while the file, the terminal and the parent frame are unchanged.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# local
+from . import widgets
+from .constants import (BorderStyle, Direction, FlexAlignment, FlexDirection,
+                        HAlignment, VAlignment)
+from .exceptions import InvalidLayout
+from .widgets import Box, BoxStyle, Element, Frame, Point
+
+FORMAT_VERSION = 1
+CACHE_DIRECTORY = "__layoutcache__"
+STYLE_FIELDS = ("bg_color", "text_style", "border_color")
+STYLE_ARGUMENTS = ("style", "selected_style", "focused_style")
+COLOR_ARGUMENTS = ("header_style", "highlight_color")
+COMMAND_ARGUMENTS = ("command", "on_select_command")
+ENUM_ARGUMENTS = {
+    "h_align": HAlignment,
+    "v_align": VAlignment,
+    "direction": FlexDirection,
+    "justify": FlexAlignment,
+    "align": FlexAlignment
+}
+LAYOUT_METHODS = ("place", "grid", "flex")
+RESERVED_KEYS = ("type", "name", "elements", "active", "bind") + LAYOUT_METHODS
+
+
+def getElementType(name: str) -> type:
+    element_type = getattr(widgets, name, None)
+    if not isinstance(element_type, type) or not issubclass(
+            element_type, Element):
+        raise InvalidLayout(f"Unknown element type {name!r}")
+    return element_type
+
+
+def getEnum(enum: type, name: str) -> Any:
+    try:
+        return enum[name]
+    except KeyError:
+        raise InvalidLayout(f"{name!r} is not a member of {enum.__name__}")
+
+
+class LayoutCompiler():
+    """
+    Flattens the element tree of a layout file into entries in creation
+    order and resolves its styles with the window's palette.
+    """
+
+    def __init__(self, window: widgets.Window, source: dict) -> None:
+        self.palette = window.palette
+        self.named_styles = source.get("styles", {})
+        self.styles: List[list] = []
+        self.style_indices: Dict[str, int] = {}
+        self.entries: List[dict] = []
+        self.names: Dict[str, int] = {}
+        self.source = source
+
+    def resolveColor(self, name: Optional[str]) -> Optional[str]:
+        return getattr(self.palette, name) if name else None
+
+    def compileStyle(self, spec: Any) -> int:
+        "Index of the style in the styles table, named styles are resolved once"
+        if isinstance(spec, str):
+            if spec not in self.style_indices:
+                if spec not in self.named_styles:
+                    raise InvalidLayout(f"Unknown style {spec!r}")
+                self.style_indices[spec] = self.compileStyle(
+                    self.named_styles[spec])
+            return self.style_indices[spec]
+        if not isinstance(spec, dict):
+            raise InvalidLayout(f"Invalid style {spec!r}")
+        border_style = spec.get("border_style")
+        if border_style is not None:
+            getEnum(BorderStyle, border_style)
+        self.styles.append(
+            [self.resolveColor(spec.get(field)) for field in STYLE_FIELDS] +
+            [border_style])
+        return len(self.styles) - 1
+
+    def compileArguments(self, spec: dict) -> Tuple[dict, Dict[str, int]]:
+        "Constructor arguments of an element and its styles' table indices"
+        args: Dict[str, Any] = {}
+        styles: Dict[str, int] = {}
+        for key, value in spec.items():
+            if key in RESERVED_KEYS:
+                continue
+            if key in STYLE_ARGUMENTS:
+                styles[key] = self.compileStyle(value)
+            elif key in COLOR_ARGUMENTS:
+                args[key] = self.resolveColor(value)
+            else:
+                if key in ENUM_ARGUMENTS:
+                    getEnum(ENUM_ARGUMENTS[key], value)
+                args[key] = value
+        return args, styles
+
+    def addName(self, name: Optional[str]) -> None:
+        "Names the entry compiled next"
+        if name is None:
+            return
+        if name in self.names:
+            raise InvalidLayout(f"Element name {name!r} is used twice")
+        self.names[name] = len(self.entries)
+
+    def compileElement(self, spec: dict, parent: Optional[int]) -> None:
+        element_type = getElementType(spec.get("type", ""))
+        args, styles = self.compileArguments(spec)
+        layout = None
+        for method in LAYOUT_METHODS:
+            if method in spec:
+                layout = [method, spec[method]]
+        name = spec.get("name")
+        self.addName(name)
+        self.entries.append({
+            "type": element_type.__name__,
+            "name": name,
+            "parent": parent,
+            "args": args,
+            "styles": styles,
+            "layout": layout,
+            "active": spec.get("active", True),
+            "bind": spec.get("bind", {}),
+            "border": None
+        })
+        index = len(self.entries) - 1
+        children = spec.get("elements", [])
+        if children and not issubclass(element_type, Frame):
+            raise InvalidLayout(f"{element_type.__name__} can't hold elements")
+        for child in children:
+            self.compileElement(child, index)
+
+    def compile(self) -> dict:
+        for spec in self.source.get("elements", []):
+            self.compileElement(spec, None)
+        for source, direction, target in self.source.get("navigation", []):
+            getEnum(Direction, direction)
+            for name in (source, target):
+                if name not in self.names:
+                    raise InvalidLayout(f"Unknown element {name!r}")
+        return {
+            "version": FORMAT_VERSION,
+            "styles": self.styles,
+            "elements": self.entries,
+            "navigation": self.source.get("navigation", []),
+            "bindings": self.source.get("bindings", {})
+        }
+
+
+class LayoutBuilder():
+    """
+    Creates the elements of a compiled layout under parent. Elements are
+    placed without drawing and the top level ones are drawn once at the end.
+    Borders computed while placing are stored back into the compiled layout.
+    """
+
+    def __init__(self, parent: Frame, compiled: dict,
+                 handlers: Any = None) -> None:
+        self.parent = parent
+        self.compiled = compiled
+        self.handlers = handlers
+        self.styles = [
+            BoxStyle(bg_color, text_style, border_color,
+                     BorderStyle[border_style] if border_style else None)
+            for bg_color, text_style, border_color, border_style in
+            compiled["styles"]
+        ]
+        self.created: List[Element] = []
+        self.elements: Dict[str, Element] = {}
+
+    def getCommand(self, name: str) -> Callable:
+        element_name, _, method = name.partition(".")
+        if method and element_name in self.elements:
+            command = getattr(self.elements[element_name], method, None)
+        else:
+            command = getattr(self.handlers, name, None)
+        if not callable(command):
+            raise InvalidLayout(f"Unknown command {name!r}")
+        return command
+
+    def createElement(self, entry: dict) -> Element:
+        kwargs = dict(entry["args"])
+        for key, value in kwargs.items():
+            if key in ENUM_ARGUMENTS:
+                kwargs[key] = ENUM_ARGUMENTS[key][value]
+            elif key in COMMAND_ARGUMENTS:
+                kwargs[key] = self.getCommand(value)
+        for key, index in entry["styles"].items():
+            kwargs[key] = self.styles[index]
+        parent = (self.parent if entry["parent"] is None else
+                  self.created[entry["parent"]])
+        return getElementType(entry["type"])(parent, **kwargs)
+
+    def placeElement(self, element: Element, entry: dict) -> None:
+        if entry["layout"] is None:
+            return
+        method, args = entry["layout"]
+        if method == "flex":
+            if "align" in args:
+                args = dict(args, align=FlexAlignment[args["align"]])
+            element.flex(**args)
+        elif type(element).place is not Element.place:
+            # Composite widgets place their parts themselves
+            getattr(element, method)(**args, draw=False)
+        elif entry["border"] is not None:
+            x1, y1, x2, y2 = entry["border"]
+            assert (isinstance(element.parent, Frame))
+            element.parent.restoreElement(element,
+                                          Box(Point(x1, y1), Point(x2, y2)),
+                                          tuple(entry["layout_args"]))
+            element.activate(draw=False)
+        else:
+            getattr(element, method)(**args, draw=False)
+            assert (element.border is not None and
+                    element.layout_args is not None)
+            entry["border"] = [
+                element.border.p1.x, element.border.p1.y, element.border.p2.x,
+                element.border.p2.y
+            ]
+            entry["layout_args"] = list(element.layout_args)
+
+    def build(self) -> Dict[str, Element]:
+        "Returns the named elements"
+        window = self.parent.getWindow()
+        with window.deferFlush():
+            for entry in self.compiled["elements"]:
+                element = self.createElement(entry)
+                self.created.append(element)
+                if entry["name"] is not None:
+                    self.elements[entry["name"]] = element
+                self.placeElement(element, entry)
+            for element, entry in zip(self.created, self.compiled["elements"]):
+                for keys, command in entry["bind"].items():
+                    element.bind(keys, self.getCommand(command))
+                if not entry["active"] and element.isPlaced():
+                    element.active = False
+                    window.geometry.setActive(element.slot, False)
+            for source, direction, target in self.compiled["navigation"]:
+                self.elements[source].overrideNavigation(
+                    Direction[direction], self.elements[target])
+            for keys, command in self.compiled["bindings"].items():
+                window.bind(keys, self.getCommand(command))
+            for element, entry in zip(self.created, self.compiled["elements"]):
+                if (entry["parent"] is None and element.isPlaced() and
+                        element.isActive()):
+                    element.draw()
+        return self.elements
+
+
+def getCachePath(path: str, source: bytes, parent: Frame,
+                 cache_dir: Optional[str]) -> Tuple[str, str]:
+    """
+    Path of the compiled layout and the prefix shared by every compiled
+    version of the same source. The key covers what the compiled form
+    depends on: the source, the terminal's sequences and size and where
+    the parent frame is.
+    """
+    window = parent.getWindow()
+    term = window.term
+    border = parent.getBorder()
+    environment = (FORMAT_VERSION, term.kind, term.number_of_colors,
+                   term.does_styling, term.width, term.height, border.left,
+                   border.top, border.right, border.bottom)
+    source_key = hashlib.sha256(source).hexdigest()[:16]
+    environment_key = hashlib.sha256(
+        repr(environment).encode()).hexdigest()[:16]
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)),
+                                 CACHE_DIRECTORY)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    prefix = os.path.join(cache_dir, f"{stem}.{source_key}.")
+    return prefix + f"{environment_key}.json", prefix
+
+
+def readCompiled(cache_path: str) -> Optional[dict]:
+    try:
+        with open(cache_path, encoding="utf-8") as file:
+            compiled = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if compiled.get("version") != FORMAT_VERSION:
+        return None
+    return compiled
+
+
+def writeCompiled(cache_path: str, prefix: str, compiled: dict) -> None:
+    "Replaces the file atomically and removes versions compiled from older sources"
+    directory = os.path.dirname(cache_path)
+    stem = os.path.basename(prefix).rsplit(".", 2)[0]
+    try:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.rsplit(".", 3)[0] == stem and not path.startswith(prefix):
+                os.remove(path)
+        descriptor, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(descriptor, "w", encoding="utf-8") as file:
+            json.dump(compiled, file, separators=(",", ":"))
+        os.replace(temporary, cache_path)
+    except OSError:
+        # Caching is an optimization, read only locations still load
+        pass
+
+
+def loadLayout(parent: Frame,
+               path: str,
+               handlers: Any = None,
+               cache_dir: Optional[str] = None,
+               use_cache: bool = True) -> Dict[str, Element]:
+    """
+    Creates the elements of the layout file in parent and returns them by
+    name. Commands are looked up on handlers.
+    """
+    with open(path, "rb") as file:
+        source = file.read()
+    cache_path, prefix = getCachePath(path, source, parent, cache_dir)
+    compiled = readCompiled(cache_path) if use_cache else None
+    fresh = compiled is None
+    if compiled is None:
+        try:
+            specification = json.loads(source)
+        except ValueError as error:
+            raise InvalidLayout(f"{path} isn't valid JSON: {error}")
+        compiled = LayoutCompiler(parent.getWindow(), specification).compile()
+    elements = LayoutBuilder(parent, compiled, handlers).build()
+    if fresh and use_cache:
+        writeCompiled(cache_path, prefix, compiled)
+    return elements
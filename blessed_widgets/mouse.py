@@ -0,0 +1,88 @@
+from __future__ import annotations
+import re
+from typing import Optional
+
+# 3rd party
+from blessed import Terminal
+
+# local
+from .constants import MouseAction, MouseButton
+
+# xterm private modes: button tracking, any-motion tracking, SGR extended coordinates
+BUTTON_TRACKING = "\x1b[?1000h"
+MOTION_TRACKING = "\x1b[?1003h"
+SGR_ENCODING = "\x1b[?1006h"
+
+SGR_PREFIX = "\x1b[<"
+SGR_REPORT = re.compile(r"\x1b\[<(\d+);(\d+);(\d+)([Mm])")
+MAX_REPORT_LENGTH = 20
+
+
+class MouseEvent():
+    __slots__ = ("action", "button", "x", "y", "shift", "meta", "ctrl")
+
+    def __init__(self, action: MouseAction, button: MouseButton, x: int,
+                 y: int, shift: bool = False, meta: bool = False,
+                 ctrl: bool = False) -> None:
+        self.action = action
+        self.button = button
+        self.x = x
+        self.y = y
+        self.shift = shift
+        self.meta = meta
+        self.ctrl = ctrl
+
+    def __str__(self) -> str:
+        return f"{self.action.name} {self.button.name} ({self.x},{self.y})"
+
+    @classmethod
+    def fromSGR(cls, report: str) -> Optional[MouseEvent]:
+        "Decodes a single SGR 1006 report, coordinates are made 0 based"
+        match = SGR_REPORT.fullmatch(report)
+        if match is None:
+            return None
+        code, x, y = int(match[1]), int(match[2]) - 1, int(match[3]) - 1
+        shift, meta, ctrl = bool(code & 4), bool(code & 8), bool(code & 16)
+        if code & 64:
+            action = MouseAction.WHEEL_DOWN if code & 1 else MouseAction.WHEEL_UP
+            return cls(action, MouseButton.NONE, x, y, shift, meta, ctrl)
+        button = MouseButton(code & 3)
+        if code & 32:
+            action = MouseAction.MOTION
+        elif match[4] == "m":
+            action = MouseAction.RELEASE
+        else:
+            action = MouseAction.PRESS
+        return cls(action, button, x, y, shift, meta, ctrl)
+
+
+def enableSequence(motion: bool) -> str:
+    return BUTTON_TRACKING + (MOTION_TRACKING if motion else "") + SGR_ENCODING
+
+
+def disableSequence(motion: bool) -> str:
+    return enableSequence(motion).replace("h", "l")
+
+
+def readMouseEvent(term: Terminal, val) -> Optional[MouseEvent]:
+    """
+    Completes an SGR mouse report whose prefix was returned by inkey.
+    blessed only recognises the leading escape of a report, so the rest is read
+    from the input buffer. Anything which turns out not to be a report is pushed back.
+    """
+    prefix = str(val)
+    if not prefix or not (SGR_PREFIX.startswith(prefix) or
+                          prefix.startswith(SGR_PREFIX)):
+        return None
+    report = prefix
+    while len(report) < MAX_REPORT_LENGTH and report[-1] not in "Mm":
+        key = term.inkey(timeout=0)
+        if not key:
+            break
+        report += str(key)
+        if len(report) >= len(SGR_PREFIX) and not report.startswith(SGR_PREFIX):
+            break
+    event = MouseEvent.fromSGR(report)
+    if event is None:
+        term.ungetch(report[len(prefix):])
+    return event
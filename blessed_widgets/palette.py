@@ -0,0 +1,65 @@
+from __future__ import annotations
+import re
+from typing import Dict, Tuple
+
+# 3rd party
+from blessed import Terminal
+
+
+class Palette():
+    """
+    Resolves named colours and formatting attributes, e.g. palette.on_white,
+    once per terminal capability level. Terminals of the same kind, number of
+    colours and styling support share the resolved strings.
+    """
+    caches: Dict[Tuple[str, int, bool], Dict[str, str]] = {}
+    # Resolved string -> name, per capability level
+    name_caches: Dict[Tuple[str, int, bool], Dict[str, str]] = {}
+
+    def __init__(self, term: Terminal) -> None:
+        self.term = term
+        self.key = (term.kind, term.number_of_colors, term.does_styling)
+        self.cache = Palette.caches.setdefault(self.key, {})
+        self.names = Palette.name_caches.setdefault(self.key, {})
+        # (source key, attribute) -> attribute, see convert
+        self.conversions: Dict[Tuple[Tuple[str, int, bool], str], str] = {}
+
+    def __getattr__(self, name: str) -> str:
+        "Only reached on the first lookup of each name"
+        if name.startswith("_"):
+            raise AttributeError(name)
+        value = self.cache.get(name)
+        if value is None:
+            value = getattr(self.term, name)
+            self.cache[name] = value
+        if value:
+            self.names.setdefault(value, name)
+        # Later lookups are plain instance attribute reads
+        self.__dict__[name] = value
+        return value
+
+    def convert(self, attr: str, source: Palette) -> str:
+        """
+        Resolves an attribute made of strings source resolved with this
+        palette, e.g. for a client whose terminal differs from the window's.
+        Sequences source never resolved are kept as they are.
+        """
+        key = (source.key, attr)
+        converted = self.conversions.get(key)
+        if converted is None:
+            pieces = re.split("(?=\x1b)", attr)
+            parts = []
+            start = 0
+            while start < len(pieces):
+                # Longest run of sequences that is one named attribute
+                for end in range(len(pieces), start, -1):
+                    name = source.names.get("".join(pieces[start:end]))
+                    if name is not None:
+                        parts.append(getattr(self, name))
+                        break
+                else:
+                    end = start + 1
+                    parts.append(pieces[start])
+                start = end
+            converted = self.conversions[key] = "".join(parts)
+        return converted
@@ -0,0 +1,179 @@
+from __future__ import annotations
+import gzip
+import json
+import time
+from typing import IO, Callable, Dict, List, Optional
+
+# 3rd party
+import numpy as np
+from blessed.keyboard import Keystroke
+
+# local
+from .constants import MouseAction, MouseButton, Response
+from .mouse import MouseEvent
+
+FORMAT_VERSION = 1
+PERCENTILES = (50, 90, 99)
+# Curses codes of the sequences widgets handle, for scripted input
+KEY_CODES = {"KEY_UP": 259, "KEY_DOWN": 258, "KEY_LEFT": 260, "KEY_RIGHT": 261,
+             "KEY_ENTER": 343, "KEY_ESCAPE": 361, "KEY_BACKSPACE": 263,
+             "KEY_PGUP": 339, "KEY_PGDOWN": 338, "KEY_HOME": 262,
+             "KEY_END": 360}
+
+
+def openRecording(path: str, mode: str) -> IO[str]:
+    "Recordings ending with .gz are compressed"
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def encodeEvent(event) -> list:
+    if isinstance(event, MouseEvent):
+        return [
+            "m", event.action.name, event.button.value, event.x, event.y,
+            int(event.shift) | int(event.meta) << 1 | int(event.ctrl) << 2
+        ]
+    return ["k", str(event), event.code, event.name]
+
+
+def keystroke(name: str) -> Keystroke:
+    "Keystroke of a sequence named in KEY_CODES, or of a character"
+    if name in KEY_CODES:
+        return Keystroke("\x1b", KEY_CODES[name], name)
+    return Keystroke(name)
+
+
+def decodeEvent(fields: list):
+    if fields[0] == "m":
+        _, action, button, x, y, modifiers = fields
+        return MouseEvent(MouseAction[action], MouseButton(button), x, y,
+                          shift=bool(modifiers & 1),
+                          meta=bool(modifiers & 2),
+                          ctrl=bool(modifiers & 4))
+    _, ucs, code, name = fields
+    return Keystroke(ucs, code, name)
+
+
+class Recorder():
+    """
+    Writes the events a Window handles to a file, one JSON array per line
+    holding the milliseconds since the previous event and the event.
+    Used as a context manager around Window.loop.
+    """
+
+    def __init__(self,
+                 window,
+                 path: str,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.window = window
+        self.path = path
+        self.clock = clock
+        self.file: Optional[IO[str]] = None
+        self.last = 0.0
+
+    def start(self) -> None:
+        self.file = openRecording(self.path, "w")
+        header = {
+            "version": FORMAT_VERSION,
+            "width": self.window.term.width,
+            "height": self.window.term.height
+        }
+        self.file.write(json.dumps(header) + "\n")
+        self.last = self.clock()
+        self.window.recorder = self
+
+    def stop(self) -> None:
+        self.window.recorder = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def record(self, event) -> None:
+        if self.file is None or not event:
+            return
+        now = self.clock()
+        delay = round((now - self.last) * 1000)
+        self.last = now
+        self.file.write(
+            json.dumps([delay] + encodeEvent(event), separators=(",", ":")) +
+            "\n")
+
+    def __enter__(self) -> Recorder:
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def readRecording(path: str) -> List[tuple]:
+    "Returns (delay in seconds, event) pairs"
+    with openRecording(path, "r") as file:
+        header = json.loads(file.readline())
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported recording version {header!r}")
+        events = []
+        for line in file:
+            fields = json.loads(line)
+            events.append((fields[0] / 1000, decodeEvent(fields[1:])))
+    return events
+
+
+class ReplayReport():
+    "Handling latency of every replayed event, in seconds"
+
+    def __init__(self, names: List[str], latencies: List[float]) -> None:
+        self.names = names
+        self.latencies = np.array(latencies)
+
+    def percentile(self, p: float) -> float:
+        if not len(self.latencies):
+            return 0.0
+        return float(np.percentile(self.latencies, p))
+
+    def getSummary(self) -> Dict[str, float]:
+        summary = {"events": len(self.latencies)}
+        if len(self.latencies):
+            summary["total"] = float(self.latencies.sum())
+            for p in PERCENTILES:
+                summary[f"p{p}"] = self.percentile(p)
+            summary["max"] = float(self.latencies.max())
+        return summary
+
+    def getSlowest(self, count: int = 5) -> List[tuple]:
+        "(event name, latency) of the slowest events"
+        order = np.argsort(self.latencies)[::-1][:count]
+        return [(self.names[i], float(self.latencies[i])) for i in order]
+
+    def __str__(self) -> str:
+        summary = self.getSummary()
+        parts = [f"{summary['events']} events"]
+        for key, value in summary.items():
+            if key != "events":
+                parts.append(f"{key} {value * 1000:.3f} ms")
+        return ", ".join(parts)
+
+
+def replay(window,
+           path: str,
+           speed: Optional[float] = None,
+           clock: Callable[[], float] = time.perf_counter,
+           sleep: Callable[[float], None] = time.sleep) -> ReplayReport:
+    """
+    Feeds a recording to window.handleEvent, at speed times the original
+    pace, or as fast as possible if speed is None. Stops at Response.QUIT.
+    """
+    names: List[str] = []
+    latencies: List[float] = []
+    for delay, event in readRecording(path):
+        if speed:
+            sleep(delay / speed)
+        start = clock()
+        res = window.handleEvent(event)
+        latencies.append(clock() - start)
+        names.append(str(event) if isinstance(event, MouseEvent) else
+                     (event.name or str(event)))
+        if res is Response.QUIT:
+            break
+    return ReplayReport(names, latencies)
@@ -0,0 +1,422 @@
+from __future__ import annotations
+import codecs
+import io
+import os
+import re
+import select
+import selectors
+import socket
+import sys
+from functools import partial
+from typing import Dict, List, Optional, Set, Tuple
+
+# 3rd party
+from blessed import Terminal
+
+# local
+from .canvas import View
+from .constants import (IDLE_TIMEOUT, MAX_SESSION_BACKLOG,
+                        RESIZE_POLL_INTERVAL, SESSION_READ_SIZE, Response,
+                        State, WindowState)
+from .exceptions import InvalidHandshake
+from .keymap import KeymapNode
+from .mouse import disableSequence, enableSequence, readMouseEvent
+from .palette import Palette
+from .widgets import Focusable, Interactable, Visible, Window
+
+# Size report as xterm answers CSI 18 t with, rows first
+SIZE_REPORT = re.compile(r"\x1b\[8;(\d+);(\d+)t")
+PARTIAL_SIZE_REPORT = re.compile(r"\x1b\[8(;\d*){0,2}$")
+# States each session keeps to itself
+HIGHLIGHTS = (State.SELECTED, State.FOCUSED)
+
+
+class Session():
+    """
+    Client connected to a SessionServer. It has its own terminal kind and
+    size, focus, highlights and output stream, while the widgets are shared.
+    The client starts with a "<kind> <width> <height>" line, then sends
+    its input, with size reports in between whenever it's resized.
+    """
+
+    def __init__(self, server: SessionServer,
+                 connection: socket.socket) -> None:
+        self.server = server
+        self.connection = connection
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.received = ""
+        self.pending = bytearray()
+        self.term: Optional[Terminal] = None
+        self.view: Optional[View] = None
+        self.window_state = WindowState.VIEW
+        self.active_element: Optional[Interactable] = None
+        self.pending_chord: Optional[KeymapNode] = None
+        # Selected and focused elements, only drawn in this session's view
+        self.highlights: Dict[Visible, State] = {}
+        self.highlights_changed = False
+        self.palette: Optional[Palette] = None
+        self.closed = False
+
+    def isReady(self) -> bool:
+        return self.view is not None
+
+    def start(self, handshake: str) -> None:
+        try:
+            kind, width, height = handshake.split()
+            size = (int(width), int(height))
+        except ValueError:
+            raise InvalidHandshake(f"Expected '<kind> <width> <height>', got "
+                                   f"{handshake!r}")
+        self.term = Terminal(kind=kind,
+                             stream=io.StringIO(),
+                             force_styling=True)
+        window = self.server.window
+        self.view = window.compositor.addView(
+            View(window.compositor,
+                 self.term,
+                 *size,
+                 write=self.send,
+                 auto_flush=False))
+        self.palette = Palette(self.term)
+        if self.palette.key != window.palette.key:
+            self.view.convert = partial(self.palette.convert,
+                                        source=window.palette)
+        if window.mouse:
+            self.send(enableSequence(window.mouse_motion))
+        self.view.clear()
+        self.view.repaint()
+
+    def feed(self, data: bytes) -> None:
+        "Buffers received bytes as input, applying size reports right away"
+        self.received += self.decoder.decode(data)
+        if not self.isReady():
+            handshake, newline, rest = self.received.partition("\n")
+            if not newline:
+                return
+            self.start(handshake)
+            self.received = rest
+        for match in SIZE_REPORT.finditer(self.received):
+            self.resize(int(match.group(2)), int(match.group(1)))
+        text = SIZE_REPORT.sub("", self.received)
+        # Hold back a size report cut in half
+        partial = PARTIAL_SIZE_REPORT.search(text)
+        if partial:
+            self.received = text[partial.start():]
+            text = text[:partial.start()]
+        else:
+            self.received = ""
+        if text:
+            assert (self.term is not None)
+            self.term.ungetch(text)
+
+    def readEvents(self) -> List:
+        "Resolves the buffered input into keystrokes and mouse events"
+        if self.term is None:
+            return []
+        events: List = []
+        val = self.term.inkey(timeout=0)
+        while val:
+            if self.server.window.mouse:
+                events.append(readMouseEvent(self.term, val) or val)
+            else:
+                events.append(val)
+            val = self.term.inkey(timeout=0)
+        return events
+
+    def resize(self, width: int, height: int) -> None:
+        assert (self.view is not None)
+        if (width, height) == (self.view.width, self.view.height):
+            return
+        self.view.resize(width, height)
+        self.view.clear()
+        self.view.repaint()
+
+    def send(self, output: str) -> None:
+        self.pending += output.encode("utf-8")
+        self.sendPending()
+
+    def sendPending(self) -> None:
+        try:
+            sent = self.connection.send(self.pending)
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            # Dropped by the server on its next flush
+            self.closed = True
+            sent = len(self.pending)
+        del self.pending[:sent]
+
+    def isBacklogged(self) -> bool:
+        return len(self.pending) > MAX_SESSION_BACKLOG
+
+    def keepHighlights(self, changed: Set[Visible]) -> None:
+        """
+        Takes the highlights set while handling an event off the shared
+        widgets, which are drawn without them again
+        """
+        highlights = {
+            element: element.state
+            for element in changed if element.state in HIGHLIGHTS
+        }
+        if highlights != self.highlights:
+            self.highlights_changed = True
+        self.highlights = highlights
+        for element in highlights:
+            element.state = State.IDLE
+        for element in highlights:
+            if element.isPlaced() and element.isShown():
+                element.draw()
+
+    def drawHighlights(self) -> None:
+        "Draws the highlighted elements into the overlays of the view"
+        assert (self.view is not None)
+        self.view.clearOverlays()
+        self.highlights_changed = False
+        shown = [
+            element for element in self.highlights
+            if element.isPlaced() and element.isShown()
+        ]
+        if not shown:
+            return
+        shared = {element: element.state for element in shown}
+        compositor = self.server.window.compositor
+        compositor.overlay_view = self.view
+        try:
+            for element in shown:
+                element.state = self.highlights[element]
+            for element in shown:
+                element.draw()
+        finally:
+            compositor.overlay_view = None
+            for element, state in shared.items():
+                element.state = state
+
+
+class SessionServer():
+    """
+    Serves one Window to every client connected to a Unix socket.
+    The widgets are laid out and drawn once, into layers shared by all the
+    sessions, and every session diffs them against its own terminal.
+    Sessions which can't keep up skip frames, their next one covers all
+    the cells which changed in between.
+    """
+
+    def __init__(self,
+                 window: Window,
+                 path: str,
+                 width: Optional[int] = None,
+                 height: Optional[int] = None) -> None:
+        self.window = window
+        self.path = path
+        self.sessions: Dict[socket.socket, Session] = {}
+        self.selector = selectors.DefaultSelector()
+        self.listener: Optional[socket.socket] = None
+        self.running = False
+        # Nothing is shown on the terminal the server runs in
+        compositor = window.compositor
+        if compositor.view is not None:
+            compositor.removeView(compositor.view)
+        if width and height:
+            window.resize(width, height)
+
+    def listen(self) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.path)
+        self.listener.listen()
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ)
+
+    def serve(self) -> None:
+        "Handles clients until stop is called"
+        self.listen()
+        self.window.draw()
+        self.running = True
+        try:
+            while self.running:
+                timeout = self.window.capTimeout(IDLE_TIMEOUT)
+                for key, mask in self.selector.select(timeout=timeout):
+                    if key.data is None:
+                        self.accept()
+                        continue
+                    session = key.data
+                    if mask & selectors.EVENT_WRITE:
+                        session.sendPending()
+                    if mask & selectors.EVENT_READ:
+                        self.receive(session)
+                if self.window.runTimers() is Response.QUIT:
+                    self.stop()
+                if self.window.runTasks() is Response.QUIT:
+                    self.stop()
+                self.window.applyBindings()
+                self.window.checkTrim()
+                self.flush()
+        finally:
+            self.close()
+
+    def stop(self) -> None:
+        self.running = False
+
+    def accept(self) -> None:
+        assert (self.listener is not None)
+        try:
+            connection, _ = self.listener.accept()
+        except BlockingIOError:
+            return
+        connection.setblocking(False)
+        session = Session(self, connection)
+        self.sessions[connection] = session
+        self.selector.register(connection, selectors.EVENT_READ, session)
+
+    def receive(self, session: Session) -> None:
+        try:
+            data = session.connection.recv(SESSION_READ_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self.disconnect(session)
+            return
+        try:
+            session.feed(data)
+        except InvalidHandshake:
+            self.disconnect(session)
+            return
+        for event in session.readEvents():
+            if self.dispatch(session, event) is Response.QUIT:
+                self.disconnect(session)
+                return
+
+    def dispatch(self, session: Session, event) -> Response:
+        "Handles the event with the focus of the session it came from"
+        window = self.window
+        hidden = self.hidePopups(session)
+        changed: Set[Visible] = set()
+        window.state_changes = changed
+        for element, state in session.highlights.items():
+            # Elements removed since are dropped from the highlights
+            if element.isPlaced():
+                element.state = state
+        window.window_state = session.window_state
+        window.active_element = session.active_element
+        window.pending_chord = session.pending_chord
+        try:
+            if (window.window_state is WindowState.SELECTION and
+                    window.active_element in hidden):
+                # Another session opened it since
+                window.clearSelection()
+            return window.handleEvent(event)
+        finally:
+            window.state_changes = None
+            session.window_state = window.window_state
+            session.active_element = window.active_element
+            session.pending_chord = window.pending_chord
+            window.window_state = WindowState.VIEW
+            window.active_element = None
+            window.pending_chord = None
+            session.keepHighlights(changed)
+            for element in hidden:
+                # Unless the event closed it
+                if element.inactive_since is None:
+                    element.setReachable(True)
+
+    def getOtherPopups(self,
+                       session: Session) -> List[Tuple[Focusable, Visible]]:
+        "Elements other sessions focus which have a popup open, with the popup"
+        popups = []
+        for other in self.sessions.values():
+            if other is session:
+                continue
+            for element, state in other.highlights.items():
+                if state is not State.FOCUSED:
+                    continue
+                assert (isinstance(element, Focusable))
+                popup = element.getPopup()
+                if popup is not None and popup.isActive():
+                    popups.append((element, popup))
+        return popups
+
+    def hidePopups(self, session: Session) -> List[Visible]:
+        """
+        Leaves the popups other sessions opened, and the elements which opened
+        them, out of the session's input
+        """
+        hidden: List[Visible] = []
+        for element, popup in self.getOtherPopups(session):
+            hidden += [element, popup]
+        for element in hidden:
+            element.setReachable(False)
+        return hidden
+
+    def flush(self) -> None:
+        "Sends every session the cells changed since its last frame"
+        for session in list(self.sessions.values()):
+            view = session.view
+            if view is not None and not session.isBacklogged():
+                view.hideLayers({
+                    popup.layer
+                    for _, popup in self.getOtherPopups(session)
+                    if popup.layer is not None
+                })
+                if view.dirty or session.highlights_changed:
+                    session.drawHighlights()
+                view.flush()
+            if session.closed:
+                self.disconnect(session)
+                continue
+            events = selectors.EVENT_READ
+            if session.pending:
+                events |= selectors.EVENT_WRITE
+            self.selector.modify(session.connection, events, session)
+
+    def disconnect(self, session: Session) -> None:
+        if session.view is not None:
+            self.window.compositor.removeView(session.view)
+        self.selector.unregister(session.connection)
+        del self.sessions[session.connection]
+        session.connection.close()
+
+    def close(self) -> None:
+        self.window.tasks.shutdown()
+        for session in list(self.sessions.values()):
+            self.disconnect(session)
+        if self.listener is not None:
+            self.selector.unregister(self.listener)
+            self.listener.close()
+            self.listener = None
+            os.unlink(self.path)
+
+
+def attach(path: str, term: Optional[Terminal] = None) -> None:
+    "Shows the Window served on path in this terminal, until either side quits"
+    term = term or Terminal()
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.connect(path)
+    connection.sendall(f"{term.kind} {term.width} {term.height}\n".encode())
+    size = (term.width, term.height)
+    stdin, stdout = sys.stdin.fileno(), sys.stdout.fileno()
+    with term.cbreak(), term.fullscreen(), term.hidden_cursor():
+        try:
+            while True:
+                if (term.width, term.height) != size:
+                    size = (term.width, term.height)
+                    connection.sendall(
+                        f"\x1b[8;{size[1]};{size[0]}t".encode())
+                readable, _, _ = select.select([stdin, connection], [], [],
+                                               RESIZE_POLL_INTERVAL)
+                if connection in readable:
+                    data = connection.recv(SESSION_READ_SIZE)
+                    if not data:
+                        break
+                    while data:
+                        data = data[os.write(stdout, data):]
+                if stdin in readable:
+                    data = os.read(stdin, SESSION_READ_SIZE)
+                    if not data:
+                        break
+                    connection.sendall(data)
+        finally:
+            connection.close()
+            os.write(stdout, disableSequence(True).encode())
@@ -0,0 +1,158 @@
+from __future__ import annotations
+import re
+from typing import Callable, Dict, FrozenSet, List, NamedTuple, Optional
+
+SGR_PATTERN = re.compile(r"\x1b\[([0-9;]*)m")
+
+FLAGS = frozenset((1, 2, 3, 4, 5, 7, 8, 9))
+# Code turning off each flag, 22 turns off both bold and dim
+FLAG_OFF = {1: 22, 2: 22, 3: 23, 4: 24, 5: 25, 7: 27, 8: 28, 9: 29}
+OFF_FLAGS = {22: (1, 2), 23: (3, ), 24: (4, ), 25: (5, ), 27: (7, ),
+             28: (8, ), 29: (9, )}
+
+
+class SGRState(NamedTuple):
+    "Rendition set by SGR sequences, colours are kept as their parameters"
+    fg: Optional[str] = None
+    bg: Optional[str] = None
+    flags: FrozenSet[int] = frozenset()
+
+    def getParameters(self) -> List[str]:
+        parameters = [str(flag) for flag in sorted(self.flags)]
+        if self.fg:
+            parameters.append(self.fg)
+        if self.bg:
+            parameters.append(self.bg)
+        return parameters
+
+
+NORMAL_STATE = SGRState()
+
+parsed: Dict[str, Optional[SGRState]] = {}
+
+
+def parse(attr: str) -> Optional[SGRState]:
+    """
+    Returns the rendition attr leaves behind when written after a reset,
+    None if it contains anything besides understood SGR sequences
+    """
+    if attr in parsed:
+        return parsed[attr]
+    state: Optional[SGRState] = NORMAL_STATE
+    position = 0
+    for match in SGR_PATTERN.finditer(attr):
+        if match.start() != position or state is None:
+            state = None
+            break
+        state = apply(state, match.group(1))
+        position = match.end()
+    if position != len(attr):
+        state = None
+    parsed[attr] = state
+    return state
+
+
+class Pen():
+    "Mutable rendition updated code by code while applying a sequence"
+    __slots__ = ("fg", "bg", "flags")
+
+    def __init__(self, state: SGRState) -> None:
+        self.fg = state.fg
+        self.bg = state.bg
+        self.flags = set(state.flags)
+
+    def reset(self, code: int) -> None:
+        self.fg, self.bg, self.flags = None, None, set()
+
+    def setFlag(self, code: int) -> None:
+        self.flags.add(code)
+
+    def clearFlags(self, code: int) -> None:
+        self.flags.difference_update(OFF_FLAGS[code])
+
+    def setFg(self, code: int) -> None:
+        self.fg = str(code)
+
+    def clearFg(self, code: int) -> None:
+        self.fg = None
+
+    def setBg(self, code: int) -> None:
+        self.bg = str(code)
+
+    def clearBg(self, code: int) -> None:
+        self.bg = None
+
+    def getState(self) -> SGRState:
+        return SGRState(self.fg, self.bg, frozenset(self.flags))
+
+
+# Update of the pen for each understood single parameter code
+PEN_UPDATES: Dict[int, Callable[[Pen, int], None]] = {
+    0: Pen.reset,
+    39: Pen.clearFg,
+    49: Pen.clearBg
+}
+PEN_UPDATES.update((code, Pen.setFlag) for code in FLAGS)
+PEN_UPDATES.update((code, Pen.clearFlags) for code in OFF_FLAGS)
+PEN_UPDATES.update(
+    (code, Pen.setFg) for code in (*range(30, 38), *range(90, 98)))
+PEN_UPDATES.update(
+    (code, Pen.setBg) for code in (*range(40, 48), *range(100, 108)))
+# Parameters taken by 38 and 48 extended colours, by their second parameter
+COLOUR_LENGTHS = {5: 3, 2: 5}
+
+
+def readColour(codes: List[int], i: int) -> Optional[str]:
+    "Parameters of the extended colour starting at codes[i], None if malformed"
+    length = COLOUR_LENGTHS.get(codes[i + 1] if i + 1 < len(codes) else -1)
+    if length is None or len(codes) < i + length:
+        return None
+    return ";".join(str(code) for code in codes[i:i + length])
+
+
+def apply(state: SGRState, parameters: str) -> Optional[SGRState]:
+    codes = [int(code) if code else 0 for code in parameters.split(";")]
+    pen = Pen(state)
+    i = 0
+    while i < len(codes):
+        code = codes[i]
+        if code in (38, 48):
+            colour = readColour(codes, i)
+            if colour is None:
+                return None
+            if code == 38:
+                pen.fg = colour
+            else:
+                pen.bg = colour
+            i += colour.count(";") + 1
+            continue
+        update = PEN_UPDATES.get(code)
+        if update is None:
+            return None
+        update(pen, code)
+        i += 1
+    return pen.getState()
+
+
+def transition(current: SGRState, target: SGRState) -> str:
+    "Shortest single sequence taking the terminal from current to target"
+    if current == target:
+        return ""
+    parameters: List[str] = []
+    removed = current.flags - target.flags
+    off_codes = sorted({FLAG_OFF[flag] for flag in removed})
+    parameters.extend(str(code) for code in off_codes)
+    added = target.flags - current.flags
+    if 22 in off_codes:
+        # Turning off bold or dim turns off both, restore the one kept
+        added |= target.flags & {1, 2}
+    parameters.extend(str(flag) for flag in sorted(added))
+    if target.fg != current.fg:
+        parameters.append(target.fg or "39")
+    if target.bg != current.bg:
+        parameters.append(target.bg or "49")
+    incremental = "\x1b[" + ";".join(parameters) + "m"
+    reset = "\x1b[" + ";".join(["0"] + target.getParameters()) + "m"
+    if target == NORMAL_STATE:
+        reset = "\x1b[m"
+    return min(incremental, reset, key=len)
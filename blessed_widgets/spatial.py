@@ -0,0 +1,239 @@
+from __future__ import annotations
+from typing import Any, List, Optional, Tuple
+
+# 3rd party
+import numpy as np
+
+# local
+from .constants import Direction, MAX_ANGLE
+from .helpers import gaussian
+
+# Sentinel slot for elements whose parent is the Window
+ROOT = -1
+
+
+class GeometryStore():
+    """
+    Struct of arrays holding the rectangles of every element in a Window.
+    Rows are addressed by slot, an index handed out on registration.
+    Coordinates follow Box: columns [left, right) and rows [top, bottom].
+    """
+
+    def __init__(self, capacity: int = 64) -> None:
+        self.size = 0
+        self.elements: List[Any] = []
+        self.free: List[int] = []
+        self.stacking = 0
+        self.allocate(capacity)
+        self.effective: Optional[np.ndarray] = None
+
+    def allocate(self, capacity: int) -> None:
+        def grow(array: Optional[np.ndarray], dtype) -> np.ndarray:
+            new = np.zeros(capacity, dtype=dtype)
+            if array is not None:
+                new[:len(array)] = array
+            return new
+
+        self.capacity = capacity
+        self.left = grow(getattr(self, "left", None), np.int32)
+        self.top = grow(getattr(self, "top", None), np.int32)
+        self.right = grow(getattr(self, "right", None), np.int32)
+        self.bottom = grow(getattr(self, "bottom", None), np.int32)
+        self.active = grow(getattr(self, "active", None), np.bool_)
+        self.placed = grow(getattr(self, "placed", None), np.bool_)
+        self.used = grow(getattr(self, "used", None), np.bool_)
+        self.interactive = grow(getattr(self, "interactive", None), np.bool_)
+        self.state = grow(getattr(self, "state", None), np.int8)
+        self.parent = grow(getattr(self, "parent", None), np.int32)
+        self.z = grow(getattr(self, "z", None), np.int64)
+        self.layer = grow(getattr(self, "layer", None), np.int32)
+
+    def register(self, element: Any, parent_slot: int,
+                 interactive: bool) -> int:
+        if self.free:
+            slot = self.free.pop()
+            self.elements[slot] = element
+        else:
+            if self.size == self.capacity:
+                self.allocate(self.capacity * 2)
+            slot = self.size
+            self.size += 1
+            self.elements.append(element)
+        self.used[slot] = True
+        self.active[slot] = False
+        self.placed[slot] = False
+        self.interactive[slot] = interactive
+        self.state[slot] = 0
+        self.z[slot] = 0
+        self.layer[slot] = 0
+        self.parent[slot] = slot if parent_slot == ROOT else parent_slot
+        self.effective = None
+        return slot
+
+    def release(self, slot: int) -> None:
+        "Releases the slot together with the slots of all its descendants"
+        n = self.size
+        doomed = np.zeros(n, dtype=np.bool_)
+        doomed[slot] = True
+        while True:
+            grown = doomed | (doomed[self.parent[:n]] & self.used[:n])
+            if np.array_equal(grown, doomed):
+                break
+            doomed = grown
+        for s in np.flatnonzero(doomed):
+            self.elements[s] = None
+            self.free.append(int(s))
+        self.used[:n][doomed] = False
+        self.active[:n][doomed] = False
+        self.placed[:n][doomed] = False
+        self.effective = None
+
+    def setBox(self, slot: int, left: int, top: int, right: int,
+               bottom: int) -> None:
+        self.left[slot] = left
+        self.top[slot] = top
+        self.right[slot] = right
+        self.bottom[slot] = bottom
+        self.placed[slot] = True
+
+    def unsetBox(self, slot: int) -> None:
+        self.placed[slot] = False
+
+    def setActive(self, slot: int, active: bool) -> None:
+        if self.active[slot] != active:
+            self.active[slot] = active
+            self.effective = None
+
+    def setState(self, slot: int, state: int) -> None:
+        self.state[slot] = state
+
+    def raiseSlot(self, slot: int) -> None:
+        "Moves the slot above everything drawn so far"
+        self.stacking += 1
+        self.z[slot] = self.stacking
+
+    def setLayer(self, slot: int, z: int) -> None:
+        "Marks the slot as the owner of a compositor layer with the given z"
+        self.layer[slot] = z
+
+    def getStackingOrder(self, slot: int) -> Tuple[int, int]:
+        """
+        Elements are ordered by the highest layer among themselves and their
+        ancestors, then by the most recently raised of them
+        """
+        layer = self.layer[slot]
+        z = self.z[slot]
+        parent = self.parent[slot]
+        while parent != slot:
+            slot = parent
+            layer = max(layer, self.layer[slot])
+            z = max(z, self.z[slot])
+            parent = self.parent[slot]
+        return int(layer), int(z)
+
+    def getEffectiveActive(self) -> np.ndarray:
+        "Active flag of each slot combined with the flags of its ancestors"
+        if self.effective is None:
+            n = self.size
+            parent = self.parent[:n]
+            effective = self.active[:n] & self.used[:n]
+            while True:
+                propagated = effective & effective[parent]
+                if np.array_equal(propagated, effective):
+                    break
+                effective = propagated
+            self.effective = effective
+        return self.effective
+
+    def getVisibleMask(self) -> np.ndarray:
+        return self.getEffectiveActive() & self.placed[:self.size]
+
+    def getInteractiveMask(self) -> np.ndarray:
+        return self.getVisibleMask() & self.interactive[:self.size]
+
+    def getIntersectingMask(self, left: int, top: int, right: int,
+                            bottom: int) -> np.ndarray:
+        "Slots overlapping the columns [left, right) and rows [top, bottom]"
+        n = self.size
+        return (self.getVisibleMask() & (self.left[:n] < right) &
+                (self.right[:n] > left) & (self.top[:n] <= bottom) &
+                (self.bottom[:n] >= top))
+
+    def hitTest(self, x: int, y: int,
+                interactive: bool = True) -> Optional[Any]:
+        "Returns the topmost visible element covering the cell (x, y)"
+        n = self.size
+        mask = self.getInteractiveMask() if interactive else self.getVisibleMask()
+        candidates = np.flatnonzero(mask & (self.left[:n] <= x) &
+                                    (self.right[:n] > x) &
+                                    (self.top[:n] <= y) &
+                                    (self.bottom[:n] >= y))
+        if not len(candidates):
+            return None
+        top = max(candidates, key=self.getStackingOrder)
+        return self.elements[top]
+
+    def getElements(self, mask: np.ndarray) -> List[Any]:
+        elements = self.elements
+        return [elements[s] for s in np.flatnonzero(mask)]
+
+    def getCandidatePoints(self, direction: Direction):
+        n = self.size
+        left = self.left[:n]
+        top = self.top[:n]
+        right = self.right[:n]
+        bottom = self.bottom[:n]
+        # Matches Box.center
+        center_x = left + (right - left) // 2
+        center_y = bottom + (bottom - top) // 2
+        if direction is Direction.UP:
+            return center_x, bottom
+        elif direction is Direction.DOWN:
+            return center_x, top
+        elif direction is Direction.RIGHT:
+            return left, center_y
+        else:  # LEFT
+            return right, center_y
+
+    def findNearest(self, active_slot: int, active_x: int, active_y: int,
+                    direction: Direction) -> Optional[Any]:
+        "Vectorized equivalent of Window.calculateWeightedDistance over all candidates"
+        mask = self.getInteractiveMask().copy()
+        mask[active_slot] = False
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return None
+        xs, ys = self.getCandidatePoints(direction)
+        delta_x = active_x - xs[candidates].astype(np.float64)
+        delta_y = active_y - ys[candidates].astype(np.float64)
+        delta_angle = np.abs(direction.value -
+                             np.degrees(np.arctan2(delta_y, delta_x)))
+        delta_angle = np.where(delta_angle > 180, 360 - delta_angle,
+                               delta_angle)
+        distance = np.hypot(delta_x, delta_y)
+        weighted_distance = np.where(
+            delta_angle > MAX_ANGLE, np.inf,
+            distance / gaussian(x=delta_angle / 90, mean=0, std=0.45))
+        best = int(np.argmin(weighted_distance))
+        if weighted_distance[best] == np.inf:
+            return None
+        return self.elements[candidates[best]]
+
+    def findExtreme(self, direction: Direction) -> Optional[Any]:
+        candidates = np.flatnonzero(self.getInteractiveMask())
+        if not len(candidates):
+            return None
+        if direction is Direction.DOWN:
+            values = self.top[candidates]
+            target = values.max()
+        elif direction is Direction.RIGHT:
+            values = self.right[candidates]
+            target = values.max()
+        elif direction is Direction.UP:
+            values = self.bottom[candidates]
+            target = values.min()
+        else:  # LEFT
+            values = self.left[candidates]
+            target = values.min()
+        # Last of the tied candidates wins, as in the element by element search
+        return self.elements[candidates[np.flatnonzero(values == target)[-1]]]
@@ -0,0 +1,108 @@
+from __future__ import annotations
+from collections import deque
+from concurrent.futures import (Executor, Future, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+# local
+from .constants import ExecutorKind
+
+
+class Task():
+    """
+    Command submitted to a pool. Its callbacks run on the thread of the loop,
+    on_result with what the command returned and on_error with what it raised.
+    """
+    __slots__ = ("future", "on_result", "on_error", "cancelled")
+
+    def __init__(self, future: Future, on_result: Optional[Callable],
+                 on_error: Optional[Callable]) -> None:
+        self.future = future
+        self.on_result = on_result
+        self.on_error = on_error
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        """
+        Drops the callbacks, and the command if it didn't start yet.
+        A running command can't be interrupted, its result is ignored.
+        """
+        self.cancelled = True
+        self.future.cancel()
+
+    def isDone(self) -> bool:
+        return self.future.done()
+
+    def deliver(self) -> Any:
+        "Runs the callback for the outcome, errors without one are raised"
+        if self.cancelled or self.future.cancelled():
+            return None
+        error = self.future.exception()
+        if error is not None:
+            if self.on_error is None:
+                raise error
+            return self.on_error(error)
+        result = self.future.result()
+        if self.on_result is not None:
+            return self.on_result(result)
+        return None
+
+
+class TaskRunner():
+    """
+    Runs commands in thread or process pools created on first use.
+    Pool threads queue the finished tasks, the loop delivers them in
+    runCompleted so callbacks can update widgets.
+    """
+
+    def __init__(self) -> None:
+        self.executors: Dict[ExecutorKind, Executor] = {}
+        # Appended to from the pools' threads
+        self.completed: Deque[Task] = deque()
+        # Submitted and not delivered yet, only used on the loop's thread
+        self.submitted: Set[Task] = set()
+        self.running = 0
+
+    def getExecutor(self, kind: ExecutorKind) -> Executor:
+        if kind not in self.executors:
+            if kind is ExecutorKind.PROCESS:
+                self.executors[kind] = ProcessPoolExecutor()
+            else:
+                self.executors[kind] = ThreadPoolExecutor(
+                    thread_name_prefix="blessed_widgets")
+        return self.executors[kind]
+
+    def submit(self,
+               command: Callable,
+               *args,
+               kind: ExecutorKind = ExecutorKind.THREAD,
+               on_result: Optional[Callable] = None,
+               on_error: Optional[Callable] = None) -> Task:
+        "Commands run in a process pool and their results must be picklable"
+        future = self.getExecutor(kind).submit(command, *args)
+        task = Task(future, on_result, on_error)
+        self.submitted.add(task)
+        self.running += 1
+        future.add_done_callback(lambda _: self.completed.append(task))
+        return task
+
+    def hasCompleted(self) -> bool:
+        return bool(self.completed)
+
+    def runCompleted(self) -> List[Any]:
+        "Delivers the finished tasks in completion order, returns the callbacks' results"
+        results = []
+        while self.completed:
+            task = self.completed.popleft()
+            self.submitted.discard(task)
+            self.running -= 1
+            results.append(task.deliver())
+        return results
+
+    def shutdown(self) -> None:
+        "Cancels the commands which didn't start, doesn't wait for the others"
+        for task in self.submitted:
+            task.future.cancel()
+        for executor in self.executors.values():
+            executor.shutdown(wait=False)
+        self.executors.clear()
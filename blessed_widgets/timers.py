@@ -0,0 +1,118 @@
+from __future__ import annotations
+import heapq
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+# local
+from .constants import TIMER_COMPACT_THRESHOLD
+
+
+class Timer():
+    "Command run once at deadline, or every interval seconds from then on"
+    __slots__ = ("scheduler", "deadline", "interval", "command", "cancelled")
+
+    def __init__(self, scheduler: Scheduler, deadline: float,
+                 interval: Optional[float], command: Callable) -> None:
+        self.scheduler = scheduler
+        self.deadline = deadline
+        self.interval = interval
+        self.command = command
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        if self.cancelled:
+            return
+        self.cancelled = True
+        self.scheduler.onCancel()
+
+
+class Scheduler():
+    """
+    One-shot and repeating timers kept in a heap ordered by deadline, so
+    waiting costs one look at the nearest one however many are scheduled.
+    Cancelled timers stay in the heap until they're due or too many pile up.
+    The clock can be replaced, e.g. by a fake one in tests. Timers are
+    scheduled and run on the thread of the loop.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self.clock = clock
+        # (deadline, order scheduled, timer), the order breaks ties
+        self.heap: List[Tuple[float, int, Timer]] = []
+        self.scheduled = 0
+        self.cancelled = 0
+
+    def after(self, delay: float, command: Callable) -> Timer:
+        "Runs command once, delay seconds from now"
+        return self.push(Timer(self, self.clock() + delay, None, command))
+
+    def every(self, interval: float, command: Callable,
+              delay: Optional[float] = None) -> Timer:
+        "Runs command every interval seconds, the first time after delay"
+        if interval <= 0:
+            raise ValueError("A repeating timer needs a positive interval")
+        if delay is None:
+            delay = interval
+        return self.push(Timer(self, self.clock() + delay, interval, command))
+
+    def push(self, timer: Timer) -> Timer:
+        self.scheduled += 1
+        heapq.heappush(self.heap, (timer.deadline, self.scheduled, timer))
+        return timer
+
+    def onCancel(self) -> None:
+        self.cancelled += 1
+
+    def dropCancelled(self) -> None:
+        "Pops the cancelled timers on top, rebuilds the heap if many are left"
+        while self.heap and self.heap[0][2].cancelled:
+            heapq.heappop(self.heap)
+            self.cancelled -= 1
+        if (self.cancelled > TIMER_COMPACT_THRESHOLD and
+                self.cancelled * 2 > len(self.heap)):
+            self.heap = [entry for entry in self.heap if not entry[2].cancelled]
+            heapq.heapify(self.heap)
+            self.cancelled = 0
+
+    def getTimeout(self) -> Optional[float]:
+        "Seconds until the nearest deadline, None without timers"
+        self.dropCancelled()
+        if not self.heap:
+            return None
+        return max(self.heap[0][0] - self.clock(), 0)
+
+    def runDue(self) -> List[Any]:
+        """
+        Runs the commands whose deadline passed, in deadline order, and
+        returns what they returned. A repeating timer which fell behind
+        runs once and keeps its interval from now instead of catching up.
+        Timers scheduled by the commands run on a later call at the earliest.
+        """
+        now = self.clock()
+        last = self.scheduled
+        later = []
+        results = []
+        while self.heap and self.heap[0][0] <= now:
+            entry = heapq.heappop(self.heap)
+            timer = entry[2]
+            if timer.cancelled:
+                self.cancelled -= 1
+                continue
+            if entry[1] > last:
+                later.append(entry)
+                continue
+            if timer.interval is None:
+                # Done, cancelling it from now on does nothing
+                timer.cancelled = True
+            else:
+                timer.deadline += timer.interval
+                if timer.deadline <= now:
+                    timer.deadline = now + timer.interval
+                self.push(timer)
+            results.append(timer.command())
+        for entry in later:
+            heapq.heappush(self.heap, entry)
+        return results
+
+    def __len__(self) -> int:
+        return len(self.heap) - self.cancelled
@@ -1,7 +1,16 @@
 # std
 from __future__ import annotations
+import signal
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache, partial
 from abc import ABC, abstractclassmethod
-from typing import Callable, Text, Tuple, Union, List, Optional
+from weakref import WeakValueDictionary
+from typing import (Any, Callable, Deque, Dict, Iterable, Iterator,
+                    NamedTuple, Sequence, Text, Tuple, Type, TypeVar, Union,
+                    List, Optional, Set, cast)
 
 # 3rd party
 import numpy as np
@@ -10,20 +19,33 @@ from blessed import Terminal
 
 # local
 from .exceptions import (BorderOutOfBounds, CellOutOfBounds, ElementNotPlaced,
-                         InvalidAttributes, InvalidElement, InvalidLayout,
-                         PaddingOverflow, RectangleTooSmall)
-from .helpers import gaussian, getFirstAssigned
-from .constants import (BorderStyle, Direction, HAlignment, Layout, Response,
-                        VAlignment, State, Side, WindowState, MAX_ANGLE)
-
-
-class Point():
-
-    def __init__(self, x: int, y: int) -> None:
-        self.x = x
-        self.y = y
-
-    def __add__(self, p: Point) -> Point:
+                         EmptyScreenStack, InvalidAttributes, InvalidElement,
+                         InvalidLayout, PaddingOverflow, RectangleTooSmall)
+from .helpers import gaussian, getFirstAssigned, stableOrder
+from .constants import (BorderStyle, Direction, ExecutorKind, FlexAlignment, FlexDirection,
+                        HAlignment, Layout, MouseAction, MouseButton, Response, VAlignment, State,
+                        Side, WindowState, MAX_ANGLE, BATCH_QUERY_THRESHOLD,
+                        FRAME_INTERVAL, IDLE_TIMEOUT, RESIZE_POLL_INTERVAL,
+                        RESIZE_SETTLE, STYLE_CACHE_SIZE, TRIM_AGE, TRIM_INTERVAL, BRAILLE_BASE,
+                        H_BLOCKS, V_BLOCKS)
+from .binding import Binding, Observable
+from .canvas import Compositor, Layer
+from .cells import nextOffset, previousOffset, splitCells, textWidth, truncate
+from .keymap import Keymap, KeymapNode, Keys, keyName
+from .mouse import MouseEvent, disableSequence, enableSequence, readMouseEvent
+from .palette import Palette
+from .spatial import GeometryStore, ROOT
+from .tasks import Task, TaskRunner
+from .timers import Scheduler, Timer
+
+E = TypeVar("E", bound="Element")
+
+
+class Point(NamedTuple):
+    x: int
+    y: int
+
+    def __add__(self, p: Point) -> Point:  # type: ignore[override]
         return Point(self.x + p.x, self.y + p.y)
 
     def __sub__(self, p: Point) -> Point:
@@ -36,12 +58,43 @@ class Point():
 class Element(ABC):
 
     def __init__(self, parent: Parent, width: int, height: int) -> None:
-        self.border: Optional[Box] = None
         self.parent = parent
+        self.window = parent.getWindow()
+        self.slot = self.window.geometry.register(
+            self, parent.slot if isinstance(parent, Element) else ROOT,
+            isinstance(self, Interactable))
+        self.border = None
+        # Own layer of overlay frames, other elements draw on their parent's
+        self.layer: Optional[Layer] = None
+        # Arguments of the last place or grid call, used to relayout on resize
+        self.layout_args: Optional[Tuple[int, ...]] = None
+        # Key bindings in scope while this element or one inside it is selected
+        self.keymap: Optional[Keymap] = None
         self.parent.addElement(self)
         self.width = width
         self.height = height
         self.active = False
+        # Time of the last deactivate, None while active or once trimmed
+        self.inactive_since: Optional[float] = None
+
+    @property
+    def border(self) -> Optional[Box]:
+        return self._border
+
+    @border.setter
+    def border(self, border: Optional[Box]) -> None:
+        "Keeps the Window GeometryStore in sync with the element's rectangle"
+        previous = getattr(self, "_border", None)
+        if previous is not None and self.layer is not None and self.isActive():
+            # A moving overlay uncovers its previous rectangle
+            self.layer.erase(previous.left, previous.top, previous.right,
+                             previous.bottom)
+        self._border = border
+        if border is None:
+            self.getWindow().geometry.unsetBox(self.slot)
+        else:
+            self.getWindow().geometry.setBox(self.slot, border.left, border.top,
+                                             border.right, border.bottom)
 
     def getWidth(self) -> int:
         return self.width
@@ -49,13 +102,14 @@ class Element(ABC):
     def getHeight(self) -> int:
         return self.height
 
-    def place(self, x: int, y: int) -> None:
+    def place(self, x: int, y: int, draw: bool = True) -> None:
         "Works with Layout.ABSOLUTE"
         if not isinstance(self.parent, AbsoluteFrame):
             raise InvalidLayout("Frame is not of type AbsoluteFrame")
         assert (isinstance(self.parent, AbsoluteFrame))
         self.border = self.parent.placeElement(self, x, y)
-        self.activate()
+        self.layout_args = (x, y)
+        self.activate(draw)
 
     def grid(self,
              column: int,
@@ -63,7 +117,8 @@ class Element(ABC):
              rowspan: int = 1,
              columnspan: int = 1,
              padx: int = 0,
-             pady: int = 0) -> None:
+             pady: int = 0,
+             draw: bool = True) -> None:
         if not isinstance(self.parent, GridFrame):
             raise InvalidLayout("Frame is not of type GridFrame")
         assert (isinstance(self.parent, GridFrame))
@@ -74,10 +129,43 @@ class Element(ABC):
                                                column=column,
                                                rowspan=rowspan,
                                                columnspan=columnspan)
-        self.activate()
+        self.layout_args = (column, row, rowspan, columnspan, padx, pady)
+        self.activate(draw)
+
+    def flex(self,
+             grow: int = 0,
+             shrink: int = 1,
+             align: Optional[FlexAlignment] = None) -> None:
+        """
+        Works with Layout.FLEX
+        The element's width and height are used as its basis. It gets placed and
+        activated when the frame is next drawn, as adding it may move its siblings.
+        """
+        if not isinstance(self.parent, FlexFrame):
+            raise InvalidLayout("Frame is not of type FlexFrame")
+        assert (isinstance(self.parent, FlexFrame))
+        self.parent.addItem(self, grow, shrink, align)
 
     def getWindow(self) -> Window:
-        return self.parent.getWindow()
+        return self.window
+
+    def getLayer(self) -> Layer:
+        if self.layer is not None:
+            return self.layer
+        return self.parent.getLayer()
+
+    def bind(self, keys: Keys, command: Callable) -> None:
+        """
+        Binds a key or a chord like "g g" while the element is selected,
+        or one inside it for frames. Overrides the same keys bound outside.
+        """
+        if self.keymap is None:
+            self.keymap = Keymap()
+        self.keymap.bind(keys, command)
+
+    def unbind(self, keys: Keys) -> None:
+        if self.keymap is not None:
+            self.keymap.unbind(keys)
 
     def getBorder(self) -> Box:
         if self.border is None:
@@ -90,15 +178,35 @@ class Element(ABC):
     def isActive(self) -> bool:
         return self.active
 
+    def isShown(self) -> bool:
+        "Whether the element and all its ancestors are active"
+        return bool(self.getWindow().geometry.getEffectiveActive()[self.slot])
+
     def activate(self, draw: bool = True) -> None:
         self.active = True
+        self.inactive_since = None
+        self.getWindow().geometry.setActive(self.slot, True)
+        self.getWindow().geometry.raiseSlot(self.slot)
+        if self.layer is not None:
+            self.getWindow().compositor.raiseLayer(self.layer)
         if draw:
             self.draw()
 
     def deactivate(self) -> None:
         self.active = False
+        self.inactive_since = time.monotonic()
+        self.getWindow().geometry.setActive(self.slot, False)
         self.clear()
 
+    def setReachable(self, reachable: bool) -> None:
+        "Leaves an element out of input or brings it back, without drawing"
+        self.active = reachable
+        self.getWindow().geometry.setActive(self.slot, reachable)
+
+    def trim(self) -> None:
+        "Releases caches the next draw rebuilds, called on long inactive elements"
+        pass
+
     def toggle(self) -> None:
         if self.active:
             self.deactivate()
@@ -121,25 +229,34 @@ class Element(ABC):
 
     def clear(self) -> None:
         self.raiseIfNotPlaced()
+        border = self.getBorder()
+        if self.layer is not None:
+            # Overlays uncover whatever they were drawn over
+            self.layer.erase(border.left, border.top, border.right,
+                             border.bottom)
+            return
         # Remove after MainFrame solution TODO
-        command = ''
+        attr = ''
         if isinstance(self.parent, Frame):
             bg_color = self.parent.getStyle().bg_color
             if bg_color:
-                command += bg_color
+                attr += bg_color
         else:
-            command += self.getWindow().term.normal
+            attr += self.getWindow().palette.normal
         # Remove after MainFrame solution
-        for row in range(self.getBorder().getEdge(Side.TOP),
-                         self.getBorder().getEdge(Side.BOTTOM) + 1):
-            command += self.getWindow().moveXY(
-                Point(self.getBorder().getEdge(Side.LEFT), row))
-            command += " " * self.getBorder().getWidth()
-        print(command)
+        layer = self.getLayer()
+        for row in range(border.top, border.bottom + 1):
+            layer.write(border.left, row, " " * border.getWidth(), attr)
 
     def remove(self) -> None:
         self.deactivate()
         self.parent.removeElement(self)
+        self.getWindow().geometry.release(self.slot)
+
+    def reuse(self, width: int, height: int) -> None:
+        "Resets a released element before Frame.acquire hands it out again"
+        self.width = width
+        self.height = height
 
 
 class HasText(ABC):
@@ -147,6 +264,7 @@ class HasText(ABC):
     def __init__(self, text: Optional[str], padding: List[int],
                  h_align: HAlignment, v_align: VAlignment, width: int,
                  height: int) -> None:
+        self.binding: Optional[Binding] = None
         self.setText(text)
         self.h_align = h_align
         self.v_align = v_align
@@ -155,6 +273,36 @@ class HasText(ABC):
     def setText(self, text: Optional[str]) -> None:
         self.text = text
 
+    def reuseText(self, text: Optional[str], padding: List[int],
+                  h_align: HAlignment, v_align: VAlignment, width: int,
+                  height: int) -> None:
+        "Resets what HasText.__init__ set, keeping the binding"
+        self.setText(text)
+        self.h_align = h_align
+        self.v_align = v_align
+        self.setPadding(padding, width, height)
+
+    def bindValue(self,
+                  observable: Observable,
+                  formatter: Callable[[Any], Any] = str) -> Binding:
+        "Shows the formatted value of observable, updated on the next frame"
+        self.unbindValue()
+        self.binding = Binding(observable, self, formatter)
+        self.binding.apply()
+        return self.binding
+
+    def unbindValue(self) -> None:
+        if self.binding is not None:
+            self.binding.unbind()
+            self.binding = None
+
+    def applyBoundValue(self, value: Any) -> bool:
+        "Returns False to have the binding retry on its next change"
+        self.setText(value)
+        if self.isPlaced() and self.isActive():
+            self.draw()
+        return True
+
     def setPadding(self, padding: List[int], width: int, height: int) -> None:
         if width < padding[1] + padding[3]:
             raise PaddingOverflow(
@@ -177,6 +325,18 @@ class Visible(Element):  # Frame vs Label
         self.setStyle(style)
         self.state = State.IDLE
 
+    @property
+    def state(self) -> State:
+        return self._state
+
+    @state.setter
+    def state(self, state: State) -> None:
+        self._state = state
+        window = self.getWindow()
+        window.geometry.setState(self.slot, state.value)
+        if window.state_changes is not None:
+            window.state_changes.add(self)
+
     @abstractclassmethod
     def constructDefaultStyle(self, style: Optional[BoxStyle]) -> BoxStyle:
         pass
@@ -196,36 +356,11 @@ class Visible(Element):  # Frame vs Label
         Inheritence vector controls which features are inherited (1 for true, 0 for false)
         inheritence_vector is of form (bg_color, text_style, border_color, border_style)
         """
-        if style is None:
-            style = BoxStyle()
-        inheritanceStyle = BoxStyle()
+        parent_style: Optional[BoxStyle] = None
         if not isinstance(self.parent, Window):  # TODO: Make MainFrame class?
-            parentStyle = self.parent.getStyle()
-            # Controls which features are inherited
-            if inheritance_vector[0]:
-                inheritanceStyle.bg_color = parentStyle.bg_color
-            if inheritance_vector[1]:
-                inheritanceStyle.text_style = parentStyle.text_style
-            if inheritance_vector[2]:
-                inheritanceStyle.border_color = parentStyle.border_color
-            if inheritance_vector[3]:
-                inheritanceStyle.border_style = parentStyle.border_style
-
-        bg_color: Optional[str] = getFirstAssigned(
-            [style.bg_color, inheritanceStyle.bg_color],
-            default=default_style.bg_color)
-        text_style: Optional[str] = getFirstAssigned(
-            [style.text_style, inheritanceStyle.text_style],
-            default=default_style.text_style)
-        border_color: Optional[str] = getFirstAssigned(
-            [style.border_color, inheritanceStyle.border_color],
-            default=default_style.border_color)
-        border_style: Optional[BorderStyle] = getFirstAssigned(
-            [style.border_style], default=default_style.border_style)
-        return BoxStyle(bg_color=bg_color,
-                        text_style=text_style,
-                        border_color=border_color,
-                        border_style=border_style)
+            parent_style = self.parent.getStyle()
+        return resolveStyle(style, parent_style, default_style,
+                            inheritance_vector)
 
     def setStyle(self, style: Optional[BoxStyle]) -> None:
         self.style = self.constructDefaultStyle(style)
@@ -233,6 +368,15 @@ class Visible(Element):  # Frame vs Label
     def getStyle(self) -> BoxStyle:
         return self.style
 
+    def reuse(self,
+              width: int,
+              height: int,
+              style: Optional[BoxStyle] = None) -> None:
+        "Styles left as None get the defaults, as in __init__"
+        super().reuse(width, height)
+        self.setStyle(style)
+        self.state = State.IDLE
+
 
 class Interactable(Visible):
 
@@ -256,6 +400,20 @@ class Interactable(Visible):
             Direction.RIGHT: None
         }
 
+    def reuse(self,
+              width: int,
+              height: int,
+              style: Optional[BoxStyle] = None,
+              selected_style: Optional[BoxStyle] = None,
+              clicked_style: Optional[BoxStyle] = None,
+              disabled_style: Optional[BoxStyle] = None) -> None:
+        super().reuse(width, height, style)
+        self.setSelectedStyle(selected_style)
+        self.setClickedStyle(clicked_style)
+        self.setDisabledStyle(disabled_style)
+        for direction in self.navigation_override:
+            self.navigation_override[direction] = None
+
     def overrideNavigation(self, direction: Direction, element: Interactable):
         self.navigation_override[direction] = element
 
@@ -355,6 +513,13 @@ class Focusable(Interactable):
     def handleKeyEvent(self, val) -> Response:
         pass
 
+    def handleMouseEvent(self, event: MouseEvent,
+                         target: Optional[Interactable]) -> Response:
+        "Clicks on the element are consumed, clicks elsewhere unfocus it"
+        if target is self:
+            return Response.COMPLETE
+        return self.unfocus()
+
     def setFocudesStyle(self, focused_style: Optional[BoxStyle]) -> None:
         self.focused_style = self.constructDefaultStyle(focused_style)
 
@@ -366,6 +531,10 @@ class Focusable(Interactable):
             return self.getFocusedStyle()
         return super().getStyle()
 
+    def getPopup(self) -> Optional[Visible]:
+        "Element shown over the others while focused, if any"
+        return None
+
     def focus(self) -> Response:
         if self.onFocused:
             self.onFocused()
@@ -396,17 +565,45 @@ class Frame(Visible):
                  style: BoxStyle = None) -> None:
         super().__init__(parent, width, height, style)
         self.elements: List[Element] = []
+        # Released elements by type, handed out again by acquire
+        self.released: Dict[type, List[Element]] = {}
+        # Deferred builders of the frame's content, run on the next activate
+        self.builders: List[Callable[[Frame], None]] = []
 
     def getAnchor(self) -> Point:
         self.raiseIfNotPlaced()
-        return self.getBorder().corners["tl"]
+        border = self.getBorder()
+        return Point(border.left, border.top)
+
+    def deferBuild(self, builder: Callable[[Frame], None]) -> None:
+        """
+        Creates the frame's elements with builder(frame) when it's activated,
+        straight away if it's active. Hidden panes cost nothing until shown.
+        """
+        if self.isActive():
+            builder(self)
+        else:
+            self.builders.append(builder)
+
+    def activate(self, draw: bool = True) -> None:
+        if self.builders:
+            builders, self.builders = self.builders, []
+            with self.getWindow().deferFlush():
+                for builder in builders:
+                    builder(self)
+        super().activate(draw)
+
+    def trim(self) -> None:
+        for element in self.elements:
+            element.trim()
 
     def constructDefaultStyle(self,
                               style: Optional[BoxStyle] = None) -> BoxStyle:
         return Interactable.constructDefaultStyleTemplate(
             self,
             style=style,
-            default_style=BoxStyle(border_color=self.getWindow().term.white),
+            default_style=self.getWindow().getDefaultStyle(
+                border_color="white"),
             inheritance_vector=(True, True, True, True))
 
     def checkOutOfBounds(self, border: Box, element: Element) -> None:
@@ -436,6 +633,39 @@ class Frame(Visible):
                 f"exceeds {type(element.parent).__name__} {str(self.border)} "
                 f"RIGHT border edge ({self.getBorder().getEdge(Side.RIGHT)})")
 
+    def useOverlay(self, z: int = 1) -> None:
+        """
+        Draws the frame and its elements on their own layer above the layers with lower z.
+        Deactivating the frame restores only the cells it covered.
+        """
+        window = self.getWindow()
+        if self.layer is not None:
+            window.compositor.removeLayer(self.layer)
+        self.layer = window.compositor.addLayer(z)
+        window.geometry.setLayer(self.slot, z)
+
+    def getElementBorder(self, element: Element) -> Box:
+        "Border of an already laid out element, computed from its layout_args"
+        raise InvalidLayout(f"{type(self).__name__} can't relayout elements")
+
+    def dependsOnParentSize(self) -> bool:
+        return False
+
+    def relayout(self) -> None:
+        """
+        Recomputes the borders of elements after the frame was moved or resized.
+        Only frames which moved, or which size themselves to their parent, are descended.
+        """
+        for element in self.elements:
+            if element.isPlaced() and element.layout_args is not None:
+                border = self.getElementBorder(element)
+                moved = border != element.border
+                if moved:
+                    element.border = border
+                if isinstance(element, Frame) and (
+                        moved or element.dependsOnParentSize()):
+                    element.relayout()
+
     def addElement(self, element: Element) -> None:
         # if self.checkOutOfBounds(element):
         #     raise BorderOutOfBounds("Child coordinates are out of bounds of the parent")
@@ -448,6 +678,51 @@ class Frame(Visible):
         for element in elements:
             self.addElement(element)
 
+    def unplaceElement(self, element: Element) -> None:
+        "Frees whatever the layout reserved for the element"
+        pass
+
+    def restoreElement(self, element: Element, border: Box,
+                       layout_args: Tuple[int, ...]) -> None:
+        "Places an element at a border computed earlier with the same layout_args"
+        element.border = border
+        element.layout_args = layout_args
+
+    def releaseElement(self, element: Element) -> None:
+        """
+        Hides the element and keeps it for acquire instead of removing it.
+        It stays in the elements list and keeps its GeometryStore slot.
+        """
+        window = self.getWindow()
+        if window.active_element is element:
+            window.active_element = None
+            window.window_state = WindowState.VIEW
+        if element.isActive() and element.isPlaced():
+            element.deactivate()
+        if isinstance(element, HasText):
+            element.unbindValue()
+        self.unplaceElement(element)
+        element.border = None
+        element.layout_args = None
+        self.released.setdefault(type(element), []).append(element)
+
+    def releaseElements(self, *elements: Element) -> None:
+        for element in elements:
+            self.releaseElement(element)
+
+    def acquire(self, element_type: Type[E], width: int, height: int,
+                **kwargs) -> E:
+        """
+        Returns a released element of element_type reset with the arguments,
+        constructing a new one only when none is left. It still has to be placed.
+        """
+        released = self.released.get(element_type)
+        if released:
+            element = cast(E, released.pop())
+            element.reuse(width, height, **kwargs)
+            return element
+        return element_type(self, width, height, **kwargs)  # type: ignore[call-arg]
+
     def getAllElements(self,
                        element_filter: Optional[Callable] = None
                        ) -> List[Element]:
@@ -483,10 +758,15 @@ class AbsoluteFrame(Frame):
         # self.checkOutOfBounds(border, element)
         return border
 
+    def getElementBorder(self, element: Element) -> Box:
+        assert (element.layout_args is not None)
+        return self.placeElement(element, *element.layout_args)
+
     def draw(self) -> None:
         self.raiseIfNotPlaced()
         if self.isActive():
-            self.getBorder().drawBackground(self.getWindow(), self.getStyle())
+            self.getBorder().drawBackground(self.getWindow(), self.getStyle(),
+                                            self.getLayer())
             for element in self.elements:
                 if element.isPlaced() and element.isActive():
                     element.draw()
@@ -563,6 +843,30 @@ class GridFrame(Frame):
                      columnspan: int = 1) -> Box:
         self.assignCells(element, row, column, rowspan, columnspan)
         # self.raiseIfBorderOutOfBounds(element, padx, pady, row, column, rowspan, columnspan)
+        return self.computeBorder(element, padx, pady, row, column)
+
+    def getElementBorder(self, element: Element) -> Box:
+        assert (element.layout_args is not None)
+        column, row, _, _, padx, pady = element.layout_args
+        return self.computeBorder(element, padx, pady, row, column)
+
+    def restoreElement(self, element: Element, border: Box,
+                       layout_args: Tuple[int, ...]) -> None:
+        column, row, rowspan, columnspan, _, _ = layout_args
+        self.assignCells(element, row, column, rowspan, columnspan)
+        super().restoreElement(element, border, layout_args)
+
+    def unplaceElement(self, element: Element) -> None:
+        if element.layout_args is None:
+            return
+        column, row, rowspan, columnspan, _, _ = element.layout_args
+        for r in range(row, row + rowspan):
+            for c in range(column, column + columnspan):
+                if self.matrix[r][c] is element:
+                    self.matrix[r][c] = None
+
+    def computeBorder(self, element: Element, padx: int, pady: int, row: int,
+                      column: int) -> Box:
         border = Box(
             self.getAnchor() + Point(
                 sum(self.widths[:column]) + padx,
@@ -571,13 +875,9 @@ class GridFrame(Frame):
                 sum(self.widths[:column]) + element.getWidth() + padx,
                 sum(self.heights[:row]) + element.getHeight() + pady - 1))
         if self.style.border_style is not None:
-            border.p1 = border.p1 + Point(1, 1)
-            border.p2 = border.p2 + Point(1, 1)
-            border.updateCorners()
+            border = border.offset(Point(1, 1))
         if self.inner_border:
-            border.p1 = border.p1 + Point(column, row)
-            border.p2 = border.p2 + Point(column, row)
-            border.updateCorners()
+            border = border.offset(Point(column, row))
         # self.checkOutOfBounds(border, element)
         return border
 
@@ -606,12 +906,14 @@ class GridFrame(Frame):
             x1] is not None
 
     def drawGrid(self) -> None:
-        command = ''
+        attr = ''
+        # Grid lines are built one row at a time and written out in order
+        lines: List[Tuple[Point, str]] = []
         border = self.getBorder()
         style = self.getStyle()
         window = self.getWindow()
         if style.bg_color:
-            command += style.bg_color
+            attr += style.bg_color
         if self.getWidth() < 2 or self.getHeight() < 2:
             raise RectangleTooSmall(
                 "Unable to fit border on such small rectangle, must be at least 2x2"
@@ -655,14 +957,14 @@ class GridFrame(Frame):
                 tl = " "
 
             if style.border_color:
-                command += style.border_color
+                attr += style.border_color
             for y, height in enumerate(self.heights):
                 for slice in range(height + 1):
-                    command += window.moveXY(
-                        Point(
-                            border.getEdge(Side.LEFT),
-                            border.getEdge(Side.TOP) + sum(self.heights[:y]) +
-                            y + slice))
+                    position = Point(
+                        border.getEdge(Side.LEFT),
+                        border.getEdge(Side.TOP) + sum(self.heights[:y]) + y +
+                        slice)
+                    command = ''
                     if y == 0 and slice == 0:
                         command += br
                         for x, width in enumerate(self.widths):
@@ -732,10 +1034,11 @@ class GridFrame(Frame):
                                 else:
                                     command += tb
                         command += tb
-                command += window.moveXY(
-                    Point(border.getEdge(Side.LEFT),
-                          border.getEdge(Side.TOP) + sum(self.heights) + y + 1))
-                command += tr
+                    lines.append((position, command))
+                position = Point(
+                    border.getEdge(Side.LEFT),
+                    border.getEdge(Side.TOP) + sum(self.heights) + y + 1)
+                command = tr
                 for x, width in enumerate(self.widths):
                     if x == len(self.widths) - 1:
                         command += lr * width + tl
@@ -745,8 +1048,11 @@ class GridFrame(Frame):
                             command += lr
                         else:
                             command += tlr
+                lines.append((position, command))
 
-        print(command)
+        layer = self.getLayer()
+        for position, command in lines:
+            layer.write(position.x, position.y, command, attr)
         window.flush()
 
     def draw(self) -> None:
@@ -756,7 +1062,270 @@ class GridFrame(Frame):
                 self.drawGrid()
             else:
                 self.getBorder().drawBackground(self.getWindow(),
-                                                self.getStyle())
+                                                self.getStyle(),
+                                                self.getLayer())
+            for element in self.elements:
+                if element.isPlaced() and element.isActive():
+                    element.draw()
+
+
+class FlexItem():
+    "Flex parameters of a single element, sizes are the basis given on insertion"
+    __slots__ = ("element", "grow", "shrink", "align", "width", "height",
+                 "pending")
+
+    def __init__(self, element: Element, grow: int, shrink: int,
+                 align: Optional[FlexAlignment]) -> None:
+        if grow < 0 or shrink < 0:
+            raise InvalidAttributes("Grow and shrink weights must be >= 0")
+        self.element = element
+        self.grow = grow
+        self.shrink = shrink
+        self.align = align
+        self.width = element.width
+        self.height = element.height
+        # Activated on the first arrange
+        self.pending = True
+
+    def measure(self) -> Tuple[int, int]:
+        if isinstance(self.element, FlexFrame):
+            return self.element.measure()
+        return self.width, self.height
+
+
+class FlexFrame(Frame):
+    """
+    Lays out its elements in a single row or column.
+    Layout runs in two passes: measure computes the preferred size bottom up and
+    arrange assigns borders top down. Both results are cached per frame and only
+    recomputed for frames whose elements or available space changed.
+    Leaving width or height as None sizes the frame to its content.
+    """
+
+    def __init__(self,
+                 parent: Parent,
+                 width: Optional[int] = None,
+                 height: Optional[int] = None,
+                 direction: FlexDirection = FlexDirection.ROW,
+                 gap: int = 0,
+                 justify: FlexAlignment = FlexAlignment.START,
+                 align: FlexAlignment = FlexAlignment.START,
+                 fill: bool = False,
+                 style: BoxStyle = None) -> None:
+        if align is FlexAlignment.SPACE_BETWEEN:
+            raise InvalidAttributes(
+                "SPACE_BETWEEN can only be used to justify elements")
+        self.fixed_width = width
+        self.fixed_height = height
+        # Stretch to the space left in the parent, overriding width and height
+        self.fill = fill
+        self.direction = direction
+        self.gap = gap
+        self.justify = justify
+        self.align = align
+        self.items: dict[Element, FlexItem] = {}
+        self.measured: Optional[Tuple[int, int]] = None
+        self.arranged: Optional[Box] = None
+        super().__init__(parent, getFirstAssigned([width], 0),
+                         getFirstAssigned([height], 0), style)
+
+    def addItem(self, element: Element, grow: int, shrink: int,
+                align: Optional[FlexAlignment]) -> None:
+        self.items[element] = FlexItem(element, grow, shrink, align)
+        self.invalidateLayout()
+
+    def removeElement(self, element: Element) -> None:
+        super().removeElement(element)
+        self.unplaceElement(element)
+
+    def unplaceElement(self, element: Element) -> None:
+        if self.items.pop(element, None) is not None:
+            self.invalidateLayout()
+
+    def invalidateLayout(self) -> None:
+        "Drops cached layout of this frame and of every FlexFrame containing it"
+        frame: Optional[FlexFrame] = self
+        while frame is not None:
+            frame.measured = None
+            frame.arranged = None
+            parent = frame.parent
+            frame = parent if isinstance(parent, FlexFrame) and (
+                frame in parent.items) else None
+
+    def getLayoutRoot(self) -> FlexFrame:
+        "Outermost FlexFrame in the chain of FlexFrames laid out by each other"
+        frame = self
+        while isinstance(frame.parent, FlexFrame) and frame in frame.parent.items:
+            frame = frame.parent
+        return frame
+
+    def getInset(self) -> int:
+        return 0 if self.style.border_style in (None, BorderStyle.NONE) else 1
+
+    def getItems(self) -> List[FlexItem]:
+        return [
+            self.items[element]
+            for element in self.elements
+            if element in self.items
+        ]
+
+    def measure(self) -> Tuple[int, int]:
+        "Preferred (width, height) of the frame"
+        if self.measured is None:
+            sizes = [item.measure() for item in self.getItems()]
+            main = sum(size[self.mainAxis()] for size in sizes)
+            main += self.gap * max(len(sizes) - 1, 0)
+            cross = max((size[1 - self.mainAxis()] for size in sizes),
+                        default=0)
+            inset = 2 * self.getInset()
+            if self.direction is FlexDirection.ROW:
+                width, height = main + inset, cross + inset
+            else:
+                width, height = cross + inset, main + inset
+            if self.fixed_width is not None:
+                width = self.fixed_width
+            if self.fixed_height is not None:
+                height = self.fixed_height
+            self.measured = (width, height)
+        return self.measured
+
+    def mainAxis(self) -> int:
+        "Index of the main axis in (width, height) tuples"
+        return 0 if self.direction is FlexDirection.ROW else 1
+
+    def distribute(self, bases: List[int], weights: List[int],
+                   amount: int) -> List[int]:
+        "Splits amount proportionally to weights, remainder goes to the first weighted items"
+        total = sum(weights)
+        if total == 0 or amount == 0:
+            return [0] * len(bases)
+        shares = [amount * weight // total for weight in weights]
+        remainder = amount - sum(shares)
+        for i, weight in enumerate(weights):
+            if remainder == 0:
+                break
+            if weight:
+                shares[i] += 1
+                remainder -= 1
+        return shares
+
+    def dependsOnParentSize(self) -> bool:
+        return self.fill
+
+    def relayout(self) -> None:
+        self.getLayoutRoot().arrange()
+
+    def fitToContent(self) -> None:
+        "Resizes a filling or auto sized frame, keeping its origin"
+        origin = self.getBorder().p1
+        if self.fill:
+            # Only an AbsoluteFrame can be the child of a Window
+            assert (isinstance(self.parent, Frame))
+            anchor = self.parent.getAnchor()
+            self.width = self.parent.width - (origin.x - anchor.x)
+            self.height = self.parent.height - (origin.y - anchor.y)
+        elif self.fixed_width is not None and self.fixed_height is not None:
+            return
+        else:
+            self.width, self.height = self.measure()
+        border = Box(origin, origin + Point(self.width, self.height - 1))
+        if border != self.border:
+            self.border = border
+
+    def arrange(self) -> None:
+        "Assigns borders to all items, skipping frames whose space and items are unchanged"
+        self.raiseIfNotPlaced()
+        if self.getLayoutRoot() is self:
+            self.fitToContent()
+        border = self.getBorder()
+        if self.arranged == border:
+            return
+        self.arranged = border
+        items = self.getItems()
+        main_axis = self.mainAxis()
+        inset = self.getInset()
+        content_size = (border.getWidth() - 2 * inset,
+                        border.getHeight() + 1 - 2 * inset)
+        sizes = [item.measure() for item in items]
+        mains = self.getMainSizes(items, sizes, content_size[main_axis])
+        offset, gap = self.getJustification(mains, content_size[main_axis])
+        origin = Point(border.left + inset, border.top + inset)
+        for item, size, main in zip(items, sizes, mains):
+            self.placeItem(item, size[1 - main_axis], main, offset, origin,
+                           content_size[1 - main_axis])
+            offset += main + gap
+
+    def getMainSizes(self, items: List[FlexItem], sizes: List[Tuple[int, int]],
+                     main_space: int) -> List[int]:
+        "Main axis sizes of the items, grown or shrunk to fill main_space"
+        bases = [size[self.mainAxis()] for size in sizes]
+        free = main_space - sum(bases) - self.gap * max(len(items) - 1, 0)
+        if free > 0:
+            extra = self.distribute(bases, [item.grow for item in items], free)
+        else:
+            extra = [
+                -share for share in self.distribute(
+                    bases, [item.shrink * base for item, base in zip(items, bases)],
+                    -free)
+            ]
+        return [max(base + delta, 0) for base, delta in zip(bases, extra)]
+
+    def getJustification(self, mains: List[int],
+                         main_space: int) -> Tuple[int, int]:
+        "Offset of the first item and the gap between items"
+        leftover = max(main_space - sum(mains) -
+                       self.gap * max(len(mains) - 1, 0), 0)
+        if self.justify is FlexAlignment.CENTER:
+            return leftover // 2, self.gap
+        if self.justify is FlexAlignment.END:
+            return leftover, self.gap
+        if self.justify is FlexAlignment.SPACE_BETWEEN and len(mains) > 1:
+            return 0, self.gap + leftover // (len(mains) - 1)
+        return 0, self.gap
+
+    def getCrossPlacement(self, item: FlexItem, cross: int,
+                          cross_space: int) -> Tuple[int, int]:
+        "Cross axis offset and size of an item by its alignment"
+        align = getFirstAssigned([item.align], self.align)
+        if align is FlexAlignment.STRETCH:
+            cross = cross_space
+        cross = min(cross, cross_space)
+        if align is FlexAlignment.CENTER:
+            return (cross_space - cross) // 2, cross
+        if align is FlexAlignment.END:
+            return cross_space - cross, cross
+        return 0, cross
+
+    def placeItem(self, item: FlexItem, cross: int, main: int, offset: int,
+                  origin: Point, cross_space: int) -> None:
+        cross_offset, cross = self.getCrossPlacement(item, cross, cross_space)
+        if self.mainAxis() == 0:
+            x, y, width, height = (origin.x + offset, origin.y + cross_offset,
+                                   main, cross)
+        else:
+            x, y, width, height = (origin.x + cross_offset, origin.y + offset,
+                                   cross, main)
+        element = item.element
+        element.width = width
+        element.height = height
+        item_border = Box(Point(x, y), Point(x + width, y + height - 1))
+        moved = element.border != item_border
+        if moved:
+            element.border = item_border
+        if item.pending:
+            item.pending = False
+            element.activate(draw=False)
+        if isinstance(element, FlexFrame):
+            element.arrange()
+        elif isinstance(element, Frame) and moved:
+            element.relayout()
+
+    def draw(self) -> None:
+        self.raiseIfNotPlaced()
+        if self.isActive():
+            self.getLayoutRoot().arrange()
+            self.getBorder().drawBackground(self.getWindow(), self.getStyle(),
+                                            self.getLayer())
             for element in self.elements:
                 if element.isPlaced() and element.isActive():
                     element.draw()
@@ -764,44 +1333,227 @@ class GridFrame(Frame):
 
 class Window():
 
-    def __init__(self, term: Terminal) -> None:
+    def __init__(self,
+                 term: Terminal,
+                 clock: Callable[[], float] = time.monotonic) -> None:
         self.term = term
+        self.palette = Palette(term)
+        self.default_styles: dict[tuple, BoxStyle] = {}
+        self.geometry = GeometryStore()
+        self.compositor = Compositor(term, term.width, term.height)
         self.window_state = WindowState.VIEW
         self.active_element: Optional[Interactable] = None
+        # Elements whose state was set while collecting, see SessionServer
+        self.state_changes: Optional[Set[Visible]] = None
+        # Bindings whose observable changed since the last frame, in order.
+        # Observables may be set from other threads
+        self.pending_bindings: Dict[Binding, None] = {}
+        self.binding_lock = threading.Lock()
+        self.binding_count = 0
+        self.flush_depth = 0
+        self.flush_pending = False
         AbsoluteFrame(self, self.term.width, self.term.height)
         self.mainframe.activate()
-        self.hotkeys: dict[str, Callable] = {}
-
-    def bind(self, val: str, command: Callable) -> None:
-        self.hotkeys[val] = command
+        self.screen = Screen(self.mainframe, modal=False)
+        # Screens under the current one, the bottom one first
+        self.screens: List[Screen] = []
+        self.keymap = Keymap()
+        # Node of a chord typed partway, which the next key continues
+        self.pending_chord: Optional[KeymapNode] = None
+        self.key_handlers = self.createKeyHandlers()
+        self.mouse = False
+        self.mouse_motion = False
+        # Time of the latest resize which wasn't handled yet
+        self.resized_at: Optional[float] = None
+        self.polled_size = (self.term.width, self.term.height)
+        self.watch_resize = True
+        self.trimmed_at = time.monotonic()
+        self.scheduler = Scheduler(clock)
+        self.tasks = TaskRunner()
+        # Set while a replay.Recorder is recording
+        self.recorder = None
+
+    def enableMouse(self, motion: bool = False) -> None:
+        """
+        Turns on SGR 1006 mouse reporting for the next loop.
+        With motion, hovering an Interactable selects it.
+        """
+        self.mouse = True
+        self.mouse_motion = motion
+
+    def disableMouse(self) -> None:
+        self.mouse = False
+
+    def bind(self, keys: Keys, command: Callable) -> None:
+        "Binds a key or a chord like \"g g\" anywhere outside a focused element"
+        self.keymap.bind(keys, command)
+
+    def unbind(self, keys: Keys) -> None:
+        self.keymap.unbind(keys)
+
+    def getKeymaps(self) -> List[Keymap]:
+        "Keymaps in scope, innermost first: the active element, its frames, the window"
+        keymaps = []
+        element = self.active_element or self.mainframe
+        while isinstance(element, Element):
+            if element.keymap is not None:
+                keymaps.append(element.keymap)
+            element = element.parent
+        keymaps.append(self.keymap)
+        return keymaps
+
+    def checkBindings(self, val,
+                      keymaps: Optional[List[Keymap]] = None) -> Response:
+        """
+        Runs the command bound to the key, or to the chord it completes.
+        A key which doesn't continue the pending chord is resolved on its own.
+        """
+        key = keyName(val)
+        if self.pending_chord is not None:
+            node = self.pending_chord.children.get(key)
+            self.pending_chord = None
+            if node is not None:
+                return self.runBinding(node)
+        for keymap in self.getKeymaps() if keymaps is None else keymaps:
+            node = keymap.root.children.get(key)
+            if node is not None:
+                return self.runBinding(node)
+        return Response.CONTINUE
 
-    def checkBindings(self, val) -> Response:
-        if val.is_sequence:
-            val = val.name
+    def runBinding(self, node: KeymapNode) -> Response:
+        if node.command is None:
+            self.pending_chord = node
         else:
-            val = val.lower()
-        for hotkey in self.hotkeys:
-            if hotkey == val:
-                self.hotkeys[val]()
-                return Response.COMPLETE
-        return Response.CONTINUE
+            node.command()
+        return Response.COMPLETE
 
     def getWindow(self) -> Window:
         return self
 
     def draw(self) -> None:
         self.clear()
-        self.mainframe.draw()
+        for screen in self.getVisibleScreens():
+            screen.draw()
+
+    def getLayer(self) -> Layer:
+        return self.compositor.base
+
+    def getDefaultStyle(self,
+                        bg_color: Optional[str] = None,
+                        text_style: Optional[str] = None,
+                        border_color: Optional[str] = None,
+                        border_style: Optional[BorderStyle] = None) -> BoxStyle:
+        "Builds a style from palette names, shared by every widget of the window"
+        key = (bg_color, text_style, border_color, border_style)
+        style = self.default_styles.get(key)
+        if style is None:
+            palette = self.palette
+            style = BoxStyle(
+                bg_color=getattr(palette, bg_color) if bg_color else None,
+                text_style=getattr(palette, text_style) if text_style else None,
+                border_color=getattr(palette, border_color)
+                if border_color else None,
+                border_style=border_style)
+            self.default_styles[key] = style
+        return style
 
     def moveXY(self, p: Point) -> str:  # TODO issue 17
         return self.term.move_xy(p.x, p.y)
 
     def clear(self) -> None:
-        print(self.term.normal + self.term.clear)
+        self.compositor.clear()
 
     def flush(self) -> None:
-        "Resets pointer and color"
-        print(self.term.home + self.term.normal)
+        if self.flush_depth:
+            self.flush_pending = True
+            return
+        self.compositor.flush()
+
+    @contextmanager
+    def deferFlush(self) -> Iterator[None]:
+        "Draws inside the block are flushed once, as a single frame"
+        self.flush_depth += 1
+        try:
+            yield
+        finally:
+            self.flush_depth -= 1
+            if not self.flush_depth and self.flush_pending:
+                self.flush_pending = False
+                self.flush()
+
+    def scheduleBinding(self, binding: Binding) -> None:
+        with self.binding_lock:
+            self.pending_bindings[binding] = None
+
+    def applyBindings(self) -> None:
+        "Updates the widgets whose bound values changed, in one frame"
+        if not self.pending_bindings:
+            return
+        with self.binding_lock:
+            pending = self.pending_bindings
+            self.pending_bindings = {}
+        with self.deferFlush():
+            for binding in pending:
+                binding.apply()
+
+    def capTimeout(self, timeout: float) -> float:
+        """
+        Shortens waits for input so bound values and results of commands
+        running in pools show up within a frame, and timers run on time
+        """
+        if self.pending_bindings or self.tasks.hasCompleted():
+            return 0
+        if self.binding_count or self.tasks.running:
+            timeout = min(timeout, FRAME_INTERVAL)
+        deadline = self.scheduler.getTimeout()
+        if deadline is not None:
+            timeout = min(timeout, deadline)
+        return timeout
+
+    def after(self, delay: float, command: Callable) -> Timer:
+        "Runs command once from the loop, delay seconds from now"
+        return self.scheduler.after(delay, command)
+
+    def every(self,
+              interval: float,
+              command: Callable,
+              delay: Optional[float] = None) -> Timer:
+        "Runs command from the loop every interval seconds, e.g. for a clock"
+        return self.scheduler.every(interval, command, delay)
+
+    def runTimers(self) -> Response:
+        "Runs the due timers in one frame, QUIT if one of them returned it"
+        with self.deferFlush():
+            results = self.scheduler.runDue()
+        if Response.QUIT in results:
+            return Response.QUIT
+        return Response.CONTINUE
+
+    def submit(self,
+               command: Callable,
+               *args,
+               kind: ExecutorKind = ExecutorKind.THREAD,
+               on_result: Optional[Callable] = None,
+               on_error: Optional[Callable] = None) -> Task:
+        """
+        Runs command in a thread or process pool without blocking input.
+        on_result and on_error are called from the loop once it finishes.
+        """
+        return self.tasks.submit(command,
+                                 *args,
+                                 kind=kind,
+                                 on_result=on_result,
+                                 on_error=on_error)
+
+    def runTasks(self) -> Response:
+        "Delivers finished commands in one frame, QUIT if a callback returned it"
+        if not self.tasks.hasCompleted():
+            return Response.CONTINUE
+        with self.deferFlush():
+            results = self.tasks.runCompleted()
+        if Response.QUIT in results:
+            return Response.QUIT
+        return Response.CONTINUE
 
     def getAllElements(self,
                        element_filter: Optional[Callable] = None
@@ -812,35 +1564,48 @@ class Window():
         return self.getAllElements(lambda element: isinstance(
             element, Interactable) and element.isActive())
 
+    def getElementsIn(self, box: Box) -> List[Element]:
+        "Returns the visible elements which intersect the box"
+        return self.geometry.getElements(
+            self.geometry.getIntersectingMask(box.left, box.top, box.right,
+                                              box.bottom))
+
+    def getVisibleElements(self) -> List[Element]:
+        "Returns the placed elements whose whole ancestry is active and which are on screen"
+        return self.getElementsIn(self.mainframe.getBorder())
+
+    def useBatchQueries(self) -> bool:
+        return self.geometry.size >= BATCH_QUERY_THRESHOLD
+
+    # Edge compared when looking for the extreme element in a direction, and
+    # whether the largest (1) or the smallest (-1) one wins
+    extreme_edges: Dict[Direction, Tuple[Side, int]] = {
+        Direction.DOWN: (Side.TOP, 1),
+        Direction.RIGHT: (Side.RIGHT, 1),
+        Direction.UP: (Side.BOTTOM, -1),
+        Direction.LEFT: (Side.LEFT, -1),
+    }
+
     def getExtremeElement(self, direction: Direction) -> Optional[Interactable]:
+        if self.useBatchQueries():
+            return self.getExtremeElementBatch(direction)
+        side, sign = self.extreme_edges[direction]
         extreme_element: Optional[Interactable] = None
-        if direction is Direction.DOWN:
-            highest_y = 0
-            for element in self.getAllInteractive():
-                if element.getBorder().getEdge(Side.TOP) >= highest_y:
-                    highest_y = element.getBorder().getEdge(Side.TOP)
-                    extreme_element = element
-        elif direction is Direction.RIGHT:
-            highest_x = 0
-            for element in self.getAllInteractive():
-                if element.getBorder().getEdge(Side.RIGHT) >= highest_x:
-                    highest_x = element.getBorder().getEdge(Side.RIGHT)
-                    extreme_element = element
-        elif direction is Direction.UP:
-            lowest_y = float('inf')
-            for element in self.getAllInteractive():
-                if element.getBorder().getEdge(Side.BOTTOM) <= lowest_y:
-                    lowest_y = element.getBorder().getEdge(Side.BOTTOM)
-                    extreme_element = element
-        elif direction is Direction.LEFT:
-            lowest_x = float('inf')
-            for element in self.getAllInteractive():
-                if element.getBorder().getEdge(Side.LEFT) <= lowest_x:
-                    lowest_x = element.getBorder().getEdge(Side.LEFT)
-                    extreme_element = element
-
+        # Edges are compared multiplied by sign, the largest wins
+        extreme = 0 if sign > 0 else float('-inf')
+        for element in self.getAllInteractive():
+            edge = element.getBorder().getEdge(side) * sign
+            # Last of the tied elements wins
+            if edge >= extreme:
+                extreme = edge
+                extreme_element = element
         return extreme_element
 
+    def getExtremeElementBatch(self,
+                               direction: Direction) -> Optional[Interactable]:
+        "Same search over the geometry store's arrays"
+        return self.geometry.findExtreme(direction)
+
     def calculateWeightedDistance(self, p1: Point, p2: Point,
                                   direction: Direction) -> float:
         delta_x = p1.x - p2.x
@@ -888,6 +1653,10 @@ class Window():
         else:
             assert (isinstance(self.active_element, Element))
             active_point = self.getActivePoint(self.active_element, direction)
+            if self.useBatchQueries():
+                return self.geometry.findNearest(self.active_element.slot,
+                                                 active_point.x,
+                                                 active_point.y, direction)
             min_wighted_distance = float('inf')
             closest_element: Optional[Interactable] = None
             for element in self.getAllInteractive():
@@ -914,95 +1683,344 @@ class Window():
     def removeElement(self, element: Element) -> None:
         raise Exception("Not allowed to remove elements from Window")
 
+    def getVisibleScreens(self) -> List[Screen]:
+        "The current screen and the screens its modals show, bottom first"
+        screens = [self.screen]
+        index = len(self.screens)
+        while screens[-1].modal and index:
+            index -= 1
+            screens.append(self.screens[index])
+        return screens[::-1]
+
+    def pushScreen(self, modal: bool = False) -> AbsoluteFrame:
+        """
+        Shows a new empty screen and returns its root frame to build it in.
+        The current screen keeps its widgets and layers for popScreen. A modal
+        screen is drawn over it, leaving it visible but without input.
+        """
+        if self.mainframe.layer is None:
+            # The first screen draws on the compositor's base layer
+            self.mainframe.layer = self.compositor.base
+        self.screen.save(self)
+        self.screens.append(self.screen)
+        self.geometry.setActive(self.mainframe.slot, False)
+        self.active_element = None
+        self.window_state = WindowState.VIEW
+        self.pending_chord = None
+        layer = self.compositor.pushLayers(transparent=modal)
+        AbsoluteFrame(self, self.compositor.width, self.compositor.height)
+        self.mainframe.layer = layer
+        self.screen = Screen(self.mainframe, modal)
+        # A modal root has no background, it only holds the dialog's frames
+        self.mainframe.activate(draw=not modal)
+        return self.mainframe
+
+    def popScreen(self) -> None:
+        """
+        Closes the current screen and shows the previous one from its saved
+        layers, only the cells which differ are written on the next flush
+        """
+        if not self.screens:
+            raise EmptyScreenStack("There's no screen under the current one")
+        self.discardScreen()
+        self.compositor.popLayers()
+        self.screen = self.screens.pop()
+        self.screen.restore(self)
+        with self.deferFlush():
+            # The terminal may have been resized while the screen was covered
+            self.resize(self.compositor.width, self.compositor.height)
+            self.flush()
+
+    def replaceScreen(self, modal: bool = False) -> AbsoluteFrame:
+        "Closes the current screen and shows a new empty one in its place"
+        if self.screens:
+            self.popScreen()
+            return self.pushScreen(modal)
+        self.discardScreen()
+        self.compositor.layers = [self.compositor.base]
+        self.compositor.reset()
+        self.compositor.repaint()
+        AbsoluteFrame(self, self.compositor.width, self.compositor.height)
+        self.mainframe.layer = self.compositor.base
+        self.screen = Screen(self.mainframe, modal=False)
+        self.active_element = None
+        self.window_state = WindowState.VIEW
+        self.pending_chord = None
+        self.mainframe.activate()
+        return self.mainframe
+
+    def discardScreen(self) -> None:
+        "Unbinds the values shown by the current screen and frees its slots"
+        frames: List[Frame] = [self.mainframe]
+        while frames:
+            for element in frames.pop().elements:
+                if isinstance(element, HasText):
+                    element.unbindValue()
+                elif isinstance(element, Frame):
+                    frames.append(element)
+        self.active_element = None
+        self.geometry.release(self.mainframe.slot)
+
+    def createKeyHandlers(
+            self) -> Dict[WindowState, Dict[str, Callable[[], None]]]:
+        "Keys the window handles itself in each state, by key name"
+        view = {}
+        selection = {}
+        for direction in Direction:
+            name = f"KEY_{direction.name}"
+            view[name] = partial(self.selectExtreme, direction)
+            selection[name] = partial(self.moveSelection, direction)
+        selection["KEY_ENTER"] = self.clickSelected
+        selection["KEY_ESCAPE"] = self.clearSelection
+        selection["KEY_BACKSPACE"] = self.clearSelection
+        return {WindowState.VIEW: view, WindowState.SELECTION: selection}
+
+    def selectExtreme(self, direction: Direction) -> None:
+        # Active element can't be set if WindowState.VIEW
+        assert (self.active_element is None)
+        self.active_element = self.getExtremeElement(direction)
+        if self.active_element is not None:
+            self.active_element.toggleSelected()
+            self.window_state = WindowState.SELECTION
+
+    def moveSelection(self, direction: Direction) -> None:
+        # Active element must be set if WindowState.SELECTION
+        assert (isinstance(self.active_element, Interactable))
+        next_element = self.active_element.navigate(direction)
+        if not next_element:
+            next_element = self.findElement(direction)
+        if next_element:  # If a good next element is found
+            self.active_element.toggleSelected()
+            self.active_element = next_element
+            self.active_element.toggleSelected()
+
+    def clickSelected(self) -> None:
+        assert (isinstance(self.active_element, Interactable))
+        if self.active_element.click() is Response.FOCUSED:
+            self.window_state = WindowState.FOCUSED
+
+    def clearSelection(self) -> None:
+        assert (isinstance(self.active_element, Interactable))
+        self.window_state = WindowState.VIEW
+        self.active_element.toggleSelected()
+        self.active_element = None
+
     def handleKeyEvent(self, val) -> Response:
         if not val:
-            pass
-        else:
-            if self.window_state is WindowState.VIEW:
-                # Active element can't be set if WindowState.VIEW
-                assert (self.active_element is None)
-                res = self.checkBindings(val)
-                if res is Response.COMPLETE:
-                    return Response.COMPLETE
-                if val.is_sequence:
-                    if val.name == "KEY_UP":
-                        self.active_element = self.getExtremeElement(
-                            Direction.UP)
-                    elif val.name == "KEY_RIGHT":
-                        self.active_element = self.getExtremeElement(
-                            Direction.RIGHT)
-                    elif val.name == "KEY_DOWN":
-                        self.active_element = self.getExtremeElement(
-                            Direction.DOWN)
-                    elif val.name == "KEY_LEFT":
-                        self.active_element = self.getExtremeElement(
-                            Direction.LEFT)
-
-                    if self.active_element is not None:
-                        self.active_element.toggleSelected()
-                        self.window_state = WindowState.SELECTION
-                elif val:
-                    if val.lower() == 'q':
-                        return Response.QUIT
-            elif self.window_state is WindowState.SELECTION:
-                # Active element must be set if WindowState.SELECTION
-                assert (isinstance(self.active_element, Interactable))
-                res = self.checkBindings(val)
-                if res is Response.COMPLETE:
-                    return Response.COMPLETE
-                direction = None
-                next_element = None
-                if val.is_sequence:
-                    if val.name == "KEY_UP":
-                        direction = Direction.UP
-                    elif val.name == "KEY_RIGHT":
-                        direction = Direction.RIGHT
-                    elif val.name == "KEY_DOWN":
-                        direction = Direction.DOWN
-                    elif val.name == "KEY_LEFT":
-                        direction = Direction.LEFT
-                    elif val.name == "KEY_ENTER":
-                        res = self.active_element.click()
-                        if res is Response.FOCUSED:
-                            self.window_state = WindowState.FOCUSED
-                    elif val.name == "KEY_ESCAPE" or val.name == "KEY_BACKSPACE":
-                        self.window_state = WindowState.VIEW
-                        self.active_element.toggleSelected()
-                        self.active_element = None
-                    if direction:  # If a key is pressed which gives direction
-                        # If a direction is given the active element couldn't have been set to None
-                        assert (self.active_element is not None)
-                        next_element = self.active_element.navigate(direction)
-                        if not next_element:
-                            next_element = self.findElement(direction)
-                        if next_element:  # If a good next element is found
-                            self.active_element.toggleSelected()
-                            self.active_element = next_element
-                            self.active_element.toggleSelected()
-                elif val:
-                    if val.lower() == 'q':
-                        return Response.QUIT
-            elif self.window_state is WindowState.FOCUSED:
-                assert (isinstance(self.active_element, Focusable))
-                res = self.active_element.handleKeyEvent(val)
-                if res is Response.UNFOCUSED:
-                    self.window_state = WindowState.SELECTION
-                elif res is Response.CONTINUE:
-                    if val:
-                        if val.lower() == 'q':
-                            return Response.QUIT
-                elif res is Response.QUIT:
-                    return Response.QUIT
+            return Response.CONTINUE
+        if self.window_state is WindowState.FOCUSED:
+            return self.handleFocusedKeyEvent(val)
+        if self.checkBindings(val) is Response.COMPLETE:
+            return Response.COMPLETE
+        handler = self.key_handlers[self.window_state].get(keyName(val))
+        if handler is not None:
+            handler()
+        elif not val.is_sequence and val.lower() == 'q':
+            return Response.QUIT
         return Response.CONTINUE
 
+    def handleFocusedKeyEvent(self, val) -> Response:
+        "The focused element gets the keys, except those bound on the element itself"
+        assert (isinstance(self.active_element, Focusable))
+        keymap = self.active_element.keymap
+        if keymap is not None and self.checkBindings(
+                val, [keymap]) is Response.COMPLETE:
+            return Response.COMPLETE
+        res = self.active_element.handleKeyEvent(val)
+        if res is Response.UNFOCUSED:
+            self.window_state = WindowState.SELECTION
+        elif res is Response.CONTINUE:
+            if val.lower() == 'q':
+                return Response.QUIT
+        elif res is Response.QUIT:
+            return Response.QUIT
+        return Response.CONTINUE
+
+    def onResizeSignal(self, signum, frame) -> None:
+        self.resized_at = time.monotonic()
+
+    def checkResize(self) -> None:
+        """
+        Resizes once the terminal size has been stable for RESIZE_SETTLE seconds,
+        so dragging the window edge results in a single relayout and repaint.
+        """
+        now = time.monotonic()
+        if not hasattr(signal, "SIGWINCH"):
+            size = (self.term.width, self.term.height)
+            if size != (self.mainframe.width, self.mainframe.height):
+                if self.resized_at is None or size != self.polled_size:
+                    self.resized_at = now
+                self.polled_size = size
+        if self.resized_at is not None and now - self.resized_at >= RESIZE_SETTLE:
+            self.resized_at = None
+            self.resize(self.term.width, self.term.height)
+
+    def checkTrim(self) -> None:
+        "Trims elements inactive for TRIM_AGE seconds, every TRIM_INTERVAL seconds"
+        now = time.monotonic()
+        if now - self.trimmed_at < TRIM_INTERVAL:
+            return
+        self.trimmed_at = now
+        self.trimInactive(now - TRIM_AGE)
+
+    def trimInactive(self, before: float) -> None:
+        "Trims the subtrees which were deactivated before the given time"
+        frames: List[Frame] = [self.mainframe]
+        while frames:
+            for element in frames.pop().elements:
+                if element.isActive():
+                    if isinstance(element, Frame):
+                        frames.append(element)
+                elif (element.inactive_since is not None and
+                      element.inactive_since <= before):
+                    element.trim()
+                    element.inactive_since = None
+
+    def getTimeout(self) -> float:
+        if not self.watch_resize:
+            return self.capTimeout(IDLE_TIMEOUT)
+        if self.resized_at is not None:
+            return self.capTimeout(RESIZE_SETTLE)
+        return self.capTimeout(RESIZE_POLL_INTERVAL)
+
+    def resize(self, width: int, height: int) -> None:
+        "Relayouts the frames whose available space changed and repaints once"
+        if (width, height) == (self.mainframe.width, self.mainframe.height):
+            return
+        roots = [screen.root for screen in self.getVisibleScreens()]
+        for root in roots:
+            root.width = width
+            root.height = height
+            root.border = Box(Point(0, 0), Point(width, height))
+        self.compositor.resize(width, height)
+        for root in roots:
+            root.relayout()
+        self.draw()
+
+    def readEvents(self, timeout: float) -> List:
+        """
+        Waits for input and returns everything received up to now.
+        Consecutive mouse motion reports are coalesced into the latest one,
+        so a flood of them costs a single hit test per frame.
+        """
+        val = self.term.inkey(timeout=timeout)
+        if not self.mouse:
+            return [val]
+        events: List = []
+        while val:
+            event = readMouseEvent(self.term, val) or val
+            if (isinstance(event, MouseEvent) and
+                    event.action is MouseAction.MOTION and events and
+                    isinstance(events[-1], MouseEvent) and
+                    events[-1].action is MouseAction.MOTION):
+                events[-1] = event
+            else:
+                events.append(event)
+            val = self.term.inkey(timeout=0)
+        return events or [val]
+
+    def handleEvent(self, event) -> Response:
+        if self.recorder is not None:
+            self.recorder.record(event)
+        if isinstance(event, MouseEvent):
+            return self.handleMouseEvent(event)
+        return self.handleKeyEvent(event)
+
+    def selectElement(self, element: Interactable) -> None:
+        if self.active_element is element:
+            return
+        if self.active_element is not None:
+            self.active_element.toggleSelected()
+        self.active_element = element
+        self.active_element.toggleSelected()
+        self.window_state = WindowState.SELECTION
+
+    def scrollAt(self, event: MouseEvent) -> None:
+        "Scrolls the innermost element under the pointer which supports it"
+        lines = 1 if event.action is MouseAction.WHEEL_DOWN else -1
+        if self.window_state is WindowState.FOCUSED:
+            element = self.active_element
+        else:
+            element = self.geometry.hitTest(event.x, event.y,
+                                            interactive=False)
+        while isinstance(element, Element):
+            scroll = getattr(element, "scroll", None)
+            if scroll is not None:
+                scroll(lines)
+                return
+            element = element.parent
+
+    def handleMouseEvent(self, event: MouseEvent) -> Response:
+        if event.action in (MouseAction.WHEEL_UP, MouseAction.WHEEL_DOWN):
+            self.scrollAt(event)
+            return Response.COMPLETE
+        if event.action is MouseAction.RELEASE:
+            return Response.CONTINUE
+        if self.window_state is WindowState.FOCUSED:
+            return self.handleFocusedMouseEvent(event)
+        return self.handleSelectionMouseEvent(event)
+
+    def handleFocusedMouseEvent(self, event: MouseEvent) -> Response:
+        "Presses go to the focused element, wherever they are"
+        if event.action is not MouseAction.PRESS:
+            return Response.CONTINUE
+        assert (isinstance(self.active_element, Focusable))
+        target = self.geometry.hitTest(event.x, event.y)
+        res = self.active_element.handleMouseEvent(event, target)
+        if res is Response.UNFOCUSED:
+            self.window_state = WindowState.SELECTION
+        elif res is Response.QUIT:
+            return Response.QUIT
+        return Response.COMPLETE
+
+    def handleSelectionMouseEvent(self, event: MouseEvent) -> Response:
+        "Selects the element under the pointer, left presses click it"
+        target = self.geometry.hitTest(event.x, event.y)
+        if target is None:
+            return Response.CONTINUE
+        if event.action is MouseAction.MOTION:
+            if self.mouse_motion:
+                self.selectElement(target)
+            return Response.COMPLETE
+        if event.button is MouseButton.LEFT:
+            self.selectElement(target)
+            res = target.click()
+            if res is Response.FOCUSED:
+                self.window_state = WindowState.FOCUSED
+            elif res is Response.QUIT:
+                return Response.QUIT
+        return Response.COMPLETE
+
     def loop(self):
         with self.term.cbreak():
+            if self.mouse:
+                print(enableSequence(self.mouse_motion), end='', flush=True)
+            if self.watch_resize and hasattr(signal, "SIGWINCH"):
+                previous_handler = signal.signal(signal.SIGWINCH,
+                                                 self.onResizeSignal)
             self.clear()
             self.draw()
             res = Response.CONTINUE
-            while res != Response.QUIT:
-                val = self.term.inkey(timeout=3)
-                res = self.handleKeyEvent(val)
+            try:
+                while res != Response.QUIT:
+                    for event in self.readEvents(timeout=self.getTimeout()):
+                        res = self.handleEvent(event)
+                        if res is Response.QUIT:
+                            break
+                    if res is not Response.QUIT:
+                        res = self.runTimers()
+                    if res is not Response.QUIT:
+                        res = self.runTasks()
+                    self.applyBindings()
+                    if self.watch_resize:
+                        self.checkResize()
+                    self.checkTrim()
+            finally:
+                self.tasks.shutdown()
+                if self.mouse:
+                    print(disableSequence(self.mouse_motion), end='')
+                if self.watch_resize and hasattr(signal, "SIGWINCH"):
+                    signal.signal(signal.SIGWINCH, previous_handler)
             self.clear()
             self.flush()
 
@@ -1010,155 +2028,262 @@ class Window():
 Parent = Union[Frame, Window]
 
 
+class Screen():
+    "Widget tree of a Window screen, and its input state while it's covered"
+    __slots__ = ("root", "modal", "active_element", "window_state")
+
+    def __init__(self, root: AbsoluteFrame, modal: bool) -> None:
+        self.root = root
+        self.modal = modal
+        self.active_element: Optional[Interactable] = None
+        self.window_state = WindowState.VIEW
+
+    def save(self, window: Window) -> None:
+        self.active_element = window.active_element
+        self.window_state = window.window_state
+
+    def restore(self, window: Window) -> None:
+        window.mainframe = self.root
+        window.active_element = self.active_element
+        window.window_state = self.window_state
+        window.pending_chord = None
+        window.geometry.setActive(self.root.slot, True)
+
+    def draw(self) -> None:
+        if not self.modal:
+            self.root.draw()
+            return
+        # A modal root has no background, the screens under it show through
+        for element in self.root.elements:
+            if element.isPlaced() and element.isActive():
+                element.draw()
+
+
 class Box():
+    "Immutable rectangle, edges and center are computed once on creation"
+    __slots__ = ("p1", "p2", "left", "top", "right", "bottom", "center")
 
     def __init__(self, p1: Point, p2: Point) -> None:
-        self.setP1(p1)
-        self.setP2(p2)
-        self.updateCorners()
+        left, right = (p1.x, p2.x) if p1.x <= p2.x else (p2.x, p1.x)
+        top, bottom = (p1.y, p2.y) if p1.y <= p2.y else (p2.y, p1.y)
+        setattr_ = object.__setattr__
+        setattr_(self, "p1", p1)
+        setattr_(self, "p2", p2)
+        setattr_(self, "left", left)
+        setattr_(self, "top", top)
+        setattr_(self, "right", right)
+        setattr_(self, "bottom", bottom)
+        setattr_(
+            self, "center",
+            Point(left + (right - left) // 2, bottom + (bottom - top) // 2))
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
 
     def __str__(self) -> str:
         return f"[{self.p1}, {self.p2}]"
 
-    def setP1(self, p1: Point) -> None:
-        self.p1 = p1
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Box):
+            return NotImplemented
+        return (self.left, self.top, self.right,
+                self.bottom) == (other.left, other.top, other.right,
+                                 other.bottom)
 
-    def setP2(self, p2: Point) -> None:
-        self.p2 = p2
+    def __hash__(self) -> int:
+        return hash((self.left, self.top, self.right, self.bottom))
 
-    def updateCorners(self) -> None:
-        self.corners = {
-            "tl": Point(min(self.p1.x, self.p2.x), min(self.p1.y, self.p2.y)),
-            "tr": Point(max(self.p1.x, self.p2.x), min(self.p1.y, self.p2.y)),
-            "bl": Point(min(self.p1.x, self.p2.x), max(self.p1.y, self.p2.y)),
-            "br": Point(max(self.p1.x, self.p2.x), max(self.p1.y, self.p2.y))
-        }
+    def offset(self, p: Point) -> Box:
+        "Returns a copy of the box moved by p"
+        return Box(self.p1 + p, self.p2 + p)
 
     def getEdge(self, side: Side) -> int:
         if side is Side.TOP:
-            return self.corners["tl"].y
+            return self.top
         elif side is Side.RIGHT:
-            return self.corners["tr"].x
+            return self.right
         elif side is Side.BOTTOM:
-            return self.corners["bl"].y
+            return self.bottom
         else:  # LEFT
-            return self.corners["bl"].x
+            return self.left
 
     def getWidth(self) -> int:
-        return self.getEdge(Side.RIGHT) - self.getEdge(Side.LEFT)
+        return self.right - self.left
 
     def getHeight(self) -> int:
-        return self.getEdge(Side.BOTTOM) - self.getEdge(Side.TOP)
+        return self.bottom - self.top
 
     def getMiddleX(self) -> int:
-        return self.getEdge(Side.LEFT) + self.getWidth() // 2
+        return self.center.x
 
     def getMiddleY(self) -> int:
-        return self.getEdge(Side.BOTTOM) + self.getHeight() // 2
+        return self.center.y
 
     def getCenter(self) -> Point:
-        return Point(self.getMiddleX(), self.getMiddleY())
-
-    def drawBackground(self, window: Window, style: BoxStyle) -> None:
-        command = ''
+        return self.center
+
+    def drawBackground(self,
+                       window: Window,
+                       style: BoxStyle,
+                       layer: Optional[Layer] = None) -> None:
+        if layer is None:
+            layer = window.getLayer()
+        attr = ''
         if style.bg_color:
-            command += style.bg_color
+            attr += style.bg_color
+        width = self.getWidth()
         if style.border_style is not BorderStyle.NONE and style.border_style is not None:
-            if self.getWidth() < 2 or self.getHeight() < 2:
+            if width < 2 or self.getHeight() < 2:
                 raise RectangleTooSmall(
                     "Unable to fit border on such small rectangle, must be at least 2x2"
                 )
             else:
                 if style.border_color:
-                    command += style.border_color
-                for row in range(self.getEdge(Side.TOP),
-                                 self.getEdge(Side.BOTTOM) + 1):
-                    command += window.moveXY(Point(self.getEdge(Side.LEFT),
-                                                   row))
-                    if row == self.getEdge(Side.BOTTOM):
-                        if style.border_style is BorderStyle.SINGLE:
-                            command += "└" + "─" * (self.getWidth() - 2) + "┘"
-                        elif style.border_style is BorderStyle.DOUBLE:
-                            command += "╚" + "═" * (self.getWidth() - 2) + "╝"
-                    elif row == self.getEdge(Side.TOP):
-                        if style.border_style is BorderStyle.SINGLE:
-                            command += "┌" + "─" * (self.getWidth() - 2) + "┐"
-                        elif style.border_style is BorderStyle.DOUBLE:
-                            command += "╔" + "═" * (self.getWidth() - 2) + "╗"
-                    else:
-                        if style.border_style is BorderStyle.SINGLE:
-                            command += "│" + " " * (self.getWidth() - 2) + "│"
-                        elif style.border_style is BorderStyle.DOUBLE:
-                            command += "║" + " " * (self.getWidth() - 2) + "║"
+                    attr += style.border_color
+                if style.border_style is BorderStyle.SINGLE:
+                    top = "┌" + "─" * (width - 2) + "┐"
+                    middle = "│" + " " * (width - 2) + "│"
+                    bottom = "└" + "─" * (width - 2) + "┘"
+                else:
+                    top = "╔" + "═" * (width - 2) + "╗"
+                    middle = "║" + " " * (width - 2) + "║"
+                    bottom = "╚" + "═" * (width - 2) + "╝"
+                layer.write(self.left, self.top, top, attr)
+                for row in range(self.top + 1, self.bottom):
+                    layer.write(self.left, row, middle, attr)
+                layer.write(self.left, self.bottom, bottom, attr)
 
         else:
             if style.bg_color:
-                for row in range(self.getEdge(Side.TOP),
-                                 self.getEdge(Side.BOTTOM) + 1):
-                    command += window.moveXY(Point(self.getEdge(Side.LEFT),
-                                                   row))
-                    command += " " * self.getWidth()
+                for row in range(self.top, self.bottom + 1):
+                    layer.write(self.left, row, " " * width, attr)
 
-        print(command)
         window.flush()
 
-    def writeText(self, window: Window, style: BoxStyle, text: Optional[str],
-                  padding: List[int], h_align: HAlignment,
-                  v_align: VAlignment) -> None:
-        command = ''
-        if text:
-            # Text style
-            if style.bg_color:
-                command += style.bg_color
-            if style.text_style:
-                command += style.text_style
-
-            # Cut of text if it wont fit
-            max_text_len = self.getWidth() - (padding[1] + padding[3])
-            text = text[:max_text_len]
-
-            # Text alignment
-            # Horizontal
-            if h_align is HAlignment.LEFT:
-                text_start_x = self.getEdge(Side.LEFT) + padding[3]
-            elif h_align is HAlignment.MIDDLE:
-                text_start_x = self.getEdge(Side.LEFT) + padding[3] + (
-                    self.getWidth() // 2) - (len(text) // 2)
-            elif h_align is HAlignment.RIGHT:
-                text_start_x = self.getEdge(Side.RIGHT) - padding[1] - len(text)
-            # Vertical
-            if v_align is VAlignment.TOP:
-                text_start_y = self.getEdge(Side.BOTTOM) - padding[0]
-            elif v_align is VAlignment.MIDDLE:
-                text_start_y = self.getEdge(
-                    Side.BOTTOM) - padding[0] - (self.getHeight() // 2)
-            elif v_align is VAlignment.BOTTOM:
-                text_start_y = self.getEdge(Side.TOP) + padding[2]
-
-            command += window.moveXY(Point(text_start_x, text_start_y))
-            command += text
-            print(command)
-            window.flush()
-
-    def draw(self, window: Window, style: BoxStyle, text: Optional[str],
-             padding: List[int], h_align: HAlignment,
-             v_align: VAlignment) -> None:
-        self.drawBackground(window, style)
-        self.writeText(window, style, text, padding, h_align, v_align)
+    def writeText(self,
+                  window: Window,
+                  style: BoxStyle,
+                  text: Optional[str],
+                  padding: List[int],
+                  h_align: HAlignment,
+                  v_align: VAlignment,
+                  layer: Optional[Layer] = None) -> None:
+        if layer is None:
+            layer = window.getLayer()
+        if not text:
+            return
+        # Text style
+        attr = ''
+        if style.bg_color:
+            attr += style.bg_color
+        if style.text_style:
+            attr += style.text_style
 
+        # Cut of text if it wont fit
+        max_text_len = self.getWidth() - (padding[1] + padding[3])
+        text = truncate(text, max_text_len)
+        x = self.getTextX(padding, h_align, textWidth(text))
+        y = self.getTextY(padding, v_align)
+        layer.write(x, y, text, attr)
+        window.flush()
 
-class BoxStyle():
+    def getTextX(self, padding: List[int], h_align: HAlignment,
+                 text_width: int) -> int:
+        if h_align is HAlignment.LEFT:
+            return self.getEdge(Side.LEFT) + padding[3]
+        if h_align is HAlignment.MIDDLE:
+            return self.getEdge(Side.LEFT) + padding[3] + (
+                self.getWidth() // 2) - (text_width // 2)
+        return self.getEdge(Side.RIGHT) - padding[1] - text_width
+
+    def getTextY(self, padding: List[int], v_align: VAlignment) -> int:
+        if v_align is VAlignment.TOP:
+            return self.getEdge(Side.BOTTOM) - padding[0]
+        if v_align is VAlignment.MIDDLE:
+            return self.getEdge(
+                Side.BOTTOM) - padding[0] - (self.getHeight() // 2)
+        return self.getEdge(Side.TOP) + padding[2]
+
+    def draw(self,
+             window: Window,
+             style: BoxStyle,
+             text: Optional[str],
+             padding: List[int],
+             h_align: HAlignment,
+             v_align: VAlignment,
+             layer: Optional[Layer] = None) -> None:
+        self.drawBackground(window, style, layer)
+        self.writeText(window, style, text, padding, h_align, v_align, layer)
 
-    def __init__(self,
-                 bg_color: Optional[str] = None,
-                 text_style: Optional[str] = None,
-                 border_color: Optional[str] = None,
-                 border_style: Optional[BorderStyle] = None) -> None:
+
+class BoxStyle():
+    """
+    Immutable and interned: constructing a style equal to a live one returns
+    that instance, so widgets with the same look share one object and
+    styles compare by identity.
+    """
+    __slots__ = ("bg_color", "text_style", "border_color", "border_style",
+                 "__weakref__")
+    registry: WeakValueDictionary[tuple, BoxStyle] = WeakValueDictionary()
+
+    def __new__(cls,
+                bg_color: Optional[str] = None,
+                text_style: Optional[str] = None,
+                border_color: Optional[str] = None,
+                border_style: Optional[BorderStyle] = None) -> BoxStyle:
         "Leave all parameters empty for default style"
-        self.bg_color = bg_color
-        self.text_style = text_style
-        self.border_color = border_color
-        self.border_style = border_style
+        key = (bg_color, text_style, border_color, border_style)
+        style = cls.registry.get(key)
+        if style is None:
+            style = object.__new__(cls)
+            setattr_ = object.__setattr__
+            setattr_(style, "bg_color", bg_color)
+            setattr_(style, "text_style", text_style)
+            setattr_(style, "border_color", border_color)
+            setattr_(style, "border_style", border_style)
+            cls.registry[key] = style
+        return style
+
+    def __setattr__(self, name: str, value: object) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+
+@lru_cache(maxsize=STYLE_CACHE_SIZE)
+def resolveStyle(style: Optional[BoxStyle], parent_style: Optional[BoxStyle],
+                 default_style: BoxStyle,
+                 inheritance_vector: Tuple[bool, bool, bool, bool]) -> BoxStyle:
+    """
+    Visible.constructDefaultStyleTemplate, remembered for each combination
+    of styles since interned styles hash by identity
+    """
+    if style is None:
+        style = BoxStyle()
+    inherited_bg_color: Optional[str] = None
+    inherited_text_style: Optional[str] = None
+    inherited_border_color: Optional[str] = None
+    if parent_style is not None:
+        # Controls which features are inherited
+        if inheritance_vector[0]:
+            inherited_bg_color = parent_style.bg_color
+        if inheritance_vector[1]:
+            inherited_text_style = parent_style.text_style
+        if inheritance_vector[2]:
+            inherited_border_color = parent_style.border_color
+
+    bg_color: Optional[str] = getFirstAssigned(
+        [style.bg_color, inherited_bg_color], default=default_style.bg_color)
+    text_style: Optional[str] = getFirstAssigned(
+        [style.text_style, inherited_text_style],
+        default=default_style.text_style)
+    border_color: Optional[str] = getFirstAssigned(
+        [style.border_color, inherited_border_color],
+        default=default_style.border_color)
+    border_style: Optional[BorderStyle] = getFirstAssigned(
+        [style.border_style], default=default_style.border_style)
+    return BoxStyle(bg_color=bg_color,
+                    text_style=text_style,
+                    border_color=border_color,
+                    border_style=border_style)
 
 
 class Label(Visible, HasText):
@@ -1185,14 +2310,28 @@ class Label(Visible, HasText):
     def constructDefaultStyle(self, style: Optional[BoxStyle] = None):
         return Interactable.constructDefaultStyleTemplate(
             self,
-            default_style=BoxStyle(bg_color=self.getWindow().term.normal,
-                                   text_style=self.getWindow().term.white),
+            default_style=self.getWindow().getDefaultStyle(
+                bg_color="normal", text_style="white"),
             style=style,
             inheritance_vector=(True, True, True, True))
 
+    def reuse(
+        self,
+        width: int,
+        height: int,
+        text: Optional[str] = None,
+        style: Optional[BoxStyle] = None,
+        padding: List[int] = [0] * 4,
+        h_align: HAlignment = HAlignment.MIDDLE,
+        v_align: VAlignment = VAlignment.MIDDLE,
+    ) -> None:
+        Visible.reuse(self, width, height, style)
+        self.reuseText(text, padding, h_align, v_align, width, height)
+
     def draw(self) -> None:
         self.getBorder().draw(self.getWindow(), self.getStyle(), self.text,
-                              self.padding, self.h_align, self.v_align)
+                              self.padding, self.h_align, self.v_align,
+                              self.getLayer())
 
 
 class Button(Interactable, HasText):
@@ -1221,29 +2360,105 @@ class Button(Interactable, HasText):
             disabled_style)  # Interactable
         HasText.__init__(self, text, padding, h_align, v_align, width, height)
         self.onClick(command)
+        self.task: Optional[Task] = None
+        self.runInBackground(None)
+
+    def reuse(self,
+              width: int,
+              height: int,
+              command: Optional[Callable] = None,
+              style: Optional[BoxStyle] = None,
+              text: Optional[str] = None,
+              h_align: HAlignment = HAlignment.MIDDLE,
+              v_align: VAlignment = VAlignment.MIDDLE,
+              padding: List[int] = [0] * 4,
+              disabled_style: Optional[BoxStyle] = None,
+              selected_style: Optional[BoxStyle] = None,
+              clicked_style: Optional[BoxStyle] = None) -> None:
+        Interactable.reuse(self, width, height, style, selected_style,
+                           clicked_style, disabled_style)
+        self.reuseText(text, padding, h_align, v_align, width, height)
+        self.onClick(command)
+        self.runInBackground(None)
 
     def constructDefaultStyle(self,
                               style: Optional[BoxStyle] = None) -> BoxStyle:
         return Interactable.constructDefaultStyleTemplate(
             self,
             style=style,
-            default_style=BoxStyle(bg_color=self.getWindow().term.on_white,
-                                   text_style=self.getWindow().term.black),
+            default_style=self.getWindow().getDefaultStyle(
+                bg_color="on_white", text_style="black"),
             inheritance_vector=(False, True, False,
                                 False))  # Only inherits text style
 
     def draw(self) -> None:
         self.getBorder().draw(self.getWindow(), self.getStyle(), self.text,
-                              self.padding, self.h_align, self.v_align)
+                              self.padding, self.h_align, self.v_align,
+                              self.getLayer())
+
+    def getStyle(self) -> BoxStyle:
+        if self.task is not None:
+            return self.busy_style
+        return Interactable.getStyle(self)
 
     def onClick(self, command: Optional[Callable]) -> None:
         self.command = command
 
+    def runInBackground(self,
+                        kind: Optional[ExecutorKind] = ExecutorKind.THREAD,
+                        on_result: Optional[Callable] = None,
+                        on_error: Optional[Callable] = None,
+                        busy_style: Optional[BoxStyle] = None) -> None:
+        """
+        Runs the command in a pool when clicked, None runs it synchronously.
+        The button shows busy_style, by default its disabled style, until the
+        callback of the outcome ran. Clicking it while busy drops the stale
+        submission and submits the command again.
+        """
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.executor_kind = kind
+        self.on_result = on_result
+        self.on_error = on_error
+        self.busy_style = (self.getDisabledStyle() if busy_style is None
+                           else self.constructDefaultStyle(busy_style))
+
+    def isBusy(self) -> bool:
+        return self.task is not None
+
     def click(self) -> Response:
-        if self.command:
+        if not self.command:
+            return Response.CONTINUE
+        if self.executor_kind is None:
             return self.command()
+        if self.task is not None:
+            self.task.cancel()
+        self.task = self.getWindow().submit(
+            self.command,
+            kind=self.executor_kind,
+            on_result=self.finishTask,
+            on_error=self.failTask)
+        self.draw()
         return Response.CONTINUE
 
+    def finishTask(self, result: Any) -> Any:
+        self.endBusy()
+        if self.on_result is not None:
+            return self.on_result(result)
+        return None
+
+    def failTask(self, error: BaseException) -> Any:
+        self.endBusy()
+        if self.on_error is None:
+            raise error
+        return self.on_error(error)
+
+    def endBusy(self) -> None:
+        self.task = None
+        if self.isPlaced() and self.isActive():
+            self.draw()
+
 
 class Entry(Focusable, HasText):
 
@@ -1287,25 +2502,24 @@ class Entry(Focusable, HasText):
         self.state = State.IDLE
         self.cursor_pos = 0
         self.text: str = getFirstAssigned([self.text], '')
-        self.cursor_style: str = getFirstAssigned(
-            [cursor_style],
-            self.getWindow().term.on_goldenrod1)
-        self.cursor_bg_color: str = getFirstAssigned(
-            [cursor_bg_color],
-            self.getWindow().term.gray33)
-        self.highlight_color: str = getFirstAssigned(
-            [highlight_color],
-            self.getWindow().term.on_gray38)
+        palette = self.getWindow().palette
+        self.cursor_style: str = getFirstAssigned([cursor_style],
+                                                  palette.on_goldenrod1)
+        self.cursor_bg_color: str = getFirstAssigned([cursor_bg_color],
+                                                     palette.gray33)
+        self.highlight_color: str = getFirstAssigned([highlight_color],
+                                                     palette.on_gray38)
         self.setOnChange(on_change_command)
 
     def constructDefaultStyle(self, style: Optional[BoxStyle] = None):
         return Interactable.constructDefaultStyleTemplate(
             self,
             style=style,
-            default_style=BoxStyle(bg_color=self.getWindow().term.normal,
-                                   text_style=self.getWindow().term.white,
-                                   border_color=self.getWindow().term.white,
-                                   border_style=BorderStyle.SINGLE),
+            default_style=self.getWindow().getDefaultStyle(
+                bg_color="normal",
+                text_style="white",
+                border_color="white",
+                border_style=BorderStyle.SINGLE),
             inheritance_vector=(False, True, True,
                                 True))  # Doesn't inherit bg_color
 
@@ -1329,32 +2543,51 @@ class Entry(Focusable, HasText):
         self.focus()
         return Response.FOCUSED
 
+    def unfocus(self) -> Response:
+        res = super().unfocus()
+        if self.binding is not None:
+            # Catches up with changes refused while editing
+            self.binding.invalidate()
+        return res
+
     def getSavedText(self) -> str:
         return self.saved_text
 
+    def saveText(self) -> None:
+        self.saved_text = self.text
+        if self.binding is not None:
+            self.binding.publish(self.saved_text)
+
+    def applyBoundValue(self, value: Any) -> bool:
+        if self.state is State.FOCUSED:
+            return False
+        self.saved_text = value
+        return super().applyBoundValue(value)
+
     def handleKeyEvent(self, val) -> Response:
         "Returns True if key event was handled"
         if val.is_sequence:
             if val.name == "KEY_UP":
                 return Response.COMPLETE
             elif val.name == "KEY_RIGHT":
-                self.cursor_pos = min(self.cursor_pos + 1, len(self.text))
+                self.cursor_pos = nextOffset(self.text, self.cursor_pos)
                 self.draw()
                 return Response.COMPLETE
             elif val.name == "KEY_DOWN":
                 return Response.COMPLETE
             elif val.name == "KEY_LEFT":
-                self.cursor_pos = max(self.cursor_pos - 1, 0)
+                self.cursor_pos = previousOffset(self.text, self.cursor_pos)
                 self.draw()
                 return Response.COMPLETE
             elif val.name == "KEY_BACKSPACE":
                 if self.cursor_pos > 0:
-                    self.setText(self.text[:self.cursor_pos - 1] +
+                    start = previousOffset(self.text, self.cursor_pos)
+                    self.setText(self.text[:start] +
                                  self.text[self.cursor_pos:])
                     self.draw()
                 return Response.COMPLETE
             elif val.name == "KEY_ENTER":
-                self.saved_text = self.text
+                self.saveText()
                 self.unfocus()
                 return Response.UNFOCUSED
             elif val.name == "KEY_ESCAPE":
@@ -1364,7 +2597,7 @@ class Entry(Focusable, HasText):
         elif val:
             if self.onChange:
                 self.onChange()
-            if len(self.text) < self.getWidth(
+            if textWidth(self.text + val) <= self.getWidth(
             ):  # TODO: Support text larger than width
                 self.setText(self.text + val)
                 self.draw()
@@ -1373,21 +2606,27 @@ class Entry(Focusable, HasText):
             pass
         return Response.CONTINUE
 
+    def handleMouseEvent(self, event: MouseEvent,
+                         target: Optional[Interactable]) -> Response:
+        if target is not self:
+            # Clicking away behaves like KEY_ENTER
+            self.saveText()
+        return super().handleMouseEvent(event, target)
+
     def drawCursor(self, border: Box, window: Window) -> None:
-        command = ''
         # Cursor style
-        command += self.cursor_style
-        command += self.cursor_bg_color
+        attr = self.cursor_style + self.cursor_bg_color
 
         # Cut of text if it wont fit
         max_text_len = border.getWidth() - (self.padding[1] + self.padding[3])
-        text = self.text[:max_text_len]
+        text = truncate(self.text, max_text_len)
 
-        # Get cursor character
+        # Get cursor character and the cells before it
         if self.cursor_pos >= len(text):
             cursor_character = ' '
         else:
-            cursor_character = text[self.cursor_pos]
+            cursor_character = splitCells(text[self.cursor_pos:])[0][0]
+        cursor_x = textWidth(text[:self.cursor_pos])
 
         # Text alignment
         # Horizontal
@@ -1395,7 +2634,7 @@ class Entry(Focusable, HasText):
             text_start_x = border.getEdge(Side.LEFT) + self.padding[3]
         elif self.h_align is HAlignment.MIDDLE:
             text_start_x = border.getEdge(Side.LEFT) + self.padding[3] + (
-                border.getWidth() // 2) - (len(text) // 2)
+                border.getWidth() // 2) - (textWidth(text) // 2)
         elif self.h_align is HAlignment.RIGHT:
             text_start_x = border.getEdge(
                 Side.RIGHT) - self.padding[1] - max_text_len
@@ -1408,15 +2647,14 @@ class Entry(Focusable, HasText):
         elif self.v_align is VAlignment.BOTTOM:
             text_start_y = border.getEdge(Side.BOTTOM) + self.padding[2]
 
-        command += window.moveXY(
-            Point(text_start_x + self.cursor_pos, text_start_y))
-        command += cursor_character
-        print(command)
+        self.getLayer().write(text_start_x + cursor_x, text_start_y,
+                              cursor_character, attr)
         window.flush()
 
     def draw(self) -> None:
         self.getBorder().draw(self.getWindow(), self.getStyle(), self.text,
-                              self.padding, self.h_align, self.v_align)
+                              self.padding, self.h_align, self.v_align,
+                              self.getLayer())
         if self.state is State.FOCUSED:
             self.drawCursor(self.getBorder(), self.getWindow())
 
@@ -1448,6 +2686,8 @@ class DropdownMenu(Focusable, HasText):
             disabled_style,  # Interactable
             focused_style)  # Focusable
         HasText.__init__(self, None, padding, h_align, v_align, width, height)
+        # Gets its overlay on the first focus, until then the main button is
+        # drawn on the parent's layer
         self.itemFrame = AbsoluteFrame(parent, width, height)
         # TODO: add ▼ to main button
         self.mainButton = Button(self.itemFrame,
@@ -1460,24 +2700,55 @@ class DropdownMenu(Focusable, HasText):
                                  clicked_style=self.clicked_style,
                                  disabled_style=self.disabled_style)
         self.itemButtons: List[Button] = [self.mainButton]
+        # Arguments of items whose buttons are created on the next focus
+        self.item_specs: List[Dict[str, Any]] = []
         self.active_index = 0
         self.active_item = self.mainButton
         self.auto_redraw = auto_redraw
+        # Items were added or cleared after placing, they're placed on focus
+        self.items_changed = False
 
-    def place(self, x: int, y: int) -> None:
+    def place(self, x: int, y: int, draw: bool = True) -> None:
         self.itemFrame.height = self.getItemHeight() * len(self.itemButtons)
-        self.itemFrame.place(x, y)
-        self.mainButton.place(0, 0)
+        self.itemFrame.place(x, y, draw)
+        self.mainButton.place(0, 0, draw)
         self.border = self.mainButton.getBorder()
-        for i, itemButton in enumerate(self.itemButtons):
-            itemButton.place(0, i * self.getItemHeight())
-        self.activate()
+        self.layout_args = (x, y)
+        self.placeItems(draw)
+        self.activate(draw)
         self.itemFrame.deactivate()
 
+    def placeItems(self, draw: bool = True) -> None:
+        for i, itemButton in enumerate(self.itemButtons):
+            itemButton.place(0, i * self.getItemHeight(), draw)
+        self.items_changed = False
+
+    def materializeItems(self) -> None:
+        "Creates the buttons of the items added since the last call"
+        for spec in self.item_specs:
+            self.itemButtons.append(
+                self.itemFrame.acquire(Button, self.width, self.height,
+                                       **spec))
+        self.item_specs = []
+
     def focus(self) -> Response:
+        if self.item_specs:
+            self.materializeItems()
+            self.items_changed = True
+        if self.itemFrame.layer is None:
+            self.itemFrame.useOverlay()
+        if self.items_changed:
+            self.itemFrame.height = self.getItemHeight() * len(
+                self.itemButtons)
+            self.itemFrame.border = self.itemFrame.parent.getElementBorder(
+                self.itemFrame)
+            self.placeItems()
         self.itemFrame.activate()
         return super().focus()
 
+    def getPopup(self) -> Optional[Visible]:
+        return self.itemFrame
+
     def unfocus(self) -> Response:
         self.active_item.toggleSelected()
         self.active_index = 0
@@ -1485,13 +2756,21 @@ class DropdownMenu(Focusable, HasText):
         self.active_item.toggleSelected()
         self.itemFrame.deactivate()
         if self.auto_redraw:
-            self.getWindow().draw()
+            # Shows what the items covered straight away
+            self.getWindow().flush()
         return super().unfocus()
 
     def click(self) -> Response:
         assert (self.mainButton.command is not None)  # Always declared in init
         return self.mainButton.command()
 
+    def selectIndex(self, index: int) -> None:
+        if index != self.active_index:
+            self.active_item.toggleSelected()
+            self.active_index = index
+            self.active_item = self.itemButtons[self.active_index]
+            self.active_item.toggleSelected()
+
     def selectNext(self) -> None:
         if self.active_index < len(self.itemButtons) - 1:
             self.active_item.toggleSelected()
@@ -1529,6 +2808,24 @@ class DropdownMenu(Focusable, HasText):
                 return self.toggleFocused()
         return Response.CONTINUE
 
+    def handleMouseEvent(self, event: MouseEvent,
+                         target: Optional[Interactable]) -> Response:
+        if target in self.itemButtons:
+            assert (isinstance(target, Button))
+            self.selectIndex(self.itemButtons.index(target))
+            res = self.active_item.click()
+            if res:
+                return res
+            return Response.COMPLETE
+        return self.unfocus()
+
+    def scroll(self, lines: int) -> None:
+        for _ in range(abs(lines)):
+            if lines > 0:
+                self.selectNext()
+            else:
+                self.selectPrev()
+
     def toggleSelected(self) -> None:
         self.mainButton.toggleSelected()
         if self.state is State.SELECTED:
@@ -1539,8 +2836,8 @@ class DropdownMenu(Focusable, HasText):
     def constructDefaultStyle(self, style: Optional[BoxStyle] = None):
         return Interactable.constructDefaultStyleTemplate(
             self,
-            default_style=BoxStyle(bg_color=self.getWindow().term.on_white,
-                                   text_style=self.getWindow().term.black),
+            default_style=self.getWindow().getDefaultStyle(
+                bg_color="on_white", text_style="black"),
             style=style,
             inheritance_vector=(True, False, False, False))  # Doesn't inherit
 
@@ -1570,16 +2867,30 @@ class DropdownMenu(Focusable, HasText):
         disabled_style = getFirstAssigned([disabled_style],
                                           self.mainButton.disabled_style)
 
-        optionButton = Button(parent=self.itemFrame,
-                              width=self.width,
-                              height=self.height,
-                              command=command,
-                              text=text,
-                              style=style,
-                              selected_style=selected_style,
-                              clicked_style=clicked_style,
-                              disabled_style=disabled_style)
-        self.itemButtons.append(optionButton)
+        self.item_specs.append({
+            "command": command,
+            "text": text,
+            "style": style,
+            "selected_style": selected_style,
+            "clicked_style": clicked_style,
+            "disabled_style": disabled_style
+        })
+        if self.isPlaced():
+            self.items_changed = True
+
+    def getItemCount(self) -> int:
+        "Items including the main button and those not created yet"
+        return len(self.itemButtons) + len(self.item_specs)
+
+    def clearItems(self) -> None:
+        "Releases every item but the main button, for addItem to reuse"
+        self.itemFrame.releaseElements(*self.itemButtons[1:])
+        del self.itemButtons[1:]
+        self.item_specs = []
+        self.active_index = 0
+        self.active_item = self.mainButton
+        if self.isPlaced():
+            self.items_changed = True
 
     def draw(self) -> None:
         self.raiseIfNotPlaced()
@@ -1629,15 +2940,39 @@ class OptionMenu(DropdownMenu):
     def getValue(self) -> Optional[str]:
         return self.mainButton.text
 
+    def setOptions(self, options: List[str]) -> None:
+        "Replaces the options, reusing the buttons of the previous ones"
+        self.clearItems()
+        self.options = options
+        for option in options:
+            self.addOption(text=option)
+
     def switchOptions(self, optionIndex: int) -> Response:
         optionButton = self.itemButtons[optionIndex]
+        self.showOption(optionButton)
+        if self.binding is not None:
+            self.binding.publish(optionButton.text)
+        return self.unfocus()
 
+    def showOption(self, optionButton: Button) -> None:
         self.mainButton.text = optionButton.text
         self.mainButton.style = optionButton.style
         self.mainButton.selected_style = optionButton.selected_style
         self.mainButton.clicked_style = optionButton.clicked_style
         self.mainButton.disabled_style = optionButton.disabled_style
-        return self.unfocus()
+
+    def applyBoundValue(self, value: Any) -> bool:
+        "Selects the option with the value as text"
+        self.materializeItems()
+        for optionButton in self.itemButtons[1:]:
+            if optionButton.text == value:
+                self.showOption(optionButton)
+                break
+        else:
+            self.mainButton.text = value
+        if self.mainButton.isPlaced() and self.isActive():
+            self.mainButton.draw()
+        return True
 
     def addOption(self,
                   text: str,
@@ -1651,7 +2986,7 @@ class OptionMenu(DropdownMenu):
         if self.mainButton.text is None:
             self.mainButton.text = text
         else:
-            optionIndex = len(self.itemButtons)
+            optionIndex = self.getItemCount()
             super().addItem(text=text,
                             command=lambda: self.switchOptions(optionIndex),
                             style=style,
@@ -1661,3 +2996,680 @@ class OptionMenu(DropdownMenu):
                             selected_style=selected_style,
                             clicked_style=clicked_style,
                             disabled_style=disabled_style)
+
+
+def clampFraction(value: float, minimum: float, maximum: float) -> float:
+    if maximum <= minimum:
+        return 0.0
+    return min(max((value - minimum) / (maximum - minimum), 0.0), 1.0)
+
+
+class Meter(Visible):
+    """
+    Base of the widgets showing numbers with block characters, drawn with
+    text_style over bg_color. The rows drawn last are kept, so updates only
+    write the cells which changed instead of the whole element.
+    """
+
+    def __init__(self,
+                 parent: Parent,
+                 width: int,
+                 height: int,
+                 value: float = 0.0,
+                 minimum: float = 0.0,
+                 maximum: float = 1.0,
+                 style: Optional[BoxStyle] = None) -> None:
+        Visible.__init__(self, parent, width, height, style)
+        self.value = value
+        self.minimum = minimum
+        self.maximum = maximum
+        self.rendered: List[str] = []
+
+    def constructDefaultStyle(self, style: Optional[BoxStyle] = None):
+        return Interactable.constructDefaultStyleTemplate(
+            self,
+            default_style=self.getWindow().getDefaultStyle(
+                bg_color="normal", text_style="green"),
+            style=style,
+            inheritance_vector=(True, False, False, False))
+
+    @abstractclassmethod
+    def getRows(self, width: int, height: int) -> List[str]:
+        "One character per cell, top row first"
+        pass
+
+    def setValue(self, value: float) -> None:
+        self.value = value
+        self.update()
+
+    def pushSamples(self, samples: Iterable[float]) -> None:
+        "Shows the latest of a batch of samples"
+        samples = list(samples)
+        if samples:
+            self.setValue(samples[-1])
+
+    def draw(self) -> None:
+        self.rendered = []
+        self.update()
+
+    def trim(self) -> None:
+        self.rendered = []
+
+    def update(self) -> None:
+        "Writes the cells which changed since the last draw"
+        if not self.isPlaced() or not self.isActive():
+            return
+        border = self.getBorder()
+        rows = self.getRows(border.getWidth(), border.getHeight() + 1)
+        style = self.getStyle()
+        attr = (style.bg_color or "") + (style.text_style or "")
+        layer = self.getLayer()
+        changed = False
+        for y, row in enumerate(rows):
+            previous = self.rendered[y] if y < len(self.rendered) else None
+            if row == previous:
+                continue
+            changed = True
+            if previous is None or len(previous) != len(row):
+                layer.writeCells(border.left, border.top + y, row, attr)
+                continue
+            x = 0
+            while x < len(row):
+                if row[x] == previous[x]:
+                    x += 1
+                    continue
+                start = x
+                while x < len(row) and row[x] != previous[x]:
+                    x += 1
+                layer.writeCells(border.left + start, border.top + y,
+                                 row[start:x], attr)
+        self.rendered = rows
+        if changed:
+            self.getWindow().flush()
+
+
+class ProgressBar(Meter):
+    "Fills from the left, in eighths of a cell"
+
+    def getRows(self, width: int, height: int) -> List[str]:
+        eighths = round(
+            clampFraction(self.value, self.minimum, self.maximum) * width * 8)
+        full, part = divmod(eighths, 8)
+        row = H_BLOCKS[8] * full
+        if part:
+            row += H_BLOCKS[part]
+        return [row.ljust(width)] * height
+
+
+class Gauge(Meter):
+    "Fills from the bottom, in eighths of a cell"
+
+    def getRows(self, width: int, height: int) -> List[str]:
+        eighths = round(
+            clampFraction(self.value, self.minimum, self.maximum) * height * 8)
+        return [
+            V_BLOCKS[min(max(eighths - (height - 1 - y) * 8, 0), 8)] * width
+            for y in range(height)
+        ]
+
+
+class Sparkline(Meter):
+    """
+    Column chart of the latest samples, one per cell, newest on the right.
+    Without a maximum, the columns are scaled to the largest sample shown.
+    """
+
+    def __init__(self,
+                 parent: Parent,
+                 width: int,
+                 height: int,
+                 minimum: float = 0.0,
+                 maximum: Optional[float] = None,
+                 style: Optional[BoxStyle] = None) -> None:
+        super().__init__(parent,
+                         width,
+                         height,
+                         minimum=minimum,
+                         maximum=0.0 if maximum is None else maximum,
+                         style=style)
+        self.auto_scale = maximum is None
+        self.samples: Deque[float] = deque(maxlen=width)
+
+    def setValue(self, value: float) -> None:
+        self.pushSamples((value, ))
+
+    def pushSamples(self, samples: Iterable[float]) -> None:
+        "Adds a batch of samples, drawn as one update"
+        self.samples.extend(samples)
+        if self.samples:
+            self.value = self.samples[-1]
+        self.update()
+
+    def clearSamples(self) -> None:
+        self.samples.clear()
+        self.update()
+
+    def getRows(self, width: int, height: int) -> List[str]:
+        if self.samples.maxlen != width:
+            self.samples = deque(self.samples, maxlen=width)
+        maximum = self.maximum
+        if self.auto_scale:
+            maximum = max(self.samples, default=0.0)
+        columns = [0] * (width - len(self.samples)) + [
+            round(clampFraction(sample, self.minimum, maximum) * height * 8)
+            for sample in self.samples
+        ]
+        return [
+            "".join(V_BLOCKS[min(max(eighths - (height - 1 - y) * 8, 0), 8)]
+                    for eighths in columns) for y in range(height)
+        ]
+
+
+class DataGrid(Focusable):
+    """
+    Table of columnar data, e.g. NumPy arrays or lists, one per column.
+    Only the rows and columns that fit are formatted and drawn, so the
+    number of rows doesn't matter. Sorting reorders an index permutation
+    and leaves the columns untouched. Focus it to move the highlighted row
+    with the arrow, page and home/end keys, KEY_ENTER calls on_select_command
+    with the index of the row in the columns.
+    """
+
+    def __init__(self,
+                 parent: Parent,
+                 width: int,
+                 height: int,
+                 columns: Sequence[Sequence],
+                 headers: Optional[List[str]] = None,
+                 column_widths: Optional[List[int]] = None,
+                 formatters: Optional[List[Optional[Callable[[Any],
+                                                             str]]]] = None,
+                 style: Optional[BoxStyle] = None,
+                 selected_style: Optional[BoxStyle] = None,
+                 clicked_style: Optional[BoxStyle] = None,
+                 disabled_style: Optional[BoxStyle] = None,
+                 focused_style: Optional[BoxStyle] = None,
+                 header_style: Optional[str] = None,
+                 highlight_color: Optional[str] = None,
+                 on_select_command: Optional[Callable[[int], Any]] = None
+                 ) -> None:
+        Focusable.__init__(self, parent, width, height, style, selected_style,
+                           clicked_style, disabled_style, focused_style)
+        palette = self.getWindow().palette
+        self.header_style: str = getFirstAssigned([header_style],
+                                                  palette.bold)
+        self.highlight_color: str = getFirstAssigned([highlight_color],
+                                                     palette.on_gray38)
+        self.on_select_command = on_select_command
+        self.setColumns(columns, headers, column_widths, formatters)
+
+    def constructDefaultStyle(self, style: Optional[BoxStyle] = None):
+        return Interactable.constructDefaultStyleTemplate(
+            self,
+            default_style=self.getWindow().getDefaultStyle(
+                bg_color="normal", text_style="white"),
+            style=style,
+            inheritance_vector=(True, True, False, False))
+
+    def setColumns(self,
+                   columns: Sequence[Sequence],
+                   headers: Optional[List[str]] = None,
+                   column_widths: Optional[List[int]] = None,
+                   formatters: Optional[List[Optional[Callable[[Any],
+                                                               str]]]] = None
+                   ) -> None:
+        "Replaces the data, which is referenced and not copied"
+        lengths = {len(column) for column in columns}
+        if len(lengths) > 1:
+            raise InvalidAttributes("Columns must all have the same length")
+        self.columns = list(columns)
+        self.row_count = lengths.pop() if lengths else 0
+        self.headers = headers
+        if column_widths is None:
+            column_widths = [
+                max(textWidth(headers[i]) if headers else 0, 8)
+                for i in range(len(self.columns))
+            ]
+        self.column_widths = column_widths
+        self.formatters: List[Callable[[Any], str]] = [
+            (formatters[i] if formatters and formatters[i] else str)
+            for i in range(len(self.columns))
+        ]
+        # Numbers are aligned to the right
+        self.right_aligned = [
+            isinstance(column, np.ndarray) and column.dtype.kind in "iuf"
+            for column in self.columns
+        ]
+        self.order: Optional[np.ndarray] = None
+        self.cursor = 0
+        self.row_offset = 0
+        self.column_offset = 0
+        # Row index -> formatted cells of that row, only kept for shown rows
+        self.formatted: Dict[int, List[Optional[str]]] = {}
+        if self.isPlaced() and self.isActive():
+            self.draw()
+
+    def getRowIndex(self, position: int) -> int:
+        "Index in the columns of the row shown at position"
+        if self.order is None:
+            return position
+        return int(self.order[position])
+
+    def getSelectedIndex(self) -> Optional[int]:
+        if not self.row_count:
+            return None
+        return self.getRowIndex(self.cursor)
+
+    def sortBy(self, column: int, descending: bool = False) -> None:
+        "Orders the rows by a column, keeping the selected row highlighted"
+        selected = self.getSelectedIndex()
+        self.order = stableOrder(self.columns[column], descending)
+        if selected is not None:
+            self.cursor = int(np.flatnonzero(self.order == selected)[0])
+        self.scrollToCursor()
+        if self.isPlaced() and self.isActive():
+            self.draw()
+
+    def unsort(self) -> None:
+        selected = self.getSelectedIndex()
+        self.order = None
+        if selected is not None:
+            self.cursor = selected
+        self.scrollToCursor()
+        if self.isPlaced() and self.isActive():
+            self.draw()
+
+    def getBodyHeight(self) -> int:
+        height = self.getBorder().getHeight() + 1 if self.isPlaced(
+        ) else self.height
+        return max(height - (1 if self.headers else 0), 0)
+
+    def getVisibleColumns(self) -> List[int]:
+        "Columns from column_offset which fit, the last one may be cut off"
+        width = self.getBorder().getWidth()
+        visible = []
+        x = 0
+        for column in range(self.column_offset, len(self.columns)):
+            if x >= width:
+                break
+            visible.append(column)
+            x += self.column_widths[column] + 1
+        return visible
+
+    def getCell(self, index: int, column: int) -> str:
+        row = self.formatted.get(index)
+        if row is None:
+            row = self.formatted[index] = [None] * len(self.columns)
+        text = row[column]
+        if text is None:
+            text = row[column] = self.formatters[column](
+                self.columns[column][index])
+        return text
+
+    def formatLine(self, cells: List[str], visible: List[int]) -> str:
+        parts = []
+        for text, column in zip(cells, visible):
+            width = self.column_widths[column]
+            text = truncate(text, width)
+            padding = " " * (width - textWidth(text))
+            parts.append(padding + text if self.right_aligned[column] else
+                         text + padding)
+        return truncate(" ".join(parts), self.getBorder().getWidth())
+
+    def drawRow(self, position: int) -> None:
+        "Draws the row shown at position, which has to be in view"
+        border = self.getBorder()
+        style = self.getStyle()
+        attr = (style.bg_color or "") + (style.text_style or "")
+        if position == self.cursor and self.state is State.FOCUSED:
+            attr += self.highlight_color
+        y = border.top + position - self.row_offset + (1 if self.headers else
+                                                       0)
+        line = ""
+        if position < self.row_count:
+            index = self.getRowIndex(position)
+            visible = self.getVisibleColumns()
+            line = self.formatLine(
+                [self.getCell(index, column) for column in visible], visible)
+        width = border.getWidth()
+        self.getLayer().write(border.left, y,
+                              line + " " * (width - textWidth(line)), attr)
+
+    def trim(self) -> None:
+        self.formatted = {}
+
+    def draw(self) -> None:
+        border = self.getBorder()
+        width = border.getWidth()
+        style = self.getStyle()
+        attr = (style.bg_color or "") + (style.text_style or "")
+        if self.headers:
+            visible = self.getVisibleColumns()
+            line = self.formatLine([self.headers[i] for i in visible],
+                                   visible)
+            self.getLayer().write(border.left, border.top,
+                                  line + " " * (width - textWidth(line)),
+                                  attr + self.header_style)
+        shown = range(self.row_offset,
+                      min(self.row_offset + self.getBodyHeight(),
+                          self.row_count))
+        # Formatted cells of rows scrolled out of view are dropped
+        kept = {self.getRowIndex(position) for position in shown}
+        self.formatted = {
+            index: row
+            for index, row in self.formatted.items() if index in kept
+        }
+        for position in range(self.row_offset,
+                              self.row_offset + self.getBodyHeight()):
+            self.drawRow(position)
+        self.getWindow().flush()
+
+    def scrollToCursor(self) -> bool:
+        "Moves the view to show the cursor, returns whether it moved"
+        height = self.getBodyHeight()
+        offset = self.row_offset
+        if self.cursor < offset:
+            offset = self.cursor
+        elif self.cursor >= offset + height:
+            offset = self.cursor - height + 1
+        offset = max(min(offset, self.row_count - height), 0)
+        if offset == self.row_offset:
+            return False
+        self.row_offset = offset
+        return True
+
+    def moveCursor(self, position: int) -> None:
+        position = max(min(position, self.row_count - 1), 0)
+        if position == self.cursor:
+            return
+        previous = self.cursor
+        self.cursor = position
+        if self.scrollToCursor():
+            self.draw()
+            return
+        self.drawRow(previous)
+        self.drawRow(position)
+        self.getWindow().flush()
+
+    def scroll(self, lines: int) -> None:
+        "Moves the view, taking the cursor along"
+        height = self.getBodyHeight()
+        offset = max(min(self.row_offset + lines, self.row_count - height), 0)
+        if offset == self.row_offset:
+            return
+        self.cursor = max(min(self.cursor + offset - self.row_offset,
+                              self.row_count - 1), 0)
+        self.row_offset = offset
+        self.draw()
+
+    def scrollColumns(self, columns: int) -> None:
+        offset = max(min(self.column_offset + columns,
+                         len(self.columns) - 1), 0)
+        if offset != self.column_offset:
+            self.column_offset = offset
+            # Cells are cached per column, newly shown ones are formatted on draw
+            self.draw()
+
+    def click(self) -> Response:
+        return self.focus()
+
+    def getPageSize(self) -> int:
+        return max(self.getBodyHeight() - 1, 1)
+
+    def selectRow(self) -> None:
+        index = self.getSelectedIndex()
+        if self.on_select_command and index is not None:
+            self.on_select_command(index)
+
+    # Keys handled while focused by name, a handler returning None completes
+    key_handlers: Dict[str, Callable[[DataGrid], Optional[Response]]] = {
+        "KEY_UP": lambda grid: grid.moveCursor(grid.cursor - 1),
+        "KEY_DOWN": lambda grid: grid.moveCursor(grid.cursor + 1),
+        "KEY_PGUP":
+        lambda grid: grid.moveCursor(grid.cursor - grid.getPageSize()),
+        "KEY_PGDOWN":
+        lambda grid: grid.moveCursor(grid.cursor + grid.getPageSize()),
+        "KEY_HOME": lambda grid: grid.moveCursor(0),
+        "KEY_END": lambda grid: grid.moveCursor(grid.row_count - 1),
+        "KEY_LEFT": lambda grid: grid.scrollColumns(-1),
+        "KEY_RIGHT": lambda grid: grid.scrollColumns(1),
+        "KEY_ENTER": lambda grid: grid.selectRow(),
+        "KEY_ESCAPE": lambda grid: grid.unfocus(),
+        "KEY_BACKSPACE": lambda grid: grid.unfocus(),
+    }
+
+    def handleKeyEvent(self, val) -> Response:
+        if not val.is_sequence or val.name not in self.key_handlers:
+            return Response.CONTINUE
+        return self.key_handlers[val.name](self) or Response.COMPLETE
+
+    def handleMouseEvent(self, event: MouseEvent,
+                         target: Optional[Interactable]) -> Response:
+        "Clicking a row highlights it"
+        if target is self:
+            row = event.y - self.getBorder().top - (1 if self.headers else 0)
+            if 0 <= row < self.getBodyHeight():
+                self.moveCursor(self.row_offset + row)
+        return super().handleMouseEvent(event, target)
+
+
+# Bit of each dot of a braille cell but the first, by dot row and column
+BRAILLE_SHIFTS = (((1, 0), 1), ((2, 0), 2), ((0, 1), 3), ((1, 1), 4),
+                  ((2, 1), 5), ((3, 0), 6), ((3, 1), 7))
+# Empty cells are drawn as spaces, not as blank braille
+BRAILLE_CHARS = [" "] + [chr(BRAILLE_BASE + bits) for bits in range(1, 256)]
+
+
+class ChartSeries():
+    "Latest samples of one Chart line, one per dot column, and their dots"
+
+    def __init__(self, name: str, color: Optional[str], columns: int,
+                 rows: int) -> None:
+        self.name = name
+        self.color = color
+        self.values = np.full(columns, np.nan)
+        # Dot row of every value, -1 for missing ones
+        self.rows = np.full(columns, -1, dtype=np.int64)
+        self.dots = np.zeros((rows, columns), dtype=bool)
+
+    def resize(self, columns: int, rows: int) -> None:
+        "Keeps the latest values that still fit"
+        values = self.values[-columns:]
+        self.values = np.concatenate(
+            (np.full(columns - len(values), np.nan), values))
+        self.rows = np.full(columns, -1, dtype=np.int64)
+        self.dots = np.zeros((rows, columns), dtype=bool)
+
+    def shift(self, samples: np.ndarray) -> None:
+        "Appends samples, dropping as many of the oldest ones"
+        count = len(samples)
+        if count >= len(self.values):
+            self.values[:] = samples[-len(self.values):]
+            return
+        self.values[:-count] = self.values[count:]
+        self.values[-count:] = samples
+        self.rows[:-count] = self.rows[count:]
+        self.dots[:, :-count] = self.dots[:, count:]
+
+    def rasterize(self, start: int, minimum: float, maximum: float) -> None:
+        """
+        Recomputes the dots of the columns from start, a vertical stroke
+        from each value to the previous one so the line stays connected.
+        """
+        height = self.dots.shape[0]
+        values = self.values[start:]
+        valid = ~np.isnan(values)
+        span = maximum - minimum if maximum > minimum else 1.0
+        fraction = np.clip((np.where(valid, values, minimum) - minimum) / span,
+                           0.0, 1.0)
+        rows = np.rint((1.0 - fraction) * (height - 1)).astype(np.int64)
+        rows[~valid] = -1
+        self.rows[start:] = rows
+        previous = self.rows[max(start - 1, 0):len(self.rows) - 1]
+        if start == 0:
+            previous = np.concatenate((rows[:1], previous))
+        connected = valid & (previous >= 0)
+        low = np.where(connected, np.minimum(rows, previous), rows)
+        high = np.where(connected, np.maximum(rows, previous), rows)
+        dot_rows = np.arange(height)[:, None]
+        self.dots[:, start:] = ((dot_rows >= low) & (dot_rows <= high) &
+                                valid)
+
+    def pack(self) -> np.ndarray:
+        "Braille bits of every cell, rows by columns"
+        rows, columns = self.dots.shape
+        cells = self.dots.view(np.uint8).reshape(rows // 4, 4, columns // 2, 2)
+        bits = cells[:, 0, :, 0].copy()
+        for (row, column), shift in BRAILLE_SHIFTS:
+            bits |= cells[:, row, :, column] << shift
+        return bits
+
+
+class Chart(Visible):
+    """
+    Line chart of time series drawn with braille dots, 2 samples per cell
+    horizontally and 4 dot rows per cell vertically, newest on the right.
+    Without minimum or maximum, the range follows the samples shown, which
+    rasterizes every column again whenever it changes. Appending samples
+    otherwise only rasterizes the new columns, and only changed cells are
+    written. Where series overlap, the cell takes the colour of the last one.
+    """
+
+    def __init__(self,
+                 parent: Parent,
+                 width: int,
+                 height: int,
+                 minimum: Optional[float] = None,
+                 maximum: Optional[float] = None,
+                 style: Optional[BoxStyle] = None) -> None:
+        Visible.__init__(self, parent, width, height, style)
+        self.fixed_range = (minimum, maximum)
+        self.series: Dict[str, ChartSeries] = {}
+        self.range = self.computeRange()
+        self.dot_size = (height * 4, width * 2)
+        self.rendered_bits: Optional[np.ndarray] = None
+        self.rendered_colors: Optional[np.ndarray] = None
+
+    def constructDefaultStyle(self, style: Optional[BoxStyle] = None):
+        return Interactable.constructDefaultStyleTemplate(
+            self,
+            default_style=self.getWindow().getDefaultStyle(
+                bg_color="normal", text_style="white"),
+            style=style,
+            inheritance_vector=(True, True, False, False))
+
+    def addSeries(self, name: str, color: Optional[str] = None) -> None:
+        "Colour is a terminal attribute, text_style if None"
+        self.series[name] = ChartSeries(name, color, self.dot_size[1],
+                                        self.dot_size[0])
+
+    def removeSeries(self, name: str) -> None:
+        del self.series[name]
+        self.update()
+
+    def setRange(self, minimum: Optional[float],
+                 maximum: Optional[float]) -> None:
+        self.fixed_range = (minimum, maximum)
+        self.rasterize()
+        self.update()
+
+    def computeRange(self) -> Tuple[float, float]:
+        minimum, maximum = self.fixed_range
+        if minimum is None or maximum is None:
+            values = [series.values for series in self.series.values()]
+            shown = np.concatenate(values) if values else np.empty(0)
+            shown = shown[~np.isnan(shown)]
+            if minimum is None:
+                minimum = float(shown.min()) if len(shown) else 0.0
+            if maximum is None:
+                maximum = float(shown.max()) if len(shown) else 0.0
+        return minimum, maximum
+
+    def rasterize(self) -> None:
+        "Recomputes the dots of every series"
+        self.range = self.computeRange()
+        for series in self.series.values():
+            series.rasterize(0, *self.range)
+
+    def fitToBorder(self) -> None:
+        "Resizes the dot grids if the element was laid out at another size"
+        border = self.getBorder()
+        dot_size = ((border.getHeight() + 1) * 4, border.getWidth() * 2)
+        if dot_size == self.dot_size:
+            return
+        self.dot_size = dot_size
+        for series in self.series.values():
+            series.resize(dot_size[1], dot_size[0])
+        self.rasterize()
+        self.rendered_bits = None
+
+    def pushSamples(self, name: str, samples: Iterable[float]) -> None:
+        "Appends a batch of samples to a series, drawn as one update"
+        series = self.series[name]
+        samples = np.asarray(samples, dtype=float)
+        if not len(samples):
+            return
+        series.shift(samples)
+        if self.computeRange() != self.range:
+            self.rasterize()
+        else:
+            series.rasterize(max(len(series.values) - len(samples), 0),
+                             *self.range)
+        self.update()
+
+    def draw(self) -> None:
+        self.rendered_bits = None
+        self.update()
+
+    def trim(self) -> None:
+        self.rendered_bits = None
+        self.rendered_colors = None
+
+    def update(self) -> None:
+        "Writes the cells which changed since the last draw"
+        if not self.isPlaced() or not self.isActive():
+            return
+        self.fitToBorder()
+        rows, columns = self.dot_size[0] // 4, self.dot_size[1] // 2
+        bits = np.zeros((rows, columns), dtype=np.uint8)
+        colors = np.zeros((rows, columns), dtype=np.int64)
+        series_list = list(self.series.values())
+        for i, series in enumerate(series_list, 1):
+            series_bits = series.pack()
+            bits |= series_bits
+            colors[series_bits > 0] = i
+        # Blanks take the colour on their left, saving attribute changes
+        filled = np.where(bits > 0, np.arange(columns), 0)
+        np.maximum.accumulate(filled, axis=1, out=filled)
+        colors = np.take_along_axis(colors, filled, axis=1)
+        if self.rendered_bits is None or self.rendered_colors is None:
+            changed = np.ones((rows, columns), dtype=bool)
+        else:
+            changed = ((bits != self.rendered_bits) |
+                       (colors != self.rendered_colors))
+        self.rendered_bits = bits
+        self.rendered_colors = colors
+        if not changed.any():
+            return
+        style = self.getStyle()
+        attrs = [(style.bg_color or "") + (style.text_style or "")] + [
+            (style.bg_color or "") + (series.color or style.text_style or "")
+            for series in series_list
+        ]
+        border = self.getBorder()
+        layer = self.getLayer()
+        for y in np.flatnonzero(changed.any(axis=1)).tolist():
+            # The span from the first to the last changed cell, in runs of
+            # one colour, the View skips the unchanged cells in between
+            changed_columns = np.flatnonzero(changed[y])
+            start = int(changed_columns[0])
+            end = int(changed_columns[-1]) + 1
+            row_colors = colors[y, start:end]
+            cuts = [0] + (np.flatnonzero(row_colors[1:] != row_colors[:-1]) +
+                          1).tolist() + [end - start]
+            chars = [BRAILLE_CHARS[b] for b in bits[y, start:end].tolist()]
+            for run_start, run_end in zip(cuts, cuts[1:]):
+                layer.writeCells(border.left + start + run_start,
+                                 border.top + y, chars[run_start:run_end],
+                                 attrs[row_colors[run_start]])
+        self.getWindow().flush()
@@ -0,0 +1,33 @@
+from __future__ import annotations
+import os
+
+from blessed import Terminal
+
+import sound_recognition
+from blessed_widgets.layout import loadLayout
+from blessed_widgets.widgets import Window
+
+# The screen of sound_recognition.py built from layouts/sound_recognition.json
+LAYOUT = os.path.join(os.path.dirname(__file__), "layouts",
+                      "sound_recognition.json")
+
+
+class Application(sound_recognition.Application):
+
+    def __init__(self, term: Terminal) -> None:
+        Window.__init__(self, term)
+        self.frameType1 = None
+        self.labels = []
+        self.entries = []
+        # Named elements become attributes, as in the imperative version
+        self.__dict__.update(loadLayout(self.mainframe, LAYOUT, handlers=self))
+        self.getData()
+
+
+if __name__ == "__main__":
+    term = Terminal()
+    # Handlers of sound_recognition build styles from its module level term
+    sound_recognition.term = term
+    with term.hidden_cursor():
+        app = Application(term)
+        app.loop()
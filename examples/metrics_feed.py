@@ -0,0 +1,39 @@
+from __future__ import annotations
+import random
+import threading
+import time
+from blessed_widgets.widgets import GridFrame, Label, Window, BoxStyle
+from blessed_widgets.binding import Observable
+from blessed import Terminal
+from blessed_widgets.constants import BorderStyle
+
+# A 10 Hz feed, only the labels whose rounded value changed are repainted
+NAMES = ["cpu", "memory", "disk", "network"]
+
+term = Terminal()
+with term.hidden_cursor():
+    window = Window(term)
+    gridframe = GridFrame(window.mainframe,
+                          widths=[10, 10],
+                          heights=[1] * len(NAMES),
+                          style=BoxStyle(bg_color=term.on_gray14,
+                                         border_style=BorderStyle.SINGLE,
+                                         border_color=term.orange),
+                          inner_border=True)
+    gridframe.place(5, 2)
+    metrics = {name: Observable(0.0) for name in NAMES}
+    for row, name in enumerate(NAMES):
+        Label(gridframe, width=10, height=1, text=name).grid(0, row)
+        value = Label(gridframe, width=10, height=1)
+        value.grid(1, row)
+        value.bindValue(metrics[name], lambda percent: f"{percent:.0f} %")
+
+    def feed() -> None:
+        while True:
+            for observable in metrics.values():
+                observable.set(
+                    min(100.0, max(0.0, observable.get() + random.gauss(0, 1))))
+            time.sleep(0.1)
+
+    threading.Thread(target=feed, daemon=True).start()
+    window.loop()
@@ -0,0 +1,36 @@
+from __future__ import annotations
+import sys
+from blessed_widgets.widgets import GridFrame, Label, Window, Button, BoxStyle
+from blessed_widgets.server import SessionServer, attach
+from blessed import Terminal
+from blessed_widgets.constants import BorderStyle
+
+# python session_server.py serve, then python session_server.py in other terminals
+PATH = "/tmp/blessed_widgets.sock"
+
+if len(sys.argv) > 1 and sys.argv[1] == "serve":
+    term = Terminal()
+    window = Window(term)
+    server = SessionServer(window, PATH, width=60, height=20)
+    gridframe = GridFrame(window.mainframe,
+                          widths=[12, 12],
+                          heights=[1, 3],
+                          style=BoxStyle(bg_color=term.on_gray14,
+                                         border_style=BorderStyle.SINGLE,
+                                         border_color=term.orange),
+                          inner_border=True)
+    gridframe.place(5, 2)
+    label = Label(gridframe, width=12, height=1, text="0")
+    label.grid(0, 0, columnspan=2)
+    clicks = [0]
+
+    def count() -> None:
+        clicks[0] += 1
+        label.text = str(clicks[0])
+        label.draw()
+
+    button = Button(gridframe, width=12, height=3, text="+1", command=count)
+    button.grid(0, 1)
+    server.serve()
+else:
+    attach(PATH)
@@ -0,0 +1,27 @@
+from __future__ import annotations
+from typing import List
+
+import pytest
+from blessed import Terminal
+
+from blessed_widgets.widgets import Window
+
+
+def screenRows(window: Window) -> List[str]:
+    "Characters the compositor shows on each row"
+    compositor = window.compositor
+    return [
+        "".join(compositor.composite(y, 0, compositor.width)[0])
+        for y in range(compositor.height)
+    ]
+
+
+@pytest.fixture
+def term() -> Terminal:
+    return Terminal(kind="xterm-256color", force_styling=True)
+
+
+@pytest.fixture
+def window(term: Terminal, capsys) -> Window:
+    "Window whose output is captured instead of written to the terminal"
+    return Window(term)
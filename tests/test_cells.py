@@ -0,0 +1,65 @@
+from blessed_widgets.cells import (CONTINUATION, clusterOffsets, nextOffset,
+                                   previousOffset, repairRow, splitCells,
+                                   textWidth, truncate)
+from blessed_widgets.replay import keystroke
+from blessed_widgets.widgets import Entry
+
+FAMILY = "\U0001f468‍\U0001f469‍\U0001f467"
+THUMB = "\U0001f44d\U0001f3fd"
+
+
+def testWideCharactersAreFollowedByAContinuation():
+    assert splitCells("a日b") == (("a", "日", CONTINUATION, "b"), True)
+    assert splitCells("abc") == (("a", "b", "c"), False)
+
+
+def testClustersTakeOneCell():
+    assert splitCells("éx")[0] == ("é", "x")
+    assert splitCells(FAMILY)[0] == (FAMILY, CONTINUATION)
+    assert splitCells(THUMB)[0] == (THUMB, CONTINUATION)
+    assert textWidth("日本" + FAMILY) == 6
+
+
+def testTruncateKeepsWholeClusters():
+    assert truncate("abcdef", 3) == "abc"
+    assert truncate("a日本", 2) == "a"
+    assert truncate("a" + FAMILY, 3) == "a" + FAMILY
+
+
+def testRepairRowBlanksBrokenWideCharacters():
+    row = ["a", CONTINUATION, "日", "b"]
+    repairRow(row)
+    assert row == ["a", " ", " ", "b"]
+
+
+def testClusterOffsetsMatchTheClusters():
+    text = "é" + FAMILY + "b"
+    assert clusterOffsets(text) == (0, 2, 7, 8)
+    assert [nextOffset(text, index) for index in (0, 2, 7, 8)] == [2, 7, 8, 8]
+    assert [previousOffset(text, index)
+            for index in (0, 2, 7, 8)] == [0, 0, 2, 7]
+
+
+def testEntryCursorMovesOverClusters(window):
+    entry = Entry(window.mainframe, 10, 3)
+    entry.place(0, 0)
+    entry.focus()
+    for char in "a" + THUMB + "b":
+        entry.handleKeyEvent(keystroke(char))
+    assert entry.cursor_pos == len(entry.text)
+    entry.handleKeyEvent(keystroke("KEY_LEFT"))
+    entry.handleKeyEvent(keystroke("KEY_LEFT"))
+    assert entry.cursor_pos == 1
+    entry.handleKeyEvent(keystroke("KEY_RIGHT"))
+    assert entry.cursor_pos == 1 + len(THUMB)
+
+
+def testEntryBackspaceRemovesAWholeCluster(window):
+    entry = Entry(window.mainframe, 10, 3)
+    entry.place(0, 0)
+    entry.focus()
+    entry.setText("a" + FAMILY)
+    entry.handleKeyEvent(keystroke("KEY_BACKSPACE"))
+    assert entry.text == "a"
+    entry.handleKeyEvent(keystroke("KEY_BACKSPACE"))
+    assert entry.text == ""
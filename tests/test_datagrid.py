@@ -0,0 +1,48 @@
+import numpy as np
+
+from blessed_widgets.constants import Response
+from blessed_widgets.replay import keystroke
+from blessed_widgets.widgets import DataGrid
+
+
+def createGrid(window, selected):
+    grid = DataGrid(window.mainframe, 20, 6,
+                    columns=[list(range(100)), [str(i) for i in range(100)]],
+                    headers=["n", "s"], on_select_command=selected.append)
+    grid.place(0, 0)
+    grid.focus()
+    return grid
+
+
+def testKeysMoveTheCursor(window):
+    grid = createGrid(window, [])
+    page = grid.getPageSize()
+    assert grid.handleKeyEvent(keystroke("KEY_DOWN")) is Response.COMPLETE
+    assert grid.cursor == 1
+    grid.handleKeyEvent(keystroke("KEY_PGDOWN"))
+    assert grid.cursor == 1 + page
+    grid.handleKeyEvent(keystroke("KEY_END"))
+    assert grid.cursor == 99 and grid.row_offset == 100 - grid.getBodyHeight()
+    grid.handleKeyEvent(keystroke("KEY_HOME"))
+    assert grid.cursor == 0 and grid.row_offset == 0
+
+
+def testEnterSelectsAndEscapeUnfocuses(window):
+    selected = []
+    grid = createGrid(window, selected)
+    grid.handleKeyEvent(keystroke("KEY_DOWN"))
+    grid.handleKeyEvent(keystroke("KEY_ENTER"))
+    assert selected == [1]
+    assert grid.handleKeyEvent(keystroke("x")) is Response.CONTINUE
+    assert grid.handleKeyEvent(keystroke("KEY_ESCAPE")) is Response.UNFOCUSED
+
+
+def testSortKeepsTiesInOrderInBothDirections(window):
+    for keys in ([2, 1, 2, 1, 3], np.array([2, 1, 2, 1, 3])):
+        grid = DataGrid(window.mainframe, 20, 6, columns=[keys, list("abcde")])
+        grid.sortBy(0)
+        assert list(grid.order) == [1, 3, 0, 2, 4]
+        grid.sortBy(0, descending=True)
+        assert list(grid.order) == [4, 0, 2, 1, 3]
+        grid.sortBy(0)
+        assert list(grid.order) == [1, 3, 0, 2, 4]
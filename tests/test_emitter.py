@@ -0,0 +1,66 @@
+import pytest
+
+from blessed_widgets.emitter import Emitter, cost
+
+
+@pytest.fixture
+def emitter(term):
+    emitter = Emitter(term)
+    emitter.back_color_erase = True
+    return emitter
+
+
+def testCostCountsEncodedBytes():
+    assert cost("abc") == 3
+    assert cost("é") == 2
+    assert cost("日本") == 6
+
+
+def testMovesPickTheCheapestSequence(emitter):
+    assert emitter.move(3, 2) == "\x1b[3;4H"
+    assert emitter.move(3, 2) == ""
+    assert emitter.move(5, 2) == "\x1b[2C"
+    assert emitter.move(0, 3) == "\r\n"
+    counters = emitter.counters
+    assert (counters.absolute_moves, counters.relative_moves,
+            counters.moves_skipped) == (1, 2, 1)
+
+
+def testMoveRewritesShortStretchesWithTheSamePen(emitter):
+    emitter.move(0, 0)
+    row = list("abcdef")
+    assert emitter.move(2, 0, row, [""] * 6) == "ab"
+
+
+def testRepeatedCharactersUseRep(emitter):
+    emitter.cursor = (0, 0)
+    assert emitter.writeRun(0, 0, "", ["x"] * 20, 80) == "x\x1b[19b"
+    assert emitter.cursor == (20, 0)
+    assert emitter.counters.repeats == 1
+
+
+def testTrailingBlanksAreErasedToTheEndOfLine(emitter):
+    emitter.cursor = (60, 0)
+    assert emitter.writeRun(60, 0, "", list("ab") + [" "] * 18,
+                            80) == "ab\x1b[K"
+    assert emitter.cursor == (62, 0)
+    assert emitter.counters.erases == 1
+
+
+def testBlanksWithVisibleFlagsAreWritten(emitter):
+    emitter.cursor = (0, 0)
+    output = emitter.writeRun(0, 0, "\x1b[4m", [" "] * 10, 80)
+    assert "\x1b[K" not in output and "X" not in output
+
+
+def testWritingTheLastColumnForgetsTheCursor(emitter):
+    emitter.cursor = (78, 0)
+    emitter.writeRun(78, 0, "", list("ab"), 80)
+    assert emitter.cursor is None
+
+
+def testPenTransitionsAreIncremental(emitter):
+    assert emitter.setPen("\x1b[1m") == "\x1b[1m"
+    assert emitter.setPen("\x1b[1m\x1b[31m") == "\x1b[31m"
+    assert emitter.setPen("\x1b[1m\x1b[31m") == ""
+    assert emitter.resetPen() == emitter.normal
@@ -0,0 +1,82 @@
+from blessed_widgets.constants import FlexAlignment, FlexDirection
+from blessed_widgets.widgets import Box, Button, FlexFrame, Label, Point
+
+
+def createRow(window, **kwargs):
+    frame = FlexFrame(window.mainframe, **kwargs)
+    frame.place(0, 0)
+    return frame
+
+
+def borders(elements):
+    return [(e.getBorder().left, e.getBorder().top, e.width, e.height)
+            for e in elements]
+
+
+def testGrowSplitsFreeSpaceByWeight(window):
+    frame = createRow(window, width=20, height=1)
+    a = Button(frame, 2, 1, text="a")
+    a.flex(grow=1)
+    b = Button(frame, 2, 1, text="b")
+    b.flex(grow=3)
+    frame.draw()
+    assert borders([a, b]) == [(0, 0, 6, 1), (6, 0, 14, 1)]
+
+
+def testShrinkIsWeightedByBasis(window):
+    frame = createRow(window, width=10, height=1)
+    a = Button(frame, 10, 1, text="a")
+    a.flex()
+    b = Button(frame, 5, 1, text="b")
+    b.flex()
+    frame.draw()
+    assert [e.width for e in (a, b)] == [6, 4]
+
+
+def testJustifyAndGap(window):
+    frame = createRow(window, width=20, height=1, gap=2,
+                      justify=FlexAlignment.END)
+    items = [Button(frame, 3, 1, text="x") for _ in range(2)]
+    for item in items:
+        item.flex()
+    frame.draw()
+    assert [e.getBorder().left for e in items] == [12, 17]
+
+
+def testSpaceBetween(window):
+    frame = createRow(window, width=20, height=1,
+                      justify=FlexAlignment.SPACE_BETWEEN)
+    items = [Button(frame, 2, 1, text="x") for _ in range(3)]
+    for item in items:
+        item.flex()
+    frame.draw()
+    assert [e.getBorder().left for e in items] == [0, 9, 18]
+
+
+def testCrossAlignment(window):
+    frame = createRow(window, width=20, height=5)
+    start = Label(frame, 2, 1, text="s")
+    start.flex()
+    center = Label(frame, 2, 1, text="c")
+    center.flex(align=FlexAlignment.CENTER)
+    end = Label(frame, 2, 1, text="e")
+    end.flex(align=FlexAlignment.END)
+    stretch = Label(frame, 2, 1, text="t")
+    stretch.flex(align=FlexAlignment.STRETCH)
+    frame.draw()
+    assert [(e.getBorder().top, e.height) for e in (start, center, end, stretch)
+            ] == [(0, 1), (2, 1), (4, 1), (0, 5)]
+
+
+def testColumnSizesToContent(window):
+    frame = createRow(window, direction=FlexDirection.COLUMN, gap=1)
+    for width in (3, 6):
+        Label(frame, width, 2, text="x").flex()
+    frame.draw()
+    assert frame.getBorder() == Box(Point(0, 0), Point(6, 4))
+
+
+def testFixedZeroSizeIsKept(window):
+    frame = FlexFrame(window.mainframe, width=0, height=3)
+    Label(frame, 4, 1, text="x").flex()
+    assert frame.measure() == (0, 3)
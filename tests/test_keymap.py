@@ -0,0 +1,81 @@
+import pytest
+
+from blessed_widgets.constants import Response
+from blessed_widgets.exceptions import BindingConflict
+from blessed_widgets.keymap import Keymap, parseKeys
+from blessed_widgets.replay import keystroke
+
+
+def testParseKeysAcceptsStringsAndSequences():
+    assert parseKeys("g g") == ("g", "g")
+    assert parseKeys(["G", "KEY_ENTER"]) == ("g", "KEY_ENTER")
+    assert parseKeys(" ") == (" ", )
+    with pytest.raises(BindingConflict):
+        parseKeys([])
+
+
+def testChordCantExtendABoundKey():
+    keymap = Keymap()
+    keymap.bind("g", print)
+    with pytest.raises(BindingConflict):
+        keymap.bind("g g", print)
+    assert keymap.getCommand("g") is print
+    assert len(keymap) == 1
+
+
+def testKeyCantStartABoundChord():
+    keymap = Keymap()
+    keymap.bind("g g", print)
+    with pytest.raises(BindingConflict):
+        keymap.bind("g", print)
+    assert keymap.getCommand("g") is None
+    assert keymap.getCommand("g g") is print
+
+
+def testRebindingReplacesTheCommand():
+    keymap = Keymap()
+    keymap.bind("q", print)
+    keymap.bind("Q", repr)
+    assert keymap.getCommand("q") is repr
+    assert len(keymap) == 1
+
+
+def testUnbindPrunesUnusedNodes():
+    keymap = Keymap()
+    keymap.bind("g g", print)
+    keymap.bind("g t", repr)
+    keymap.unbind("g g")
+    assert keymap.getCommand("g t") is repr
+    keymap.unbind("g t")
+    assert keymap.root.children == {}
+    keymap.bind("g", print)
+    assert len(keymap) == 1
+
+
+def testWindowRunsChords(window):
+    calls = []
+    window.bind("g g", lambda: calls.append("top"))
+    window.bind("KEY_ESCAPE", lambda: calls.append("escape"))
+    assert window.checkBindings(keystroke("g")) is Response.COMPLETE
+    assert calls == []
+    assert window.checkBindings(keystroke("G")) is Response.COMPLETE
+    assert calls == ["top"]
+
+
+def testKeyOutsideThePendingChordIsResolvedOnItsOwn(window):
+    calls = []
+    window.bind("g g", lambda: calls.append("top"))
+    window.bind("KEY_ESCAPE", lambda: calls.append("escape"))
+    window.checkBindings(keystroke("g"))
+    assert window.checkBindings(keystroke("KEY_ESCAPE")) is Response.COMPLETE
+    assert calls == ["escape"]
+    assert window.pending_chord is None
+    assert window.checkBindings(keystroke("x")) is Response.CONTINUE
+
+
+def testInnermostKeymapWins(window):
+    calls = []
+    window.bind("q", lambda: calls.append("window"))
+    window.mainframe.bind("q", lambda: calls.append("frame"))
+    window.checkBindings(keystroke("q"))
+    assert calls == ["frame"]
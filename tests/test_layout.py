@@ -0,0 +1,106 @@
+import json
+
+import pytest
+from blessed import Terminal
+
+from blessed_widgets import layout
+from blessed_widgets.constants import BorderStyle, HAlignment
+from blessed_widgets.exceptions import InvalidLayout
+from blessed_widgets.layout import loadLayout
+from blessed_widgets.widgets import Window
+
+MENU = {
+    "styles": {"selected": {"bg_color": "on_white", "text_style": "black"}},
+    "elements": [{
+        "type": "AbsoluteFrame", "name": "base", "width": 20, "height": 6,
+        "style": {"bg_color": "on_gray14", "border_style": "SINGLE"},
+        "place": {"x": 2, "y": 1},
+        "elements": [{
+            "type": "Button", "name": "ok", "width": 6, "height": 1,
+            "text": "OK", "h_align": "LEFT", "selected_style": "selected",
+            "place": {"x": 3, "y": 2}
+        }]
+    }]
+}
+
+
+@pytest.fixture
+def compiles(monkeypatch):
+    "Counts the layouts compiled instead of read from the cache"
+    calls = []
+    compile = layout.LayoutCompiler.compile
+
+    def countedCompile(self):
+        calls.append(self)
+        return compile(self)
+
+    monkeypatch.setattr(layout.LayoutCompiler, "compile", countedCompile)
+    return calls
+
+
+def writeLayout(tmp_path, source):
+    path = tmp_path / "menu.json"
+    path.write_text(json.dumps(source))
+    return str(path)
+
+
+def corners(element):
+    border = element.getBorder()
+    return (border.p1.x, border.p1.y, border.p2.x, border.p2.y)
+
+
+def testLoadCreatesPlacedElementsWithResolvedStyles(window, tmp_path):
+    elements = loadLayout(window.mainframe, writeLayout(tmp_path, MENU))
+    base, ok = elements["base"], elements["ok"]
+    assert corners(base) == (2, 1, 22, 6)
+    assert corners(ok) == (5, 3, 11, 3)
+    assert ok.parent is base
+    assert base.style.bg_color == window.palette.on_gray14
+    assert base.style.border_style is BorderStyle.SINGLE
+    assert ok.selected_style.bg_color == window.palette.on_white
+    assert ok.selected_style.text_style == window.palette.black
+    assert ok.h_align is HAlignment.LEFT
+
+
+def testSecondLoadReusesTheCompiledLayout(term, capsys, tmp_path, compiles):
+    path = writeLayout(tmp_path, MENU)
+    first = loadLayout(Window(term).mainframe, path)
+    assert len(compiles) == 1
+    assert len(list((tmp_path / layout.CACHE_DIRECTORY).iterdir())) == 1
+    second = loadLayout(Window(term).mainframe, path)
+    assert len(compiles) == 1
+    assert corners(second["ok"]) == corners(first["ok"])
+    assert second["ok"].selected_style is first["ok"].selected_style
+
+
+def testEditingTheFileInvalidatesTheCache(term, capsys, tmp_path, compiles):
+    path = writeLayout(tmp_path, MENU)
+    loadLayout(Window(term).mainframe, path)
+    edited = json.loads(json.dumps(MENU))
+    edited["elements"][0]["elements"][0]["place"] = {"x": 4, "y": 2}
+    writeLayout(tmp_path, edited)
+    elements = loadLayout(Window(term).mainframe, path)
+    assert len(compiles) == 2
+    assert corners(elements["ok"]) == (6, 3, 12, 3)
+    # Versions compiled from the old source are removed
+    assert len(list((tmp_path / layout.CACHE_DIRECTORY).iterdir())) == 1
+
+
+def testResizingTheTerminalInvalidatesTheCache(term, capsys, tmp_path,
+                                               compiles, monkeypatch):
+    path = writeLayout(tmp_path, MENU)
+    loadLayout(Window(term).mainframe, path)
+    monkeypatch.setattr(Terminal, "width", property(lambda self: 123))
+    loadLayout(Window(term).mainframe, path)
+    assert len(compiles) == 2
+
+
+@pytest.mark.parametrize("element", [
+    {"type": "Widget", "width": 1, "height": 1},
+    {"type": "Label", "width": 5, "height": 1, "h_align": "CENTER"},
+])
+def testUnknownTypesAndMembersAreRejected(window, tmp_path, element):
+    path = writeLayout(tmp_path, {"elements": [element]})
+    with pytest.raises(InvalidLayout):
+        loadLayout(window.mainframe, path)
+    assert not (tmp_path / layout.CACHE_DIRECTORY).exists()
@@ -0,0 +1,26 @@
+from blessed_widgets.widgets import Chart, Sparkline
+
+
+def testSparklineKeepsAnExplicitMaximumOfZero(window):
+    sparkline = Sparkline(window.mainframe, 4, 1, minimum=-4.0, maximum=0.0)
+    assert not sparkline.auto_scale
+    assert sparkline.maximum == 0.0
+    sparkline.pushSamples([-4.0, -2.0, 0.0, 2.0])
+    assert sparkline.getRows(4, 1) == [" ▄██"]
+
+
+def testSparklineWithoutMaximumScalesToTheSamples(window):
+    sparkline = Sparkline(window.mainframe, 2, 1)
+    assert sparkline.auto_scale
+    sparkline.pushSamples([1.0, 2.0])
+    assert sparkline.getRows(2, 1) == ["▄█"]
+
+
+def testChartKeepsAnExplicitRangeIncludingZero(window):
+    chart = Chart(window.mainframe, 4, 1, minimum=-1.0, maximum=0.0)
+    assert chart.range == (-1.0, 0.0)
+    chart = Chart(window.mainframe, 4, 1, maximum=5.0)
+    assert chart.range == (0.0, 5.0)
+    chart.addSeries("load")
+    chart.setRange(None, None)
+    assert chart.computeRange() == (0.0, 0.0)
@@ -0,0 +1,18 @@
+from blessed_widgets.constants import Direction
+from blessed_widgets.widgets import Button
+
+
+def testExtremeElementSearchesAgree(window):
+    buttons = [Button(window.mainframe, 6, 3, text=str(i)) for i in range(4)]
+    for button, (x, y) in zip(buttons, [(0, 0), (20, 0), (0, 10), (20, 10)]):
+        button.place(x, y)
+    assert not window.useBatchQueries()
+    expected = {
+        Direction.UP: buttons[1],
+        Direction.DOWN: buttons[3],
+        Direction.LEFT: buttons[2],
+        Direction.RIGHT: buttons[3],
+    }
+    for direction, button in expected.items():
+        assert window.getExtremeElement(direction) is button
+        assert window.getExtremeElementBatch(direction) is button
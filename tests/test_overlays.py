@@ -0,0 +1,40 @@
+from blessed_widgets.widgets import OptionMenu
+
+from .conftest import screenRows
+
+
+def createMenus(window):
+    level = OptionMenu(window.mainframe, 14, 1, default_text="Beginner",
+                       options=["Beginner", "Intermediate", "Advanced"])
+    level.place(0, 0)
+    stage = OptionMenu(window.mainframe, 5, 1, default_text="1",
+                       options=["1", "2", "3"])
+    stage.place(0, 2)
+    window.draw()
+    return level, stage
+
+
+def testReopenedDropdownIsAboveLaterOverlays(window):
+    level, stage = createMenus(window)
+    level.focus()
+    level.unfocus()
+    stage.focus()
+    stage.unfocus()
+    level.focus()
+    assert screenRows(window)[2][:14].strip() == "Intermediate"
+
+
+def testFirstOpenIsAboveLaterOverlays(window):
+    level, stage = createMenus(window)
+    stage.focus()
+    stage.unfocus()
+    level.focus()
+    assert screenRows(window)[2][:14].strip() == "Intermediate"
+
+
+def testClosedDropdownShowsWhatItCovered(window):
+    level, stage = createMenus(window)
+    before = screenRows(window)
+    level.focus()
+    level.unfocus()
+    assert screenRows(window) == before
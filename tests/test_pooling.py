@@ -0,0 +1,73 @@
+import pytest
+
+from blessed_widgets.constants import HAlignment, VAlignment
+from blessed_widgets.widgets import AbsoluteFrame, BoxStyle, Button, Label
+
+
+def constructorArgs(element_type):
+    args = {
+        "text": "b",
+        "style": BoxStyle(bg_color="on_blue"),
+        "padding": [0, 1, 0, 1],
+        "h_align": HAlignment.LEFT,
+        "v_align": VAlignment.TOP,
+    }
+    if element_type is Button:
+        args.update(command=lambda: None,
+                    disabled_style=BoxStyle(bg_color="on_red"),
+                    selected_style=BoxStyle(bg_color="on_white"),
+                    clicked_style=BoxStyle(bg_color="on_green"))
+    return args
+
+
+@pytest.mark.parametrize("element_type", [Label, Button])
+def testAcquireAfterReleaseTakesConstructorArgs(window, element_type):
+    frame = AbsoluteFrame(window.mainframe, 20, 5)
+    frame.place(0, 0)
+    args = constructorArgs(element_type)
+    first = frame.acquire(element_type, 6, 1, **args)
+    first.place(0, 0)
+    frame.releaseElement(first)
+    args["padding"] = [0, 2, 0, 0]
+    args["h_align"] = HAlignment.RIGHT
+    second = frame.acquire(element_type, 8, 1, **args)
+    assert second is first
+    assert second.padding == [0, 2, 0, 0]
+    assert second.h_align is HAlignment.RIGHT
+    assert second.v_align is VAlignment.TOP
+    assert second.width == 8
+
+
+def testReuseResetsTextLayoutToDefaults(window):
+    frame = AbsoluteFrame(window.mainframe, 20, 5)
+    frame.place(0, 0)
+    label = frame.acquire(Label, 6, 1, text="a", padding=[0, 1, 0, 1],
+                          h_align=HAlignment.LEFT)
+    frame.releaseElement(label)
+    label = frame.acquire(Label, 6, 1, text="b")
+    assert label.padding == [0] * 4
+    assert label.h_align is HAlignment.MIDDLE
+
+
+STYLE_ATTRIBUTES = {
+    Label: ("style", ),
+    Button: ("style", "selected_style", "clicked_style", "disabled_style"),
+}
+
+
+@pytest.mark.parametrize("element_type", [Label, Button])
+def testAcquireAfterStyledReleaseMatchesAFreshElement(window, element_type):
+    frame = AbsoluteFrame(window.mainframe, 20, 5)
+    frame.place(0, 0)
+    styled = frame.acquire(element_type, 6, 1,
+                           **constructorArgs(element_type))
+    styled.place(0, 0)
+    frame.releaseElement(styled)
+    pooled = frame.acquire(element_type, 6, 1, text="b")
+    assert pooled is styled
+    fresh = element_type(frame, 6, 1, text="b")
+    for attribute in STYLE_ATTRIBUTES[element_type]:
+        assert getattr(pooled, attribute) is getattr(fresh, attribute)
+    assert pooled.padding == fresh.padding
+    assert pooled.h_align is fresh.h_align
+    assert pooled.v_align is fresh.v_align
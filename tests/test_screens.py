@@ -0,0 +1,27 @@
+import pytest
+
+from blessed_widgets.exceptions import EmptyScreenStack
+from blessed_widgets.widgets import Label
+
+from .conftest import screenRows
+
+
+def testPopScreenRestoresTheCoveredScreen(window):
+    Label(window.mainframe, 10, 1, text="first").place(0, 0)
+    window.draw()
+    before = screenRows(window)
+    screen = window.pushScreen()
+    Label(screen, 10, 1, text="second").place(0, 0)
+    screen.draw()
+    assert screenRows(window) != before
+    window.popScreen()
+    assert screenRows(window) == before
+
+
+def testPopScreenWithoutCoveredScreenRaises(window):
+    with pytest.raises(EmptyScreenStack):
+        window.popScreen()
+    window.pushScreen()
+    window.popScreen()
+    with pytest.raises(IndexError):
+        window.popScreen()
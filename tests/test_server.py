@@ -0,0 +1,138 @@
+import io
+import selectors
+import socket
+
+import pytest
+from blessed import Terminal
+
+from blessed_widgets.constants import State
+from blessed_widgets.palette import Palette
+from blessed_widgets.replay import keystroke
+from blessed_widgets.server import Session, SessionServer
+from blessed_widgets.widgets import BoxStyle, Button, DropdownMenu
+
+
+@pytest.fixture
+def server(window, tmp_path):
+    server = SessionServer(window, str(tmp_path / "socket"), 40, 12)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def clients():
+    "Client ends of the connections, open until the test ends"
+    clients = []
+    yield clients
+    for client in clients:
+        client.close()
+
+
+@pytest.fixture
+def buttons(window):
+    selected = BoxStyle(bg_color=window.palette.on_gray14)
+    buttons = [
+        Button(window.mainframe, 6, 3, text=str(i), selected_style=selected)
+        for i in range(2)
+    ]
+    buttons[0].place(0, 0)
+    buttons[1].place(0, 5)
+    window.draw()
+    return buttons
+
+
+def connect(server: SessionServer,
+            clients: list,
+            kind: str = "xterm-256color") -> Session:
+    connection, client = socket.socketpair()
+    client.setblocking(False)
+    clients.append(client)
+    connection.setblocking(False)
+    session = Session(server, connection)
+    server.sessions[connection] = session
+    server.selector.register(connection, selectors.EVENT_READ, session)
+    session.feed(f"{kind} 40 12\n".encode())
+    return session
+
+
+def press(server: SessionServer, session: Session, *names: str) -> None:
+    for name in names:
+        server.dispatch(session, keystroke(name))
+    server.flush()
+
+
+def shownAttr(session: Session, x: int, y: int) -> str:
+    "Attribute the session's terminal shows the cell with"
+    return session.view.front_attrs[y][x]
+
+
+def sharedAttr(server: SessionServer, x: int, y: int) -> str:
+    return server.window.compositor.composite(y, x, x + 1)[1][0]
+
+
+def testSessionsKeepTheirOwnSelection(server, clients, buttons):
+    first, second = connect(server, clients), connect(server, clients)
+    idle = sharedAttr(server, 1, 1)
+    press(server, first, "KEY_UP")
+    press(server, second, "KEY_UP")
+    assert first.active_element is second.active_element is buttons[0]
+    press(server, second, "KEY_DOWN")
+    assert first.active_element is buttons[0]
+    assert second.active_element is buttons[1]
+    assert "48;5;235" in shownAttr(first, 1, 1)
+    assert shownAttr(first, 1, 6) == idle
+    assert shownAttr(second, 1, 1) == idle
+    assert "48;5;235" in shownAttr(second, 1, 6)
+    # The shared widgets show no session's selection
+    assert sharedAttr(server, 1, 1) == sharedAttr(server, 1, 6) == idle
+    server.disconnect(second)
+    press(server, first, "KEY_DOWN")
+    assert first.active_element is buttons[1]
+    assert shownAttr(first, 1, 1) == idle
+
+
+def testChordsDontContinueAcrossSessions(server, clients, window):
+    calls = []
+    window.bind("g g", lambda: calls.append(True))
+    first, second = connect(server, clients), connect(server, clients)
+    press(server, first, "g")
+    press(server, second, "g")
+    assert calls == []
+    press(server, first, "g")
+    assert calls == [True]
+    assert window.pending_chord is None
+    assert second.pending_chord is not None
+
+
+def testAttributesResolveForEachClientTerminal(server, clients, buttons):
+    wide = connect(server, clients)
+    narrow = connect(server, clients, kind="xterm")
+    press(server, wide, "KEY_UP")
+    press(server, narrow, "KEY_UP")
+    palette = Palette(
+        Terminal(kind="xterm", stream=io.StringIO(), force_styling=True))
+    assert "48;5;235" in shownAttr(wide, 1, 1)
+    assert "48;5;" not in shownAttr(narrow, 1, 1)
+    assert palette.on_gray14 in shownAttr(narrow, 1, 1)
+
+
+def testOpenDropdownStaysWithItsSession(server, clients, window):
+    dropdown = DropdownMenu(window.mainframe, 6, 1, "menu")
+    for text in ["a", "b"]:
+        dropdown.addItem(text, print)
+    dropdown.place(0, 0)
+    button = Button(window.mainframe, 6, 1, text="x")
+    button.place(0, 6)
+    window.draw()
+    first, second = connect(server, clients), connect(server, clients)
+    press(server, first, "KEY_UP", "KEY_ENTER")
+    assert first.highlights[dropdown] is State.FOCUSED
+    assert "a" in "".join(first.view.front_chars[1])
+    assert "a" not in "".join(second.view.front_chars[1])
+    # The open list and its dropdown are out of the other session's reach
+    press(server, second, "KEY_UP")
+    assert second.active_element is button
+    press(server, first, "KEY_ESCAPE")
+    assert "a" not in "".join(first.view.front_chars[1])
+    press(server, second, "KEY_UP")
+    assert second.active_element is dropdown
@@ -0,0 +1,46 @@
+from blessed_widgets.sgr import NORMAL_STATE, SGRState, apply, parse, transition
+
+
+def testParseCombinesSequences():
+    state = parse("\x1b[1m\x1b[38;5;196m\x1b[44m")
+    assert state == SGRState("38;5;196", "44", frozenset({1}))
+
+
+def testParseRejectsOtherSequences():
+    assert parse("\x1b[1m\x1b(B") is None
+    assert parse("\x1b[6m") is None
+    assert parse("\x1b[38;3m") is None
+    assert parse("\x1b[38;2;1;2m") is None
+
+
+def testResetAndOffCodes():
+    state = SGRState("31", "42", frozenset({1, 2, 4}))
+    assert apply(state, "22") == SGRState("31", "42", frozenset({4}))
+    assert apply(state, "39;49") == SGRState(None, None, frozenset({1, 2, 4}))
+    assert apply(state, "0") == NORMAL_STATE
+    assert apply(state, "") == NORMAL_STATE
+
+
+def testTrueColour():
+    assert apply(NORMAL_STATE, "48;2;10;20;30;1") == SGRState(
+        None, "48;2;10;20;30", frozenset({1}))
+
+
+def testTransitionIsIncrementalWhenShorter():
+    current = SGRState("31", "44", frozenset({1}))
+    assert transition(current, SGRState("32", "44", frozenset({1}))) == "\x1b[32m"
+    assert transition(current, current) == ""
+
+
+def testTransitionRestoresFlagTurnedOffTogether():
+    current = SGRState(None, None, frozenset({1, 2}))
+    target = SGRState(None, None, frozenset({2}))
+    assert apply(current, transition(current, target)[2:-1]) == target
+
+
+def testTransitionResetsWhenShorter():
+    current = SGRState("38;5;1", "48;5;2", frozenset({1, 3, 4}))
+    assert transition(current, NORMAL_STATE) == "\x1b[m"
+    target = SGRState("31", None, frozenset())
+    sequence = transition(current, target)
+    assert sequence == "\x1b[0;31m"
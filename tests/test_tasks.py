@@ -0,0 +1,71 @@
+import threading
+
+from blessed_widgets.constants import Response
+from blessed_widgets.tasks import TaskRunner
+
+
+def waitForCompleted(runner, count):
+    for _ in range(200):
+        if len(runner.completed) >= count:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("tasks didn't complete")
+
+
+def testCallbacksRunWhenDelivered():
+    runner = TaskRunner()
+    results = []
+    errors = []
+    runner.submit(lambda: 1, on_result=results.append)
+    runner.submit(lambda: 1 / 0, on_error=errors.append)
+    waitForCompleted(runner, 2)
+    assert not results and not errors
+    runner.runCompleted()
+    assert results == [1]
+    assert isinstance(errors[0], ZeroDivisionError)
+    assert runner.running == 0
+    runner.shutdown()
+
+
+def testCancelledTaskDropsCallbacks():
+    runner = TaskRunner()
+    gate = threading.Event()
+    results = []
+    task = runner.submit(gate.wait, on_result=results.append)
+    task.cancel()
+    gate.set()
+    waitForCompleted(runner, 1)
+    runner.runCompleted()
+    assert results == [] and runner.running == 0
+    runner.shutdown()
+
+
+def testShutdownCancelsQueuedTasks():
+    runner = TaskRunner()
+    gate = threading.Event()
+    results = []
+    for _ in range(40):
+        runner.submit(gate.wait, 5, on_result=results.append)
+    runner.shutdown()
+    gate.set()
+    waitForCompleted(runner, 40)
+    runner.runCompleted()
+    assert runner.running == 0 and not runner.submitted
+    # Started tasks finish, the queued ones were dropped without an error
+    assert len(results) < 40
+    # A pool is created again on the next submit
+    runner.submit(lambda: 2, on_result=results.append)
+    waitForCompleted(runner, 1)
+    runner.runCompleted()
+    assert results[-1] == 2
+    runner.shutdown()
+
+
+def testWindowRunTasksAfterShutdown(window):
+    gate = threading.Event()
+    for _ in range(40):
+        window.submit(gate.wait, 5)
+    window.tasks.shutdown()
+    gate.set()
+    waitForCompleted(window.tasks, 40)
+    assert window.runTasks() is Response.CONTINUE
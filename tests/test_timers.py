@@ -0,0 +1,113 @@
+import pytest
+
+from blessed_widgets.constants import TIMER_COMPACT_THRESHOLD
+from blessed_widgets.timers import Scheduler
+
+
+class FakeClock():
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def scheduler(clock: FakeClock) -> Scheduler:
+    return Scheduler(clock)
+
+
+def testTimersRunInDeadlineOrder(clock, scheduler):
+    scheduler.after(3, lambda: "c")
+    scheduler.after(1, lambda: "a")
+    scheduler.after(1, lambda: "b")
+    scheduler.after(5, lambda: "d")
+    assert scheduler.getTimeout() == 1
+    assert scheduler.runDue() == []
+    clock.now = 3
+    assert scheduler.runDue() == ["a", "b", "c"]
+    assert scheduler.getTimeout() == 2
+    assert len(scheduler) == 1
+
+
+def testTimeoutIsNoneWithoutTimersAndNeverNegative(clock, scheduler):
+    assert scheduler.getTimeout() is None
+    scheduler.after(1, lambda: None)
+    clock.now = 10
+    assert scheduler.getTimeout() == 0
+
+
+def testRepeatingTimerKeepsItsInterval(clock, scheduler):
+    timer = scheduler.every(2, lambda: clock.now)
+    clock.now = 2
+    assert scheduler.runDue() == [2]
+    assert timer.deadline == 4
+    clock.now = 4.5
+    assert scheduler.runDue() == [4.5]
+    assert timer.deadline == 6
+
+
+def testRepeatingTimerRunsOnceWhenBehind(clock, scheduler):
+    timer = scheduler.every(1, lambda: "tick", delay=0.5)
+    clock.now = 10.2
+    assert scheduler.runDue() == ["tick"]
+    assert timer.deadline == pytest.approx(11.2)
+
+
+def testRepeatingTimerNeedsAPositiveInterval(scheduler):
+    with pytest.raises(ValueError):
+        scheduler.every(0, lambda: None)
+
+
+def testCancelledTimersDontRun(clock, scheduler):
+    first = scheduler.after(1, lambda: "first")
+    scheduler.after(2, lambda: "second")
+    first.cancel()
+    first.cancel()
+    assert len(scheduler) == 1
+    assert scheduler.getTimeout() == 2
+    clock.now = 2
+    assert scheduler.runDue() == ["second"]
+    assert len(scheduler) == 0
+
+
+def testCancellingARunTimerDoesNothing(clock, scheduler):
+    timer = scheduler.after(1, lambda: None)
+    clock.now = 1
+    scheduler.runDue()
+    timer.cancel()
+    assert scheduler.cancelled == 0
+
+
+def testManyCancelledTimersAreCompacted(scheduler):
+    kept = scheduler.after(0, lambda: None)
+    timers = [scheduler.after(1, lambda: None)
+              for _ in range(TIMER_COMPACT_THRESHOLD + 1)]
+    for timer in timers:
+        timer.cancel()
+    assert len(scheduler.heap) == len(timers) + 1
+    scheduler.getTimeout()
+    assert [entry[2] for entry in scheduler.heap] == [kept]
+    assert scheduler.cancelled == 0
+
+
+def testTimersScheduledByCommandsRunOnTheNextCall(clock, scheduler):
+    runs = []
+
+    def command():
+        runs.append(clock.now)
+        scheduler.after(0, command)
+
+    scheduler.after(0, command)
+    scheduler.runDue()
+    assert runs == [0]
+    assert len(scheduler) == 1
+    clock.now = 1
+    scheduler.runDue()
+    assert runs == [0, 1]